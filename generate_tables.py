@@ -0,0 +1,108 @@
+"""
+A script to generate the precompiled version tables of the checker.
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import logging
+import sys
+from pathlib import Path
+
+import click
+from PyCompatibility.client import tables, versions
+
+LOG: logging.Logger = logging.getLogger("generate_tables")
+TABLE_MODULE: Path = Path("src/PyCompatibility/client/stdlib_table.py")
+_BYTES_PER_LINE: int = 16
+_HEADER: str = '''"""
+The packed stdlib version table, generated by `generate_tables.py` from `versions.py`, do not edit it
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+'''
+
+
+def _literal(data: bytes) -> str:
+    """A bytes literal as black writes it, printable ASCII is kept"""
+    return 'b"{}"'.format(
+        "".join(
+            (
+                chr(byte)
+                if 0x20 <= byte < 0x7F and byte not in b'"\\'
+                else f"\\x{byte:02x}"
+            )
+            for byte in data
+        )
+    )
+
+
+def render() -> str:
+    """The table as a bytes constant, unmarshalled from the bytecode cache on import"""
+    data = tables.pack(versions.STDLIB_VERSIONS)
+    newest_added = max(
+        added
+        for added, _ in versions.STDLIB_VERSIONS.values()
+        if added is not None
+    )
+    chunks = []
+    for start in range(0, len(data), _BYTES_PER_LINE):
+        end = start + _BYTES_PER_LINE
+        chunks.append(f"    {_literal(data[start:end])}\n")
+    return (
+        f"{_HEADER}\n"
+        f"# The newest version adding a stdlib module or member\n"
+        f"NEWEST_ADDED: int = {newest_added}\n"
+        f"DATA: bytes = (\n"
+        f"{''.join(chunks)}"
+        f")\n"
+    )
+
+
+@click.command
+@click.option(
+    "--check",
+    is_flag=True,
+    default=False,
+    help="Exit with status 1 if the generated module is out of date",
+)
+def main(check: bool) -> None:
+    logging.basicConfig(level="INFO")
+    text = render()
+    if check:
+        if TABLE_MODULE.read_text(encoding="UTF-8") != text:
+            LOG.error(f"{TABLE_MODULE} is out of date")
+            sys.exit(1)
+        LOG.info(f"{TABLE_MODULE} is up to date")
+        return
+    TABLE_MODULE.write_text(text, encoding="UTF-8")
+    LOG.info(f"Generated {TABLE_MODULE}")
+
+
+if __name__ == "__main__":
+    main()
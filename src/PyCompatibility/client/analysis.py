@@ -0,0 +1,615 @@
+"""
+Static analysis of a single Python source against the version rule tables
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import ast
+import collections
+import dataclasses
+import hashlib
+import logging
+from typing import (
+    Any,
+    Callable,
+    Counter,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from . import exception, plugins, pragmas, rules
+
+LOG: logging.Logger = logging.getLogger("analysis")
+IMPORT_ERRORS: Set[str] = {"ImportError", "ModuleNotFoundError"}
+
+
+class AnalysisCancelled(exception.PyCompatibilityException):
+    pass
+
+
+@dataclasses.dataclass(frozen=True, order=True)
+class Finding:
+    path: str
+    line: int
+    column: int
+    rule: str
+    message: str
+    # Stays the same when lines are added or removed outside the enclosing scope
+    fingerprint: str = dataclasses.field(default="", compare=False)
+
+    @classmethod
+    def from_dict(cls, dict_finding: Dict[str, Any]) -> "Finding":
+        return cls(
+            path=str(dict_finding["path"]),
+            line=int(dict_finding["line"]),
+            column=int(dict_finding["column"]),
+            rule=str(dict_finding["rule"]),
+            message=str(dict_finding["message"]),
+            fingerprint=str(dict_finding.get("fingerprint", "")),
+        )
+
+    def serialize(self) -> Dict[str, Any]:
+        return dataclasses.asdict(self)
+
+
+def _digest(lines: Iterable[bytes]) -> bytes:
+    """Digest of source lines, ignoring indentation and blank lines"""
+    digest = hashlib.sha1()
+    for line in lines:
+        if line := line.strip():
+            digest.update(line)
+            digest.update(b"\n")
+    return digest.digest()
+
+
+def fingerprint(rule: str, path: str, scope: bytes, occurrence: int) -> str:
+    """
+    Fingerprint of the `occurrence`th finding of `rule` in the scope with digest `scope`,
+    the line numbers are not part of it
+    """
+    digest = hashlib.sha1(f"{rule}\0{path}\0{occurrence}\0".encode("UTF-8"))
+    digest.update(scope)
+    return digest.hexdigest()[:16]
+
+
+def line_fingerprint(
+    rule: str, path: str, lines: Sequence[bytes], line: int
+) -> str:
+    """Fingerprint of a finding of an error, whose scope is the line with the error"""
+    error_lines = [lines[line - 1]] if 0 < line <= len(lines) else []
+    return fingerprint(rule, path, _digest(error_lines), 1)
+
+
+def _dotted_name(node: ast.expr) -> Optional[str]:
+    """`a.b.c` -> "a.b.c", None if it is not a chain of names"""
+    parts: List[str] = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(node.id)
+    return ".".join(reversed(parts))
+
+
+def _prefixes(dotted_name: str, minimum: int = 1) -> List[str]:
+    """`a.b.c` -> ["a", "a.b", "a.b.c"]"""
+    parts = dotted_name.split(".")
+    return [".".join(parts[:index]) for index in range(minimum, len(parts) + 1)]
+
+
+def _is_legacy_decorator(node: ast.expr) -> bool:
+    """Whether the decorator fits the pre-3.9 grammar: `@dotted.name` or `@dotted.name(...)`"""
+    if isinstance(node, ast.Call):
+        node = node.func
+    return _dotted_name(node) is not None
+
+
+class CompatibilityVisitor(ast.NodeVisitor):
+    def __init__(
+        self,
+        path: str,
+        min_version: int,
+        max_version: int,
+        lines: Sequence[bytes] = (),
+        dispatcher: Optional[plugins.Dispatcher] = None,
+        ignored: Optional[pragmas.IgnoreTable] = None,
+    ) -> None:
+        self.path = path
+        self.min_version = min_version
+        self.max_version = max_version
+        self.lines = lines
+        self.dispatcher = dispatcher
+        self.ignored = ignored or {}
+        self.findings: List[Finding] = []
+        # Symbol table of the module, built during the walk: local name: the dotted
+        # name an import binds it to, None once anything else binds it
+        self._symbols: Dict[str, Optional[str]] = {}
+        # Enclosing function and class bodies: whether it is a class body, the
+        # previous symbols of the names bound in it and, when the class bindings
+        # are hidden from a function body, the symbol table outside of it
+        self._bodies: List[
+            Tuple[
+                bool,
+                Dict[str, Optional[str]],
+                Optional[Dict[str, Optional[str]]],
+            ]
+        ] = []
+        self._annotation_depth: int = 0
+        # `from __future__ import annotations`, annotations are never evaluated
+        self._lazy_annotations: bool = False
+        self._import_guard_depth: int = 0
+        # Enclosing definitions, the outermost one is a top-level statement
+        self._scopes: List[ast.AST] = []
+        self._scope_digests: Dict[int, bytes] = {}
+        self._occurrences: Counter[Tuple[str, bytes]] = collections.Counter()
+
+    def _fingerprint(self, rule_name: str) -> str:
+        if self._scopes:
+            scope = self._scopes[-1]
+            if (digest := self._scope_digests.get(id(scope))) is None:
+                start = getattr(scope, "lineno", 1) - 1
+                end = getattr(scope, "end_lineno", None)
+                digest = _digest(self.lines[start:end])
+                self._scope_digests[id(scope)] = digest
+        else:
+            digest = b""
+        self._occurrences[rule_name, digest] += 1
+        return fingerprint(
+            rule_name, self.path, digest, self._occurrences[rule_name, digest]
+        )
+
+    def _add(self, node: ast.AST, rule_name: str, message: str) -> None:
+        line = getattr(node, "lineno", 0)
+        # Counted even if ignored, so ignoring a finding keeps the fingerprints of the others
+        finding_fingerprint = self._fingerprint(rule_name)
+        if pragmas.ignored(self.ignored, line, rule_name):
+            return
+        self.findings.append(
+            Finding(
+                self.path,
+                line,
+                getattr(node, "col_offset", 0),
+                rule_name,
+                message,
+                finding_fingerprint,
+            )
+        )
+
+    def use(self, node: ast.AST, rule: rules.Rule) -> None:
+        if rule.violated(self.min_version, self.max_version):
+            self._add(
+                node,
+                rule.name,
+                rule.message(self.min_version, self.max_version),
+            )
+
+    def dispatch(self, node: ast.AST) -> None:
+        """Pass a node to the rule plugins of its type"""
+        assert self.dispatcher is not None
+        for plugin in self.dispatcher.plugins_for(type(node)):
+            try:
+                message = plugin.check(node, self.min_version, self.max_version)
+            except Exception as error:
+                LOG.warning(
+                    f"Rule plugin {plugin.name} failed on {self.path}: {error}"
+                )
+                continue
+            if message is not None:
+                self._add(node, plugin.name, message)
+
+    def visit(self, node: ast.AST) -> Any:
+        if self.dispatcher is not None:
+            self.dispatch(node)
+        return super().visit(node)
+
+    def visit_scope(self, node: ast.AST) -> None:
+        self._scopes.append(node)
+        try:
+            self.visit(node)
+        finally:
+            self._scopes.pop()
+
+    def bind(self, name: str, dotted_name: Optional[str]) -> None:
+        if dotted_name is None and name not in self._symbols:
+            return
+        if self._bodies:
+            self._bodies[-1][1].setdefault(name, self._symbols.get(name))
+        self._symbols[name] = dotted_name
+
+    def _enter_body(self, class_body: bool = False) -> None:
+        """A function body does not see the names bound in enclosing class bodies"""
+        visible = self._symbols
+        if not class_body:
+            rebound_later: Set[str] = set()
+            for is_class, rebound, _ in reversed(self._bodies):
+                if not is_class:
+                    rebound_later.update(rebound)
+                    continue
+                for name, previous in rebound.items():
+                    if name in rebound_later:
+                        continue
+                    if visible is self._symbols:
+                        visible = dict(self._symbols)
+                    visible[name] = previous
+        if visible is self._symbols:
+            self._bodies.append((class_body, {}, None))
+        else:
+            self._bodies.append((class_body, {}, self._symbols))
+            self._symbols = visible
+
+    def _exit_body(self) -> None:
+        """The names bound in the body are local to it"""
+        _, rebound, outer = self._bodies.pop()
+        if outer is None:
+            self._symbols.update(rebound)
+        else:
+            self._symbols = outer
+
+    def use_stdlib(self, node: ast.AST, dotted_name: str) -> None:
+        if self._import_guard_depth:
+            return
+        rule = rules.stdlib_rule(dotted_name)
+        if rule is not None:
+            self.use(node, rule)
+
+    def visit_annotation(self, node: Optional[ast.expr]) -> None:
+        if node is None:
+            return
+        if self._lazy_annotations or isinstance(node, ast.Constant):
+            # Not evaluated, nothing in it depends on the version
+            if self.dispatcher is not None:
+                for child in ast.walk(node):
+                    self.dispatch(child)
+            return
+        self._annotation_depth += 1
+        try:
+            self.visit(node)
+        finally:
+            self._annotation_depth -= 1
+
+    def _visit_definition(self, node: ast.AST) -> None:
+        for decorator in getattr(node, "decorator_list", ()):
+            if not _is_legacy_decorator(decorator):
+                self.use(decorator, rules.RELAXED_DECORATORS)
+        self.bind(getattr(node, "name"), None)
+        self._scopes.append(node)
+        self._enter_body(isinstance(node, ast.ClassDef))
+        try:
+            self._visit_definition_fields(node)
+        finally:
+            self._exit_body()
+            self._scopes.pop()
+
+    def _visit_definition_fields(self, node: ast.AST) -> None:
+        if getattr(node, "type_params", None):
+            self.use(node, rules.TYPE_PARAMETERS)
+        for field, value in ast.iter_fields(node):
+            if field == "decorator_list":
+                continue
+            if field == "returns":
+                self.visit_annotation(value)
+            elif isinstance(value, list):
+                for item in value:
+                    if isinstance(item, ast.AST):
+                        self.visit(item)
+            elif isinstance(value, ast.AST):
+                self.visit(value)
+
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> None:
+        if node.args.posonlyargs:
+            self.use(node, rules.POSITIONAL_ONLY_PARAMETERS)
+        self._visit_definition(node)
+
+    def visit_AsyncFunctionDef(self, node: ast.AsyncFunctionDef) -> None:
+        if node.args.posonlyargs:
+            self.use(node, rules.POSITIONAL_ONLY_PARAMETERS)
+        self._visit_definition(node)
+
+    def visit_Lambda(self, node: ast.Lambda) -> None:
+        if node.args.posonlyargs:
+            self.use(node, rules.POSITIONAL_ONLY_PARAMETERS)
+        self._enter_body()
+        try:
+            self.generic_visit(node)
+        finally:
+            self._exit_body()
+
+    def _visit_comprehension(
+        self, node: ast.AST, elements: Sequence[ast.expr]
+    ) -> None:
+        """
+        The targets of a comprehension are local to it, only its first iterable
+        is evaluated in the enclosing scope
+        """
+        first, *rest = getattr(node, "generators")
+        if self.dispatcher is not None:
+            self.dispatch(first)
+        self.visit(first.iter)
+        self._enter_body()
+        try:
+            self.visit(first.target)
+            for condition in first.ifs:
+                self.visit(condition)
+            for generator in rest:
+                self.visit(generator)
+            for element in elements:
+                self.visit(element)
+        finally:
+            self._exit_body()
+
+    def visit_ListComp(self, node: ast.ListComp) -> None:
+        self._visit_comprehension(node, [node.elt])
+
+    def visit_SetComp(self, node: ast.SetComp) -> None:
+        self._visit_comprehension(node, [node.elt])
+
+    def visit_DictComp(self, node: ast.DictComp) -> None:
+        self._visit_comprehension(node, [node.key, node.value])
+
+    def visit_GeneratorExp(self, node: ast.GeneratorExp) -> None:
+        self._visit_comprehension(node, [node.elt])
+
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        self._visit_definition(node)
+
+    def visit_arg(self, node: ast.arg) -> None:
+        self.bind(node.arg, None)
+        self.visit_annotation(node.annotation)
+
+    def visit_Name(self, node: ast.Name) -> None:
+        if not isinstance(node.ctx, ast.Load):
+            self.bind(node.id, None)
+
+    def visit_AnnAssign(self, node: ast.AnnAssign) -> None:
+        self.visit(node.target)
+        # Annotations of local variables are never evaluated
+        if not self._bodies or self._bodies[-1][0]:
+            self.visit_annotation(node.annotation)
+        if node.value is not None:
+            self.visit(node.value)
+
+    def visit_NamedExpr(self, node: ast.AST) -> None:
+        self.use(node, rules.ASSIGNMENT_EXPRESSION)
+        self.generic_visit(node)
+
+    def visit_Match(self, node: ast.AST) -> None:
+        self.use(node, rules.MATCH_STATEMENT)
+        self.generic_visit(node)
+
+    def visit_TryStar(self, node: ast.AST) -> None:
+        self.use(node, rules.EXCEPTION_GROUPS)
+        self.visit_Try(node)
+
+    def visit_TypeAlias(self, node: ast.AST) -> None:
+        self.use(node, rules.TYPE_ALIAS_STATEMENT)
+        self.generic_visit(node)
+
+    def _version_comparison(
+        self, test: ast.expr
+    ) -> Optional[Tuple[bool, int, int]]:
+        """
+        `sys.version_info >= (3, X)` and the like: whether the body runs on the newer
+        versions, the first minor version of the newer ones and the last of the older ones
+        """
+        if not (
+            isinstance(test, ast.Compare)
+            and len(test.ops) == 1
+            and isinstance(test.ops[0], (ast.GtE, ast.Gt, ast.Lt, ast.LtE))
+        ):
+            return None
+        dotted_name = _dotted_name(test.left)
+        if dotted_name is None:
+            return None
+        head, _, attributes = dotted_name.partition(".")
+        imported = self._symbols.get(head)
+        if (
+            imported is None
+            or (f"{imported}.{attributes}" if attributes else imported)
+            != "sys.version_info"
+        ):
+            return None
+        version = test.comparators[0]
+        if not (
+            isinstance(version, ast.Tuple)
+            and len(version.elts) >= 2
+            and all(
+                isinstance(element, ast.Constant) and type(element.value) is int
+                for element in version.elts
+            )
+        ):
+            return None
+        major, minor = (
+            getattr(element, "value") for element in version.elts[:2]
+        )
+        if major != 3:
+            return None
+        newer = isinstance(test.ops[0], (ast.GtE, ast.Gt))
+        # `(3, X, Y)` splits 3.X itself
+        return newer, minor, minor - 1 if len(version.elts) == 2 else minor
+
+    def _visit_in_range(
+        self, statements: Sequence[ast.stmt], min_version: int, max_version: int
+    ) -> None:
+        """Statements only run on a part of the range, none if it is empty"""
+        if min_version > max_version:
+            return
+        outer = self.min_version, self.max_version
+        self.min_version, self.max_version = min_version, max_version
+        try:
+            for statement in statements:
+                self.visit(statement)
+        finally:
+            self.min_version, self.max_version = outer
+
+    def visit_If(self, node: ast.If) -> None:
+        comparison = self._version_comparison(node.test)
+        if comparison is None:
+            self.generic_visit(node)
+            return
+        self.visit(node.test)
+        body_is_newer, first_newer, last_older = comparison
+        newer = max(self.min_version, first_newer), self.max_version
+        older = self.min_version, min(self.max_version, last_older)
+        self._visit_in_range(node.body, *(newer if body_is_newer else older))
+        self._visit_in_range(node.orelse, *(older if body_is_newer else newer))
+
+    def visit_Try(self, node: ast.AST) -> None:
+        # `try: import new_module` `except ImportError: ...` is a compatibility shim
+        guarded = any(
+            isinstance(handler.type, ast.Name)
+            and handler.type.id in IMPORT_ERRORS
+            or isinstance(handler.type, ast.Tuple)
+            and any(
+                isinstance(element, ast.Name) and element.id in IMPORT_ERRORS
+                for element in handler.type.elts
+            )
+            for handler in getattr(node, "handlers", ())
+        )
+        if guarded:
+            self._import_guard_depth += 1
+        try:
+            for statement in getattr(node, "body", ()):
+                self.visit(statement)
+        finally:
+            if guarded:
+                self._import_guard_depth -= 1
+        for field in ("handlers", "orelse", "finalbody"):
+            for statement in getattr(node, field, ()):
+                self.visit(statement)
+
+    def visit_Subscript(self, node: ast.Subscript) -> None:
+        slice_: ast.AST = node.slice
+        # TODO: Remove this after EOL: Python 3.8
+        if isinstance(slice_, getattr(ast, "Index", ())):
+            slice_ = slice_.value  # type: ignore[attr-defined] # pragma: no cover
+        if isinstance(slice_, ast.Tuple) and any(
+            isinstance(element, ast.Starred) for element in slice_.elts
+        ):
+            self.use(node, rules.STARRED_SUBSCRIPT)
+        if (
+            isinstance(node.value, ast.Name)
+            and node.value.id in rules.BUILTIN_GENERICS
+        ):
+            self.use(node, rules.BUILTIN_GENERIC_ALIAS)
+        self.generic_visit(node)
+
+    def visit_BinOp(self, node: ast.BinOp) -> None:
+        if self._annotation_depth and isinstance(node.op, ast.BitOr):
+            self.use(node, rules.UNION_OPERATOR)
+        self.generic_visit(node)
+
+    def visit_Import(self, node: ast.Import) -> None:
+        for alias in node.names:
+            if alias.asname is None:
+                # `import a.b` binds `a`
+                module = alias.name.split(".")[0]
+                self.bind(module, module)
+            else:
+                self.bind(alias.asname, alias.name)
+            for name in _prefixes(alias.name):
+                self.use_stdlib(node, name)
+
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
+        if node.module == "__future__":
+            # Only allowed before other statements, so before any annotation
+            if any(alias.name == "annotations" for alias in node.names):
+                self._lazy_annotations = True
+            return
+        if node.level or node.module is None:
+            # Names of the project
+            for alias in node.names:
+                self.bind(alias.asname or alias.name, None)
+            return
+        for name in _prefixes(node.module):
+            self.use_stdlib(node, name)
+        for alias in node.names:
+            dotted_name = f"{node.module}.{alias.name}"
+            if alias.name != "*":
+                self.bind(alias.asname or alias.name, dotted_name)
+            self.use_stdlib(node, dotted_name)
+
+    def visit_Attribute(self, node: ast.Attribute) -> None:
+        dotted_name = _dotted_name(node)
+        if dotted_name is None:
+            self.generic_visit(node)
+            return
+        head, _, attributes = dotted_name.partition(".")
+        imported = self._symbols.get(head)
+        if imported is not None:
+            # `p.a` of `from os import path as p` is `os.path.a`, the imported
+            # name itself is reported at the import statement
+            for name in _prefixes(
+                f"{imported}.{attributes}", minimum=imported.count(".") + 2
+            ):
+                self.use_stdlib(node, name)
+        if self.dispatcher is not None:
+            # The parts of the dotted name are not visited
+            for child in ast.walk(node.value):
+                self.dispatch(child)
+
+
+def analyze_source(
+    source: bytes,
+    path: str,
+    min_version: int,
+    max_version: int,
+    cancelled: Optional[Callable[[], bool]] = None,
+) -> List[Finding]:
+    """
+    Check a Python source, return the findings sorted by position.
+    A source skipped by its header is not parsed, and ignored findings are left out.
+    `cancelled` is polled between top-level statements, `AnalysisCancelled` is raised once it returns True.
+    """
+    if pragmas.skips_file(source):
+        return []
+    lines = source.splitlines()
+    try:
+        tree = ast.parse(source, filename=path)
+    except (SyntaxError, ValueError) as error:
+        # ValueError: source contains null bytes
+        line, column, message = 0, 0, str(error)
+        if isinstance(error, SyntaxError):
+            line, column = error.lineno or 0, max((error.offset or 1) - 1, 0)
+            message = str(error.msg)
+        return [
+            Finding(
+                path,
+                line,
+                column,
+                rules.SYNTAX_ERROR.name,
+                f"{rules.SYNTAX_ERROR.description}: {message}",
+                line_fingerprint(rules.SYNTAX_ERROR.name, path, lines, line),
+            )
+        ]
+    visitor = CompatibilityVisitor(
+        path,
+        min_version,
+        max_version,
+        lines,
+        plugins.dispatcher(min_version, max_version),
+        pragmas.ignore_table(source),
+    )
+    for statement in tree.body:
+        if cancelled is not None and cancelled():
+            raise AnalysisCancelled(f"Analysis of {path} cancelled")
+        visitor.visit_scope(statement)
+    return sorted(visitor.findings)
@@ -0,0 +1,78 @@
+"""
+Python sources in wheels, sdists and zipapps, read without extraction
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import io
+import posixpath
+import tarfile
+import zipfile
+from pathlib import Path
+from typing import Iterator, Sequence, Tuple
+
+from . import exception
+from .configuration import PYTHON_SUFFIXES
+
+ZIP_SUFFIXES: Sequence[str] = (".whl", ".zip", ".pyz")
+TAR_SUFFIXES: Sequence[str] = (".tar.gz", ".tgz")
+ARCHIVE_SUFFIXES: Sequence[str] = (*ZIP_SUFFIXES, *TAR_SUFFIXES)
+
+
+class BaseArchiveException(exception.BasePyCompatibilityException):
+    pass
+
+
+class ArchiveException(
+    exception.PyCompatibilityException, BaseArchiveException
+):
+    pass
+
+
+class ReadArchiveError(ValueError, ArchiveException):
+    pass
+
+
+def is_archive(path: Path) -> bool:
+    return path.name.lower().endswith(tuple(ARCHIVE_SUFFIXES))
+
+
+def _is_python(name: str) -> bool:
+    return posixpath.splitext(name)[1] in PYTHON_SUFFIXES
+
+
+def members(data: bytes, name: str) -> Iterator[Tuple[str, bytes]]:
+    """
+    Member name, content of the Python sources in an archive, one at a time.
+    A `.tar.gz` is read as a stream, so a member is only decompressed when it is reached.
+    """
+    try:
+        if name.lower().endswith(tuple(ZIP_SUFFIXES)):
+            # A zipapp may start with a shebang line, which zipfile skips
+            with zipfile.ZipFile(io.BytesIO(data)) as zip_file:
+                for info in zip_file.infolist():
+                    if not info.is_dir() and _is_python(info.filename):
+                        yield info.filename, zip_file.read(info)
+        else:
+            with tarfile.open(fileobj=io.BytesIO(data), mode="r|*") as tar:
+                for member in tar:
+                    if not member.isfile() or not _is_python(member.name):
+                        continue
+                    extracted = tar.extractfile(member)
+                    if extracted is not None:
+                        yield member.name, extracted.read()
+    except (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError) as error:
+        raise ReadArchiveError(f"Cannot read archive {name}: {error}")
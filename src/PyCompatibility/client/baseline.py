@@ -0,0 +1,88 @@
+"""
+Baseline of known findings, stored as a set of finding fingerprints
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import json
+from pathlib import Path
+from typing import cast, FrozenSet, Iterable, List, Tuple
+
+from . import exception
+from .analysis import Finding
+
+
+class BaseBaselineException(exception.BasePyCompatibilityException):
+    pass
+
+
+class BaselineException(
+    exception.PyCompatibilityException, BaseBaselineException
+):
+    pass
+
+
+class ReadBaselineError(ValueError, BaselineException):
+    pass
+
+
+class WriteBaselineError(ValueError, BaselineException):
+    pass
+
+
+def read_baseline(path: Path) -> FrozenSet[str]:
+    try:
+        with open(path, encoding="UTF-8") as fp:
+            loaded = json.load(fp)
+    except OSError as error:
+        raise ReadBaselineError(f"Cannot read baseline {path}: {error}")
+    except json.JSONDecodeError as error:
+        raise ReadBaselineError(f"{path} is not a valid baseline: {error}")
+    fingerprints = (
+        loaded.get("fingerprints") if isinstance(loaded, dict) else None
+    )
+    exception.assert_exc(
+        isinstance(fingerprints, list)
+        and all(isinstance(fingerprint, str) for fingerprint in fingerprints),
+        ReadBaselineError(f"{path} has no valid fingerprints"),
+    )
+    return frozenset(cast(List[str], fingerprints))
+
+
+def write_baseline(path: Path, findings: Iterable[Finding]) -> int:
+    """Return the number of fingerprints written"""
+    fingerprints = sorted(
+        {finding.fingerprint for finding in findings if finding.fingerprint}
+    )
+    try:
+        with open(path, mode="w", encoding="UTF-8") as fp:
+            json.dump({"fingerprints": fingerprints}, fp, indent=4)
+            fp.write("\n")
+    except OSError as error:
+        raise WriteBaselineError(f"Cannot write baseline {path}: {error}")
+    return len(fingerprints)
+
+
+def filter_known(
+    findings: List[Finding], baseline: FrozenSet[str]
+) -> Tuple[List[Finding], int]:
+    """Leave out the findings in the baseline, return the rest and the number left out"""
+    if not baseline:
+        return findings, 0
+    new = [
+        finding for finding in findings if finding.fingerprint not in baseline
+    ]
+    return new, len(findings) - len(new)
@@ -0,0 +1,246 @@
+"""
+The cache of PyCompatibility at `.compat_cache`
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import shutil
+import tarfile
+import tempfile
+from pathlib import Path, PurePosixPath
+from typing import Any, Dict, IO, List, Optional, Tuple
+
+from . import exception
+
+LOG: logging.Logger = logging.getLogger("cache")
+CACHE_DIRECTORY: Path = Path(".compat_cache")
+# Format of the exported archives, archives of another one are refused
+EXPORT_FORMAT: int = 1
+_MANIFEST: str = "manifest.json"
+_OBJECTS: str = "objects"
+_ENTRY_SUFFIX: str = ".json"
+
+
+class BaseCacheException(exception.BasePyCompatibilityException):
+    pass
+
+
+class CacheException(exception.PyCompatibilityException, BaseCacheException):
+    pass
+
+
+class CacheArchiveError(ValueError, CacheException):
+    pass
+
+
+def load(name: str, directory: Path = CACHE_DIRECTORY) -> Optional[Any]:
+    """Load a JSON cache entry, None if it is missing or broken"""
+    try:
+        with open(directory / f"{name}.json", encoding="UTF-8") as fp:
+            return json.load(fp)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as error:
+        LOG.warning(f"Ignored broken cache {name}: {error}")
+        return None
+
+
+def store(name: str, data: Any, directory: Path = CACHE_DIRECTORY) -> None:
+    """Store a JSON cache entry atomically, a concurrent run never reads half of it"""
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, mode="w", encoding="UTF-8") as fp:
+                json.dump(data, fp, sort_keys=True)
+            os.replace(temp_path, directory / f"{name}.json")
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+    except OSError as error:
+        # The cache only saves time, a failure to write it is not fatal
+        LOG.warning(f"Cannot write cache {name}: {error}")
+
+
+def clear(directory: Path = CACHE_DIRECTORY) -> bool:
+    """Return whether there was a cache to delete"""
+    if not directory.exists():
+        return False
+    shutil.rmtree(directory)
+    return True
+
+
+def _entry_names(directory: Path) -> List[str]:
+    """The cache entries under the directory, as relative POSIX paths"""
+    if not directory.is_dir():
+        return []
+    return sorted(
+        path.relative_to(directory).as_posix()
+        for path in directory.rglob(f"*{_ENTRY_SUFFIX}")
+        if path.is_file()
+    )
+
+
+def _entry_path(name: str, directory: Path) -> Path:
+    """Where an imported entry goes, an entry never leaves the cache directory"""
+    path = PurePosixPath(name)
+    if (
+        path.is_absolute()
+        or path.suffix != _ENTRY_SUFFIX
+        or any(
+            part in ("", ".", "..") or "\\" in part or ":" in part
+            for part in path.parts
+        )
+    ):
+        raise CacheArchiveError(f"Unsafe cache entry name {name!r}")
+    return directory.joinpath(*path.parts)
+
+
+def _add_member(tar: tarfile.TarFile, name: str, data: bytes) -> None:
+    # No owner nor time, the same cache always exports the same archive
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mode = 0o644
+    tar.addfile(info, io.BytesIO(data))
+
+
+def export_cache(path: Path, directory: Path = CACHE_DIRECTORY) -> int:
+    """
+    Pack the cache entries into one compressed archive, return the number of entries.
+    The manifest maps each entry to the SHA-256 of its content, which is stored once as `objects/<digest>`,
+    and comes first so that an import streams the archive.
+    """
+    manifest: Dict[str, str] = {}
+    objects: Dict[str, Path] = {}
+    try:
+        for name in _entry_names(directory):
+            entry_path = directory / name
+            digest = hashlib.sha256(entry_path.read_bytes()).hexdigest()
+            manifest[name] = digest
+            objects.setdefault(digest, entry_path)
+        fd, temp_path = tempfile.mkstemp(
+            dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, mode="wb") as raw, gzip.GzipFile(
+                fileobj=raw, mode="wb", mtime=0
+            ) as compressed, tarfile.open(
+                fileobj=compressed, mode="w", format=tarfile.PAX_FORMAT
+            ) as tar:
+                _add_member(
+                    tar,
+                    _MANIFEST,
+                    json.dumps(
+                        {"format": EXPORT_FORMAT, "entries": manifest},
+                        sort_keys=True,
+                    ).encode("UTF-8"),
+                )
+                for digest, entry_path in sorted(objects.items()):
+                    data = entry_path.read_bytes()
+                    # Changed since it was hashed, e.g. by a concurrent run
+                    if hashlib.sha256(data).hexdigest() != digest:
+                        raise OSError(f"{entry_path} changed while exporting")
+                    _add_member(tar, f"{_OBJECTS}/{digest}", data)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+    except OSError as error:
+        raise CacheArchiveError(f"Cannot export the cache to {path}: {error}")
+    return len(manifest)
+
+
+def _read_manifest(fp: IO[bytes]) -> Dict[str, str]:
+    try:
+        manifest = json.load(fp)
+        archive_format, entries = manifest["format"], manifest["entries"]
+    except (KeyError, TypeError, ValueError) as error:
+        raise CacheArchiveError(f"Broken cache archive manifest: {error}")
+    if archive_format != EXPORT_FORMAT:
+        raise CacheArchiveError(
+            f"Unsupported cache archive format {archive_format!r}"
+        )
+    if not isinstance(entries, dict) or not all(
+        isinstance(name, str) and isinstance(digest, str)
+        for name, digest in entries.items()
+    ):
+        raise CacheArchiveError("Broken cache archive manifest")
+    return entries
+
+
+def import_cache(
+    path: Path, directory: Path = CACHE_DIRECTORY
+) -> Tuple[int, int]:
+    """
+    Merge an exported archive into the cache, return the number of entries imported and kept.
+    An entry already in the cache is kept as it is, so importing twice adds nothing.
+    """
+    imported = kept = 0
+    try:
+        with tarfile.open(path, mode="r:gz") as tar:
+            manifest_member = tar.next()
+            if manifest_member is None or manifest_member.name != _MANIFEST:
+                raise CacheArchiveError(f"{path} is not a cache archive")
+            manifest_fp = tar.extractfile(manifest_member)
+            if manifest_fp is None:
+                raise CacheArchiveError(f"{path} is not a cache archive")
+            manifest = _read_manifest(manifest_fp)
+            names: Dict[str, List[str]] = {}
+            for name, digest in manifest.items():
+                if _entry_path(name, directory).exists():
+                    kept += 1
+                else:
+                    names.setdefault(digest, []).append(name)
+            # Objects are read one at a time, never extracted as they are named
+            for member in tar:
+                prefix, _, digest = member.name.partition("/")
+                if (
+                    not member.isfile()
+                    or prefix != _OBJECTS
+                    or digest not in names
+                ):
+                    continue
+                member_fp = tar.extractfile(member)
+                if member_fp is None:
+                    continue
+                data = member_fp.read()
+                if hashlib.sha256(data).hexdigest() != digest:
+                    raise CacheArchiveError(
+                        f"{path} is corrupted: {member.name} does not match its digest"
+                    )
+                try:
+                    content = json.loads(data)
+                except ValueError as error:
+                    raise CacheArchiveError(
+                        f"{path} is corrupted: {member.name}: {error}"
+                    )
+                for name in names.pop(digest):
+                    entry_path = _entry_path(name, directory)
+                    store(entry_path.stem, content, entry_path.parent)
+                    imported += 1
+            if names:
+                raise CacheArchiveError(
+                    f"{path} is corrupted: {len(names)} objects are missing"
+                )
+    except (OSError, EOFError, tarfile.TarError) as error:
+        raise CacheArchiveError(f"Cannot import the cache from {path}: {error}")
+    return imported, kept
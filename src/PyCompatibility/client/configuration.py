@@ -18,11 +18,13 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
 import dataclasses
+import hashlib
+import heapq
 import json
 import logging
 import os
 from pathlib import Path
-from typing import Any, Dict, Optional, Set
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Set, Tuple
 
 import tomli
 import tomli_w
@@ -30,6 +32,10 @@ import tomli_w
 from . import exception
 
 LOG: logging.Logger = logging.getLogger("configuration")
+# Files collected when walking an included directory, or a member of an archive
+PYTHON_SUFFIXES: Set[str] = {".py", ".pyi"}
+# Jupyter notebooks are also collected when walking a directory
+NOTEBOOK_SUFFIX: str = ".ipynb"
 
 
 class BaseConfigurationException(exception.BasePyCompatibilityException):
@@ -60,6 +66,101 @@ class UnusedConfigurationWarning(
     pass
 
 
+def _included_files(include: Set[Path]) -> Set[Path]:
+    """Included directories are walked for Python files and notebooks"""
+    include_files: Set[Path] = set()
+    for path in include:
+        exception.assert_exc(
+            path.exists(),
+            ParseConfigurationError(f"include path {path} doesn't exist!"),
+        )
+        path = path.resolve(strict=True)
+        if path.is_file():
+            include_files.add(path)
+        else:
+            for dir_path, _, filenames in os.walk(path):
+                include_files.update(
+                    Path(f"{dir_path}/{filename}")
+                    for filename in filenames
+                    if os.path.splitext(filename)[1]
+                    in (*PYTHON_SUFFIXES, NOTEBOOK_SUFFIX)
+                )
+    return set(path.resolve(strict=True) for path in include_files)
+
+
+def _excluded_files(exclude: Set[Path]) -> Set[Path]:
+    """Excluded directories exclude all files in them"""
+    exclude_files: Set[Path] = set()
+    for path in exclude:
+        exception.assert_exc(
+            path.exists(),
+            ParseConfigurationError(f"exclude path {path} doesn't exist!"),
+        )
+        path = path.resolve(strict=True)
+        if path.is_file():
+            exclude_files.add(path)
+        else:
+            for dir_path, _, filenames in os.walk(path):
+                exclude_files.update(
+                    Path(f"{dir_path}/{filename}") for filename in filenames
+                )
+    return set(path.resolve(strict=True) for path in exclude_files)
+
+
+def resolve_paths(include: Set[Path], exclude: Set[Path]) -> Set[Path]:
+    """
+    The resolved files to check, included directories are walked for Python files,
+    excluded directories exclude all files in them
+    """
+    return _included_files(include) - _excluded_files(exclude)
+
+
+def read_path_list(fp: BinaryIO, chunk_size: int = 64 * 1024) -> Iterator[Path]:
+    """
+    Stream the paths of a NUL-delimited list, or a newline-delimited one
+    if the first chunk with a delimiter has no NUL. The paths are neither resolved nor walked,
+    relative ones are joined to the working directory.
+    """
+    cwd = Path.cwd()
+    separator: Optional[bytes] = None
+    rest = b""
+    while True:
+        chunk = fp.read(chunk_size)
+        if separator is None:
+            if b"\0" in chunk:
+                separator = b"\0"
+            elif b"\n" in chunk:
+                separator = b"\n"
+            elif chunk:
+                # Undecided until the first delimiter
+                rest += chunk
+                continue
+        *names, rest = (rest + chunk).split(separator or b"\n")
+        if not chunk:
+            # The last path may not be terminated
+            names.append(rest)
+        for name in names:
+            if separator == b"\n":
+                name = name.rstrip(b"\r")
+            if name:
+                yield cwd / os.fsdecode(name)
+        if not chunk:
+            return
+
+
+def is_excluded(path: Path, exclude: Set[Path]) -> bool:
+    """Whether `path` is or is in an excluded path, compared without touching the file system"""
+    return path in exclude or not exclude.isdisjoint(path.parents)
+
+
+def display_path(path: Path) -> str:
+    """The path shown in the report, relative to the working directory if possible"""
+    try:
+        return path.relative_to(Path.cwd()).as_posix()
+    except ValueError:
+        return path.as_posix()
+
+
 @dataclasses.dataclass(frozen=True)
 class CheckConfiguration:
     min_version: Optional[int]
@@ -67,6 +168,9 @@ class CheckConfiguration:
     report: Optional[Path]
     include: Set[Path]
     exclude: Set[Path]
+    # Number of files found before the exclusion, and of those excluded, set once resolved
+    discovered: int = dataclasses.field(default=0, compare=False)
+    excluded: int = dataclasses.field(default=0, compare=False)
 
     @classmethod
     def from_dict(cls, dict_config: Dict[str, Any]) -> "CheckConfiguration":
@@ -204,45 +308,56 @@ class CheckConfiguration:
                 "min_version should less than or equal max_version"
             ),
         )
-        include: Set[Path] = set()
-        exclude: Set[Path] = set()
-        for path in self.include:
-            exception.assert_exc(
-                path.exists(),
-                ParseConfigurationError(f"include path {path} doesn't exist!"),
-            )
-            path = path.resolve(strict=True)
-            if path.is_file():
-                include.add(path)
-            else:
-                for dir_path, _, filenames in os.walk(path):
-                    include.update(
-                        Path(f"{dir_path}/{filename}") for filename in filenames
-                    )
-        include = set(path.resolve(strict=True) for path in include)
-
-        for path in self.exclude:
-            exception.assert_exc(
-                path.exists(),
-                ParseConfigurationError(f"exclude path {path} doesn't exist!"),
-            )
-            path = path.resolve(strict=True)
-            if path.is_file():
-                exclude.add(path)
-            else:
-                for dir_path, _, filenames in os.walk(path):
-                    exclude.update(
-                        Path(f"{dir_path}/{filename}") for filename in filenames
-                    )
-        exclude = set(path.resolve(strict=True) for path in exclude)
-        include -= exclude
+        discovered = _included_files(self.include)
+        include = discovered - _excluded_files(self.exclude)
 
         if (report := self.report) is not None:
-            report = report.resolve(strict=True)
+            # The report will be created by the check
+            report = report.resolve()
         return CheckConfiguration(
             min_version=self.min_version,
             max_version=self.max_version,
             report=report,
             include=include,
             exclude=set(),
+            discovered=len(discovered),
+            excluded=len(discovered) - len(include),
+        )
+
+    def shard(self, index: int, count: int) -> "CheckConfiguration":
+        """
+        Keep the `index`th (0-based) of `count` shards of the resolved files.
+        Every shard gets a similar total size of files, and the split only depends on the
+        file paths relative to the working directory and their sizes,
+        so nodes checking the same tree agree on it without coordination.
+        """
+        exception.assert_exc(
+            0 <= index < count,
+            ParseConfigurationError(f"Invalid shard {index + 1}/{count}"),
         )
+        cwd = Path.cwd()
+        # Weight, hash of the relative path, path
+        files: List[Tuple[int, bytes, Path]] = []
+        for path in self.include:
+            try:
+                key = path.relative_to(cwd).as_posix()
+            except ValueError:
+                key = path.as_posix()
+            files.append(
+                (
+                    # A file costs something to check even if it is empty
+                    path.stat().st_size + 1024,
+                    hashlib.sha1(key.encode("UTF-8")).digest(),
+                    path,
+                )
+            )
+        # Largest first into the lightest shard, the hash breaks ties stably
+        files.sort(key=lambda file: (-file[0], file[1]))
+        shards: List[Tuple[int, int]] = [(0, shard) for shard in range(count)]
+        include: Set[Path] = set()
+        for weight, _, path in files:
+            load, shard = heapq.heappop(shards)
+            if shard == index:
+                include.add(path)
+            heapq.heappush(shards, (load + weight, shard))
+        return dataclasses.replace(self, include=include)
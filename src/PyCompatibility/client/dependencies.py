@@ -0,0 +1,254 @@
+"""
+Audit of the `Requires-Python` of the installed distributions
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import dataclasses
+import hashlib
+import logging
+import operator
+import re
+import sys
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+# TODO: Use importlib.metadata instead of importlib_metadata after EOL: Python 3.11
+import importlib_metadata
+
+from . import cache, exception, rules
+from .analysis import Finding, fingerprint
+from .configuration import display_path
+
+LOG: logging.Logger = logging.getLogger("dependencies")
+CACHE_NAME: str = "dependencies"
+METADATA_SUFFIXES: Tuple[str, ...] = (".dist-info", ".egg-info")
+
+_CLAUSE: "re.Pattern[str]" = re.compile(
+    r"^\s*(~=|===|==|!=|<=|>=|<|>)\s*v?([0-9]+(?:\.[0-9]+)*)(\.\*)?\S*\s*$"
+)
+_COMPARISONS: Dict[str, Callable[[Tuple[int, ...], Tuple[int, ...]], bool]] = {
+    "===": operator.eq,
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<=": operator.le,
+    ">=": operator.ge,
+    "<": operator.lt,
+    ">": operator.gt,
+}
+# Patch versions tried for each minor version, the ones named in a specifier are added
+_PATCHES: Tuple[int, ...] = (0, 999)
+
+
+class BaseDependencyException(exception.BasePyCompatibilityException):
+    pass
+
+
+class DependencyException(
+    exception.PyCompatibilityException, BaseDependencyException
+):
+    pass
+
+
+class InvalidSpecifierError(ValueError, DependencyException):
+    pass
+
+
+@dataclasses.dataclass(frozen=True)
+class Dependency:
+    name: str
+    version: str
+    requires_python: Optional[str]
+    path: Path
+
+
+def _release(version: str) -> Tuple[int, ...]:
+    return tuple(int(part) for part in version.split("."))
+
+
+def _pad(release: Tuple[int, ...], length: int) -> Tuple[int, ...]:
+    return release + (0,) * (length - len(release))
+
+
+def _clause(
+    comparison: str, release: Tuple[int, ...], wildcard: bool
+) -> Callable[[Tuple[int, ...]], bool]:
+    if wildcard and comparison not in ("==", "!="):
+        raise InvalidSpecifierError(f"`.*` is not allowed with {comparison}")
+    if comparison == "~=" and len(release) < 2:
+        raise InvalidSpecifierError("`~=` needs at least 2 release parts")
+    length = max(len(release), 3)
+    padded = _pad(release, length)
+
+    def matches(version: Tuple[int, ...]) -> bool:
+        version = _pad(version, length)
+        if wildcard:
+            return (version[: len(release)] == release) == (comparison == "==")
+        if comparison == "~=":
+            return (
+                version >= padded
+                and version[: len(release) - 1] == release[:-1]
+            )
+        return _COMPARISONS[comparison](version, padded)
+
+    return matches
+
+
+def supported_versions(
+    requires_python: str, min_version: int, max_version: int
+) -> Set[int]:
+    """
+    The minor versions of 3.`min_version` to 3.`max_version` allowed by a `Requires-Python`,
+    a minor version is allowed if any of its patch versions is.
+    Pre-, post- and dev-release suffixes are ignored.
+    """
+    clauses = []
+    patches: Dict[int, Set[int]] = {}
+    for text in requires_python.split(","):
+        if not text.strip():
+            continue
+        match = _CLAUSE.match(text)
+        if match is None:
+            raise InvalidSpecifierError(f"Invalid specifier {text.strip()!r}")
+        comparison, version, wildcard = match.groups()
+        release = _release(version)
+        clauses.append(_clause(comparison, release, wildcard is not None))
+        if len(release) >= 3 and release[0] == 3:
+            patches.setdefault(release[1], set()).update(
+                patch
+                for patch in (release[2] - 1, release[2], release[2] + 1)
+                if patch >= 0
+            )
+    return {
+        minor
+        for minor in range(min_version, max_version + 1)
+        if any(
+            all(clause((3, minor, patch)) for clause in clauses)
+            for patch in {*_PATCHES, *patches.get(minor, ())}
+        )
+    }
+
+
+def _metadata_paths(search_paths: Iterable[str]) -> Iterable[Path]:
+    for search_path in search_paths:
+        try:
+            entries = sorted(Path(search_path or ".").iterdir())
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.suffix in METADATA_SUFFIXES and entry.is_dir():
+                yield entry
+
+
+def _read_dependency(path: Path) -> Optional[Dependency]:
+    metadata = importlib_metadata.PathDistribution(path).metadata
+    if metadata is None or not metadata.get("Name"):
+        return None
+    return Dependency(
+        metadata["Name"],
+        metadata.get("Version") or "",
+        metadata.get("Requires-Python"),
+        path,
+    )
+
+
+def installed_dependencies(
+    search_paths: Optional[Iterable[str]] = None,
+    cache_directory: Path = cache.CACHE_DIRECTORY,
+) -> List[Dependency]:
+    """
+    The distributions installed in `search_paths`, `sys.path` by default.
+    Their metadata is cached by the modification time of their metadata directory,
+    only new or changed distributions are read.
+    """
+    loaded = cache.load(CACHE_NAME, cache_directory)
+    cached: Dict[str, Any] = loaded if isinstance(loaded, dict) else {}
+    entries: Dict[str, Any] = {}
+    dependencies: List[Dependency] = []
+    seen: Set[str] = set()
+    for path in _metadata_paths(
+        sys.path if search_paths is None else search_paths
+    ):
+        key = str(path.resolve())
+        mtime = path.stat().st_mtime_ns
+        entry = cached.get(key)
+        if not isinstance(entry, dict) or entry.get("mtime") != mtime:
+            dependency = _read_dependency(path)
+            entry = {"mtime": mtime}
+            if dependency is not None:
+                entry.update(
+                    name=dependency.name,
+                    version=dependency.version,
+                    requires_python=dependency.requires_python,
+                )
+        entries[key] = entry
+        if "name" not in entry:
+            continue
+        # Like the import system, the first one on the search path wins
+        normalized_name = re.sub(r"[-_.]+", "-", entry["name"]).lower()
+        if normalized_name in seen:
+            continue
+        seen.add(normalized_name)
+        dependencies.append(
+            Dependency(
+                entry["name"], entry["version"], entry["requires_python"], path
+            )
+        )
+    if entries != cached:
+        cache.store(CACHE_NAME, entries, cache_directory)
+    return dependencies
+
+
+def audit(
+    dependencies: Iterable[Dependency], min_version: int, max_version: int
+) -> List[Finding]:
+    """A finding for each dependency whose `Requires-Python` excludes part of the range"""
+    findings = []
+    for dependency in dependencies:
+        if not dependency.requires_python:
+            continue
+        try:
+            supported = supported_versions(
+                dependency.requires_python, min_version, max_version
+            )
+        except InvalidSpecifierError as error:
+            LOG.warning(
+                f"Cannot check {dependency.name} {dependency.version}: {error}"
+            )
+            continue
+        excluded = sorted(set(range(min_version, max_version + 1)) - supported)
+        if not excluded:
+            continue
+        findings.append(
+            Finding(
+                display_path(dependency.path),
+                0,
+                0,
+                rules.REQUIRES_PYTHON.name,
+                f"{dependency.name} {dependency.version} requires Python "
+                f"{dependency.requires_python}, which excludes "
+                + ", ".join(f"3.{minor}" for minor in excluded),
+                fingerprint(
+                    rules.REQUIRES_PYTHON.name,
+                    dependency.name,
+                    hashlib.sha1(
+                        dependency.requires_python.encode("UTF-8")
+                    ).digest(),
+                    1,
+                ),
+            )
+        )
+    return sorted(findings)
@@ -0,0 +1,161 @@
+"""
+Inference of the minimum Python 3.x version a source needs
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import ast
+import dataclasses
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from . import archives, log, notebooks, rules
+from .analysis import CompatibilityVisitor
+from .configuration import display_path
+
+LOG: logging.Logger = logging.getLogger("inference")
+
+
+@dataclasses.dataclass(frozen=True)
+class Requirement:
+    """
+    The minimum 3.x version of a source and the first feature needing it.
+    `version` is None if no feature of the rule tables is used.
+    """
+
+    path: str
+    version: Optional[int] = None
+    rule: Optional[str] = None
+    description: Optional[str] = None
+    line: int = 0
+    column: int = 0
+
+    def serialize(self) -> Dict[str, Any]:
+        return dataclasses.asdict(self)
+
+
+class _NewestReached(Exception):
+    pass
+
+
+class InferenceVisitor(CompatibilityVisitor):
+    """Keeps the feature with the newest `added` instead of the violations of a range"""
+
+    def __init__(self, path: str) -> None:
+        # Narrowed by `sys.version_info` checks, a feature is not required
+        # where the versions lacking it never run
+        super().__init__(path, 0, rules.NEWEST_ADDED)
+        self.requirement = Requirement(path)
+
+    def use(self, node: ast.AST, rule: rules.Rule) -> None:
+        if (
+            rule.added is None
+            or rule.added <= self.min_version
+            or (
+                self.requirement.version is not None
+                and rule.added <= self.requirement.version
+            )
+        ):
+            return
+        self.requirement = Requirement(
+            self.path,
+            rule.added,
+            rule.name,
+            rule.description,
+            getattr(node, "lineno", 0),
+            getattr(node, "col_offset", 0),
+        )
+        if rule.added >= rules.NEWEST_ADDED:
+            # Nothing else can raise it
+            raise _NewestReached
+
+
+def infer_source(source: bytes, path: str) -> Requirement:
+    """Raise `SyntaxError` or `ValueError` if the source cannot be parsed"""
+    visitor = InferenceVisitor(path)
+    try:
+        visitor.visit(ast.parse(source, filename=path))
+    except _NewestReached:
+        pass
+    return visitor.requirement
+
+
+def _sources(
+    paths: Iterable[Path],
+) -> Iterator[Tuple[str, bytes, notebooks.CellMap]]:
+    for path in sorted(paths):
+        if notebooks.is_notebook(path):
+            try:
+                notebook = notebooks.open_notebook(path)
+            except (OSError, notebooks.ReadNotebookError) as error:
+                LOG.error(
+                    f"Cannot read {path}: {error}",
+                    extra=log.per_file("Cannot read"),
+                )
+                continue
+            if notebook.language in (None, "python"):
+                yield display_path(path), notebook.source, notebook.cells
+            continue
+        try:
+            data = path.read_bytes()
+        except OSError as error:
+            LOG.error(
+                f"Cannot read {path}: {error}",
+                extra=log.per_file("Cannot read"),
+            )
+            continue
+        if archives.is_archive(path):
+            try:
+                for name, member in archives.members(data, path.name):
+                    yield f"{display_path(path)}/{name}", member, ()
+            except archives.ReadArchiveError as error:
+                LOG.error(str(error), extra=log.per_file("Cannot read"))
+        else:
+            yield display_path(path), data, ()
+
+
+def infer(paths: Iterable[Path]) -> List[Requirement]:
+    """The requirement of each file that can be parsed, sorted by path"""
+    requirements: List[Requirement] = []
+    with log.aggregate_errors(LOG):
+        for path, source, cells in _sources(paths):
+            try:
+                requirement = infer_source(source, path)
+            except (SyntaxError, ValueError) as error:
+                LOG.error(
+                    f"Cannot parse {path}: {error}",
+                    extra=log.per_file("Cannot parse"),
+                )
+                continue
+            if cells and requirement.line:
+                cell, line = notebooks.cell_position(cells, requirement.line)
+                requirement = dataclasses.replace(
+                    requirement, path=notebooks.cell_path(path, cell), line=line
+                )
+            requirements.append(requirement)
+    return requirements
+
+
+def project_requirement(requirements: Iterable[Requirement]) -> Requirement:
+    """The requirement of the file needing the newest version"""
+    project = Requirement("")
+    for requirement in requirements:
+        if requirement.version is not None and (
+            project.version is None or requirement.version > project.version
+        ):
+            project = requirement
+    return project
@@ -0,0 +1,325 @@
+"""
+Verification of the sources with the installed Python interpreters of the version range
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import dataclasses
+import json
+import logging
+import queue
+import shutil
+import struct
+import subprocess
+import threading
+from typing import Any, List, Optional, Tuple
+
+from . import exception, notebooks, pragmas, rules
+from .analysis import Finding, line_fingerprint
+
+LOG: logging.Logger = logging.getLogger("interpreters")
+# Path length, source length
+_HEADER: struct.Struct = struct.Struct(">II")
+# Run by each interpreter of the range, so it only uses what every Python 3 has.
+# It writes its version, then compiles one framed source at a time and writes the verdict.
+_WORKER: str = """
+import json, struct, sys
+def read(size):
+    data = b""
+    while len(data) < size:
+        chunk = sys.stdin.buffer.read(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+def write(value):
+    sys.stdout.write(json.dumps(value) + "\\n")
+    sys.stdout.flush()
+write(list(sys.version_info[:2]))
+while True:
+    header = read(8)
+    if header is None:
+        break
+    path_size, source_size = struct.unpack(">II", header)
+    path = read(path_size).decode("utf-8")
+    source = read(source_size)
+    try:
+        compile(source, path, "exec", dont_inherit=True)
+        write(None)
+    except SyntaxError as error:
+        write([error.lineno or 0, error.offset or 0, str(error.msg)])
+    except Exception as error:
+        write([0, 0, "%s: %s" % (type(error).__name__, error)])
+"""
+
+# Line, offset (1-based), message; None if the source compiles
+Verdict = Optional[Tuple[int, int, str]]
+
+
+class BaseInterpreterException(exception.BasePyCompatibilityException):
+    pass
+
+
+class InterpreterException(
+    exception.PyCompatibilityException, BaseInterpreterException
+):
+    pass
+
+
+class VerifyError(InterpreterException):
+    """The interpreter timed out or kept crashing, the source is not verified"""
+
+
+@dataclasses.dataclass(frozen=True)
+class Interpreter:
+    # The minor version of Python 3
+    version: int
+    executable: str
+
+
+def find_interpreters(min_version: int, max_version: int) -> List[Interpreter]:
+    """The `python3.X` on the PATH for each version of the range, missing ones are skipped"""
+    found = []
+    for version in range(min_version, max_version + 1):
+        executable = shutil.which(f"python3.{version}")
+        if executable is None:
+            LOG.warning(f"Python 3.{version} is not found, it is not verified")
+            continue
+        found.append(Interpreter(version, executable))
+    return found
+
+
+class _InterpreterCrashed(Exception):
+    pass
+
+
+class _InterpreterTimeout(Exception):
+    pass
+
+
+class _Process:
+    """A worker process of an interpreter, taking sources over its stdin"""
+
+    def __init__(self, interpreter: Interpreter) -> None:
+        self.process = subprocess.Popen(
+            # No site packages nor environment, warnings would go to stderr
+            [interpreter.executable, "-E", "-S", "-W", "ignore", "-c", _WORKER],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        self._version: Optional[Tuple[int, int]] = None
+        self._expired: bool = False
+
+    def _read(self) -> Any:
+        assert self.process.stdout is not None
+        line = self.process.stdout.readline()
+        if not line:
+            raise _InterpreterCrashed("the interpreter exited")
+        return json.loads(line)
+
+    def version(self) -> Tuple[int, int]:
+        """Written first by the worker"""
+        if self._version is None:
+            major, minor = self._read()
+            self._version = int(major), int(minor)
+        return self._version
+
+    def _expire(self) -> None:
+        self._expired = True
+        self.process.kill()
+
+    def compile(
+        self, path: str, source: bytes, timeout: Optional[float]
+    ) -> Verdict:
+        """Killed after `timeout` seconds, which ends the blocked read"""
+        assert self.process.stdin is not None
+        # The start up does not count into the timeout
+        self.version()
+        encoded = path.encode("UTF-8")
+        timer = None
+        if timeout is not None:
+            timer = threading.Timer(timeout, self._expire)
+            timer.start()
+        try:
+            try:
+                self.process.stdin.write(
+                    _HEADER.pack(len(encoded), len(source)) + encoded + source
+                )
+                self.process.stdin.flush()
+            except OSError as error:
+                raise _InterpreterCrashed(f"the interpreter exited: {error}")
+            verdict = self._read()
+        except (ValueError, _InterpreterCrashed):
+            if self._expired:
+                raise _InterpreterTimeout
+            raise
+        finally:
+            if timer is not None:
+                timer.cancel()
+        if verdict is None:
+            return None
+        line, offset, message = verdict
+        return int(line), int(offset), str(message)
+
+    def close(self) -> None:
+        assert self.process.stdin is not None
+        assert self.process.stdout is not None
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+            self.process.wait()
+        self.process.stdout.close()
+
+
+class InterpreterPool:
+    """
+    Persistent worker processes of an interpreter, a source is sent to an idle one over its pipe,
+    so no process is started per file. The first process checks the interpreter,
+    the others are started when sources wait for one, up to `size` of them.
+    """
+
+    def __init__(
+        self,
+        interpreter: Interpreter,
+        size: int,
+        timeout: Optional[float] = None,
+    ) -> None:
+        self.interpreter = interpreter
+        self.size = size
+        # Seconds a source may take to compile
+        self.timeout = timeout
+        self._idle: "queue.Queue[_Process]" = queue.Queue()
+        self._lock = threading.Lock()
+        process = _Process(interpreter)
+        try:
+            version = process.version()
+            if version != (3, interpreter.version):
+                raise OSError(
+                    f"{interpreter.executable} is Python {version[0]}.{version[1]}"
+                )
+        except (OSError, ValueError, _InterpreterCrashed) as error:
+            process.close()
+            raise OSError(
+                f"Cannot start {interpreter.executable}: {error}"
+            ) from error
+        self._started: int = 1
+        self._idle.put(process)
+
+    def _start(self) -> _Process:
+        """Raise `VerifyError` and give up the slot if it cannot be started"""
+        try:
+            return _Process(self.interpreter)
+        except OSError as error:
+            with self._lock:
+                self._started -= 1
+            raise VerifyError(
+                f"Cannot start {self.interpreter.executable}: {error}"
+            )
+
+    def _acquire(self) -> _Process:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            start = self._started < self.size
+            if start:
+                self._started += 1
+        return self._start() if start else self._idle.get()
+
+    def compile(self, path: str, source: bytes) -> Verdict:
+        """
+        Raise `VerifyError` if the source times out, or crashes the interpreter twice.
+        The process is replaced, a crash is retried once as the source may not cause it.
+        """
+        process: Optional[_Process] = self._acquire()
+        retried = False
+        try:
+            while True:
+                assert process is not None
+                try:
+                    return process.compile(path, source, self.timeout)
+                except _InterpreterTimeout:
+                    reason, retry = f"Timeout after {self.timeout}s", False
+                except (ValueError, _InterpreterCrashed) as error:
+                    reason, retry = (
+                        f"the interpreter crashed: {error}",
+                        not retried,
+                    )
+                process.close()
+                process = None
+                process = self._start()
+                if not retry:
+                    raise VerifyError(
+                        f"Python 3.{self.interpreter.version} cannot verify it: {reason}"
+                    )
+                retried = True
+        finally:
+            if process is not None:
+                self._idle.put(process)
+
+    def verify(
+        self, path: str, source: bytes, cells: notebooks.CellMap = ()
+    ) -> List[Finding]:
+        """
+        The finding of a source this interpreter cannot compile, see `compile` for errors.
+        Like the analysis, a source skipped by its header is not compiled,
+        and an ignored finding is left out.
+        """
+        if pragmas.skips_file(source):
+            return []
+        verdict = self.compile(path, source)
+        if verdict is None:
+            return []
+        line, offset, message = verdict
+        if pragmas.ignored(
+            pragmas.ignore_table(source), line, rules.COMPILE_ERROR.name
+        ):
+            return []
+        name = f"{rules.COMPILE_ERROR.name}-3.{self.interpreter.version}"
+        findings = [
+            Finding(
+                path,
+                line,
+                max(offset - 1, 0),
+                rules.COMPILE_ERROR.name,
+                f"Python 3.{self.interpreter.version} cannot compile it: {message}",
+                line_fingerprint(name, path, source.splitlines(), line),
+            )
+        ]
+        return notebooks.cell_findings(findings, cells) if cells else findings
+
+    def close(self) -> None:
+        while not self._idle.empty():
+            self._idle.get().close()
+
+
+def start_pools(
+    interpreters: List[Interpreter], size: int, timeout: Optional[float] = None
+) -> List[InterpreterPool]:
+    """A pool of up to `size` processes for each interpreter, those failing to start are skipped"""
+    pools = []
+    for interpreter in interpreters:
+        try:
+            pools.append(InterpreterPool(interpreter, size, timeout))
+        except OSError as error:
+            LOG.warning(
+                f"Python 3.{interpreter.version} is not verified: {error}"
+            )
+    return pools
@@ -17,9 +17,13 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+import collections
+import contextlib
 import logging
 import sys
-from typing import Any, Callable, TextIO
+from typing import Any, Callable, Counter, Dict, Iterator, TextIO, Tuple
+
+import click
 
 from . import color
 from .exception import PyCompatibilityException
@@ -28,6 +32,11 @@ SUCCESS: int = 25
 LOG: logging.Logger = logging.getLogger("log")
 _initialized: bool = False
 color_support: bool = True
+# Per-file records of each kind shown by `aggregate_errors`, the others are counted
+AGGREGATE_LIMIT: int = 10
+_KIND: str = "per_file_kind"
+# Exit status of a command stopped by an error, 1 is for the incompatibilities found
+ERROR_EXIT_CODE: int = 2
 
 
 class ColoredStreamHandler(logging.StreamHandler):  # type: ignore[type-arg] # pragma: no cover
@@ -142,32 +151,84 @@ def initialize(
     _initialized = True
 
 
+def per_file(kind: str) -> Dict[str, str]:
+    """The `extra` of a per-file record, counted into `kind` by `aggregate_errors`"""
+    return {_KIND: kind}
+
+
+class _Aggregator(logging.Filter):
+    """Lets the first records of each logger, level and kind through"""
+
+    def __init__(self, limit: int) -> None:
+        super().__init__()
+        self.limit = limit
+        self.counts: Counter[Tuple[str, int, str]] = collections.Counter()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        kind = getattr(record, _KIND, None)
+        if kind is None:
+            return True
+        key = (record.name, record.levelno, kind)
+        self.counts[key] += 1
+        return self.counts[key] <= self.limit
+
+
+@contextlib.contextmanager
+def aggregate_errors(
+    *loggers: logging.Logger, limit: int = AGGREGATE_LIMIT
+) -> Iterator[None]:
+    """
+    Show the first `limit` records of each kind of `per_file` logged to `loggers`,
+    and how many there were on exit, instead of one line per file
+    """
+    aggregator = _Aggregator(limit)
+    for logger in loggers:
+        logger.addFilter(aggregator)
+    try:
+        yield
+    finally:
+        for logger in loggers:
+            logger.removeFilter(aggregator)
+        by_name = {logger.name: logger for logger in loggers}
+        for (name, level, kind), count in sorted(aggregator.counts.items()):
+            if count > limit:
+                by_name[name].log(
+                    level,
+                    f"{kind}: {count} files, {count - limit} of them are not shown",
+                )
+
+
+def _log_exception(error: BaseException, level: int) -> None:
+    """
+    Logged under the module and class of the exception, without registering a logger
+    for each name, which the logging module would keep until exit
+    """
+    if not LOG.isEnabledFor(level):
+        return
+    if error.__traceback__ is not None:
+        name = f'{error.__traceback__.tb_frame.f_globals["__name__"]}: {error.__class__.__name__}'
+    else:
+        name = error.__class__.__name__
+    LOG.handle(LOG.makeRecord(name, level, __file__, 0, error, (), None))
+
+
 def handle_exception(func: Callable[..., Any]) -> Callable[..., Any]:
     """
-    A decorator to handle the exception when call a command or group
+    A decorator to handle the exception when call a command or group,
+    the command exits with `ERROR_EXIT_CODE` once the exception is logged
     """
 
     def decor(*args: Any, **kwargs: Any) -> Any:
         try:
             return func(*args, **kwargs)
+        except (click.ClickException, click.exceptions.Exit, click.Abort):
+            # Shown by click, with its own exit status
+            raise
         except PyCompatibilityException as handled_exception:
-            if handled_exception.__traceback__ is not None:
-                logger = logging.getLogger(
-                    f'{handled_exception.__traceback__.tb_frame.f_globals["__name__"]}: {handled_exception.__class__.__name__}'
-                )
-            else:
-                logger = logging.getLogger(handled_exception.__class__.__name__)
-            logger.error(handled_exception)
+            _log_exception(handled_exception, logging.ERROR)
         except Exception as uncaught_exception:
-            if uncaught_exception.__traceback__ is not None:
-                logger = logging.getLogger(
-                    f'{uncaught_exception.__traceback__.tb_frame.f_globals["__name__"]}: {uncaught_exception.__class__.__name__}'
-                )
-            else:
-                logger = logging.getLogger(
-                    uncaught_exception.__class__.__name__
-                )
-            logger.critical(uncaught_exception)
+            _log_exception(uncaught_exception, logging.CRITICAL)
+        sys.exit(ERROR_EXIT_CODE)
 
     decor.__name__ = func.__name__
     return decor
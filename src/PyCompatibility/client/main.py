@@ -17,17 +17,41 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+import contextlib
+import json
 import logging
+import sys
 from pathlib import Path
-from typing import Any, Callable, cast, Optional, Set, Tuple
+from typing import Any, BinaryIO, Callable, cast, Iterator, Optional, Set, Tuple
 
 import click
 
 # TODO: Use importlib.metadata instead of importlib_metadata after EOL: Python 3.11
 import importlib_metadata
 
-from . import log
-from .configuration import CheckConfiguration
+from . import (
+    cache,
+    dependencies,
+    inference,
+    interpreters,
+    log,
+    pipeline,
+    reachability,
+)
+from .baseline import (
+    filter_known,
+    read_baseline,
+    write_baseline as write_baseline_file,
+)
+from .configuration import (
+    CheckConfiguration,
+    is_excluded,
+    read_path_list,
+    resolve_paths,
+)
+from .metrics import PhaseTimer, render as render_metrics, write_metrics
+from .progress import Counters, ProgressReporter
+from .report import is_ndjson, merge_reports, ReportReader, write_report
 
 __version__: str = importlib_metadata.version("PyCompatibility")
 __license_file__: str = (
@@ -64,6 +88,21 @@ TERMS_AND_CONDITIONS: str = (
 )
 
 
+def _parse_shard(
+    context: click.Context, param: click.Parameter, value: Optional[str]
+) -> Optional[Tuple[int, int]]:
+    """`i/N`, the i-th (1-based) of N shards"""
+    if value is None:
+        return None
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise click.BadParameter(f"{value!r} is not in the form of `i/N`")
+    if not 1 <= index <= count:
+        raise click.BadParameter(f"{value!r} should satisfy 1 <= i <= N")
+    return index, count
+
+
 def _print_notice(func: Callable[..., Any]) -> Callable[..., Any]:
     def decor(*args: Any, **kwargs: Any) -> Any:
         print(
@@ -116,7 +155,7 @@ def main(
 @click.argument(
     "include",
     nargs=-1,
-    required=True,
+    required=False,
     type=Path,
 )
 @click.option(
@@ -150,7 +189,113 @@ def main(
     "--report",
     "-o",
     type=Path,
-    help="The path to the file to write the JSON check report",
+    help="The path to the file to write the JSON check report, NDJSON if it ends with `.ndjson` or `.jsonl`",
+)
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=pipeline.PipelineOptions.jobs,
+    help="Number of analysis workers",
+)
+@click.option(
+    "--readers",
+    type=click.IntRange(min=1),
+    default=pipeline.PipelineOptions.readers,
+    help="Number of concurrent file readers",
+)
+@click.option(
+    "--prefetch",
+    type=click.IntRange(min=1),
+    default=pipeline.PipelineOptions.prefetch,
+    help="Max number of files read ahead of the analysis workers",
+)
+@click.option(
+    "--fail-fast",
+    is_flag=True,
+    default=False,
+    help="Stop at the first incompatibility and write a partial report",
+)
+@click.option(
+    "--shard",
+    callback=_parse_shard,
+    help="Only check the i-th of N shards of the files, in the form of `i/N`",
+)
+@click.option(
+    "--file-timeout",
+    type=click.FloatRange(min=0, min_open=True),
+    help="Skip the files taking longer than this many seconds to check",
+)
+@click.option(
+    "--file-memory-limit",
+    type=click.IntRange(min=1),
+    help="Skip the files needing more than this many MiB to check",
+)
+@click.option(
+    "--worker-max-files",
+    type=click.IntRange(min=1),
+    help="Replace an analysis worker after it checks this many files",
+)
+@click.option(
+    "--worker-max-rss",
+    type=click.IntRange(min=1),
+    help="Replace an analysis worker once it uses more than this many MiB",
+)
+@click.option(
+    "--baseline",
+    type=Path,
+    help="The path to the baseline file, findings in it are not reported",
+)
+@click.option(
+    "--write-baseline",
+    is_flag=True,
+    default=False,
+    help="Write all findings to the baseline file instead of filtering them",
+)
+@click.option(
+    "--deps",
+    is_flag=True,
+    default=False,
+    help="Also check the Requires-Python of the installed distributions",
+)
+@click.option(
+    "--entry-point",
+    multiple=True,
+    help="Only check the modules reachable by imports from this entry point, in the form of `module:func`",
+)
+@click.option(
+    "--entry-module",
+    multiple=True,
+    help="Only check the modules reachable by imports from this module",
+)
+@click.option(
+    "--progress",
+    is_flag=True,
+    default=False,
+    help="Show the files done, the throughput and the ETA on stderr",
+)
+@click.option(
+    "--files-from",
+    type=click.File("rb"),
+    help="Check the paths listed in this file, `-` for stdin, instead of INCLUDE; "
+    "NUL-delimited if it has a NUL, newline-delimited otherwise",
+)
+@click.option(
+    "--verify-with-interpreters",
+    is_flag=True,
+    default=False,
+    help="Also compile each file with the installed `python3.X` of the version range",
+)
+@click.option(
+    "--metrics",
+    type=Path,
+    help="The path to the file to write the statistics of the run in the OpenMetrics text format",
+)
+@click.option(
+    "--tree-cache/--no-tree-cache",
+    default=True,
+    help="Reuse the findings of the directories whose files are unchanged, "
+    "by their names, sizes and modification times",
 )
 @log.handle_exception
 def check(
@@ -164,7 +309,38 @@ def check(
     exclude: Optional[Tuple[Path, ...]],
     report: Optional[Path],
     color: bool,
+    jobs: int,
+    readers: int,
+    prefetch: int,
+    fail_fast: bool,
+    file_timeout: Optional[float],
+    file_memory_limit: Optional[int],
+    shard: Optional[Tuple[int, int]],
+    worker_max_files: Optional[int],
+    worker_max_rss: Optional[int],
+    baseline: Optional[Path],
+    write_baseline: bool,
+    deps: bool,
+    entry_point: Tuple[str, ...],
+    entry_module: Tuple[str, ...],
+    progress: bool,
+    metrics: Optional[Path],
+    files_from: Optional[BinaryIO],
+    verify_with_interpreters: bool,
+    tree_cache: bool,
 ) -> None:
+    if write_baseline and baseline is None:
+        raise click.UsageError("--write-baseline requires --baseline")
+    if files_from is None and not include:
+        raise click.UsageError("Missing argument 'INCLUDE...' or --files-from")
+    if files_from is not None and (
+        include or entry_point or entry_module or shard
+    ):
+        raise click.UsageError(
+            "--files-from cannot be used with INCLUDE, "
+            "--entry-point, --entry-module or --shard"
+        )
+    timer = PhaseTimer()
     configuration_path = (
         configuration_path or context.obj["configuration"]["configuration_path"]
     )
@@ -193,11 +369,266 @@ def check(
             "min_version": min_version,
             "max_version": max_version,
             "report": report,
-            "include": include_set,
-            "exclude": exclude_set,
+            # The listed files replace the included ones, and are excluded as they stream
+            "include": include_set if files_from is None else set(),
+            "exclude": exclude_set if files_from is None else set(),
         }
     ).check_and_resolve()
+    discovered, excluded = configuration.discovered, configuration.excluded
+    listed: Optional[Iterator[Path]] = None
+    if files_from is not None:
+        excluded_paths = {path.resolve() for path in exclude_set}
+
+        def listed_paths(fp: BinaryIO) -> Iterator[Path]:
+            nonlocal discovered, excluded
+            for path in read_path_list(fp):
+                discovered += 1
+                if is_excluded(path, excluded_paths):
+                    excluded += 1
+                else:
+                    yield path
+
+        listed = listed_paths(files_from)
+    entry_modules = [
+        *(reachability.entry_point_module(entry) for entry in entry_point),
+        *entry_module,
+    ]
+    if entry_modules:
+        configuration = reachability.reachable(configuration, entry_modules)
+    if shard is not None:
+        configuration = configuration.shard(shard[0] - 1, shard[1])
     LOG.debug(f"Using configuration: {configuration}")
+    timer.mark("resolve")
+
+    # The total of listed files grows as they are read
+    counters = Counters(len(configuration.include))
+    reporter = ProgressReporter(enable_color=color) if progress else None
+    options = pipeline.PipelineOptions(
+        jobs=jobs,
+        readers=readers,
+        prefetch=prefetch,
+        fail_fast=fail_fast,
+        file_timeout=file_timeout,
+        file_memory_limit=(
+            None
+            if file_memory_limit is None
+            else file_memory_limit * 1024 * 1024
+        ),
+        worker_max_files=worker_max_files,
+        worker_max_rss=(
+            None if worker_max_rss is None else worker_max_rss * 1024 * 1024
+        ),
+        baseline=(
+            read_baseline(baseline)
+            if baseline is not None and not write_baseline
+            else frozenset()
+        ),
+        verify_with=(
+            tuple(
+                interpreters.find_interpreters(
+                    configuration.min_version, configuration.max_version
+                )
+            )
+            if verify_with_interpreters
+            and configuration.min_version is not None
+            and configuration.max_version is not None
+            else ()
+        ),
+        tree_cache=cache.CACHE_DIRECTORY / "trees" if tree_cache else None,
+        on_progress=reporter,
+    )
+    check_report = pipeline.check(configuration, options, counters, listed)
+    if reporter is not None:
+        reporter.close(counters)
+    timer.mark("check")
+    if (
+        deps
+        and configuration.min_version is not None
+        and configuration.max_version is not None
+    ):
+        findings, known = filter_known(
+            dependencies.audit(
+                dependencies.installed_dependencies(),
+                configuration.min_version,
+                configuration.max_version,
+            ),
+            options.baseline,
+        )
+        check_report.findings = sorted([*check_report.findings, *findings])
+        check_report.suppressed += known
+        timer.mark("dependencies")
+    if configuration.report is None:
+        write_report(check_report, sys.stdout)
+    else:
+        with open(configuration.report, mode="w", encoding="UTF-8") as fp:
+            write_report(check_report, fp, is_ndjson(configuration.report))
+    timer.mark("report")
+    if metrics is not None:
+        write_metrics(
+            metrics,
+            render_metrics(
+                check_report,
+                counters,
+                discovered,
+                excluded,
+                timer.durations,
+            ),
+        )
+    if check_report.skipped:
+        LOG.warning(
+            f"{len(check_report.skipped)} files skipped, "
+            "see the report for the reasons"
+        )
+    if not check_report.complete:
+        LOG.warning("Check stopped early, the report is partial")
+    if check_report.suppressed:
+        LOG.info(f"{check_report.suppressed} known findings in the baseline")
+    if write_baseline and baseline is not None:
+        count = write_baseline_file(baseline, check_report.findings)
+        log.success(f"Wrote {count} findings to {baseline}", logger=LOG)
+        return
+    if check_report.findings:
+        LOG.error(
+            f"{len(check_report.findings)} incompatibilities found "
+            f"in {check_report.files} files"
+        )
+        sys.exit(1)
+    log.success(f"Checked {check_report.files} files", logger=LOG)
+
+
+@main.command(name="merge-reports")
+@click.pass_context
+@click.argument(
+    "reports",
+    nargs=-1,
+    required=True,
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+)
+@click.option(
+    "--log-level",
+    type=str,
+    help="The logging level.Logs lesser than this level will not be logged",
+)
+@click.option("--color/--no-color", default=True, help="Enable colorful output")
+@click.option(
+    "--report",
+    "-o",
+    type=Path,
+    help="The path to the file to write the merged report, NDJSON if it ends with `.ndjson` or `.jsonl`",
+)
+@log.handle_exception
+def merge_reports_command(
+    context: click.Context,
+    reports: Tuple[Path, ...],
+    log_level: Optional[str],
+    color: bool,
+    report: Optional[Path],
+) -> None:
+    log.initialize(
+        log_level or context.obj["configuration"]["log_level"], color
+    )
+    with contextlib.ExitStack() as stack:
+        readers = [
+            ReportReader(
+                stack.enter_context(open(path, encoding="UTF-8")), str(path)
+            )
+            for path in reports
+        ]
+        fp = (
+            sys.stdout
+            if report is None
+            else stack.enter_context(open(report, mode="w", encoding="UTF-8"))
+        )
+        writer = merge_reports(readers, fp, is_ndjson(report))
+    log.success(
+        f"Merged {len(reports)} reports with {writer.findings} findings",
+        logger=LOG,
+    )
+
+
+@main.command
+@click.pass_context
+@click.argument(
+    "include",
+    nargs=-1,
+    required=True,
+    type=Path,
+)
+@click.option(
+    "--log-level",
+    type=str,
+    help="The logging level.Logs lesser than this level will not be logged",
+)
+@click.option(
+    "--configuration-path",
+    "--cfg",
+    type=Path,
+    help="Specify path to the configuration file",
+)
+@click.option("--color/--no-color", default=True, help="Enable colorful output")
+@click.option(
+    "--exclude",
+    multiple=True,
+    type=Path,
+    help="The files that PyCompatibility will not check",
+)
+@click.option(
+    "--report",
+    "-o",
+    type=Path,
+    help="The path to the file to write the JSON inference report",
+)
+@log.handle_exception
+def infer(
+    context: click.Context,
+    include: Tuple[Path, ...],
+    log_level: Optional[str],
+    configuration_path: Optional[Path],
+    color: bool,
+    exclude: Tuple[Path, ...],
+    report: Optional[Path],
+) -> None:
+    configuration_path = (
+        configuration_path or context.obj["configuration"]["configuration_path"]
+    )
+    log.initialize(
+        log_level or context.obj["configuration"]["log_level"], color
+    )
+    if configuration_path is None:
+        file_configuration = CheckConfiguration.discover(Path(""))
+    else:
+        file_configuration = CheckConfiguration.from_file(configuration_path)
+    include_set: Set[Path] = set(include)
+    exclude_set: Set[Path] = set(exclude)
+    if file_configuration is not None:
+        include_set.update(file_configuration.include or set())
+        exclude_set.update(file_configuration.exclude or set())
+
+    requirements = inference.infer(resolve_paths(include_set, exclude_set))
+    project = inference.project_requirement(requirements)
+    output = json.dumps(
+        {
+            "project": project.serialize(),
+            "files": [requirement.serialize() for requirement in requirements],
+        },
+        indent=4,
+    )
+    if report is None:
+        print(output)
+    else:
+        with open(report, mode="w", encoding="UTF-8") as fp:
+            fp.write(f"{output}\n")
+    if project.version is None:
+        log.success(
+            f"No version specific feature found in {len(requirements)} files",
+            logger=LOG,
+        )
+        return
+    log.success(
+        f"Requires Python 3.{project.version}+: {project.description} "
+        f"at {project.path}:{project.line}",
+        logger=LOG,
+    )
 
 
 @main.command
@@ -212,7 +643,67 @@ def check(
 def cleanup(
     context: click.Context, log_level: Optional[str], color: bool
 ) -> None:
-    log_level = log_level or context.obj["log_level"] or "INFO"
+    log.initialize(
+        log_level or context.obj["configuration"]["log_level"] or "INFO", color
+    )
+    if cache.clear():
+        log.success(f"Deleted {cache.CACHE_DIRECTORY}", logger=LOG)
+    else:
+        LOG.info(f"No cache at {cache.CACHE_DIRECTORY}")
+
+
+@main.group(name="cache", no_args_is_help=True)
+def cache_group() -> None:
+    pass
+
+
+@cache_group.command(name="export")
+@click.pass_context
+@click.argument("file", type=Path)
+@click.option(
+    "--log-level",
+    type=str,
+    help="The logging level.Logs lesser than this level will not be logged",
+)
+@click.option("--color/--no-color", default=True, help="Enable colorful output")
+@log.handle_exception
+def cache_export(
+    context: click.Context, file: Path, log_level: Optional[str], color: bool
+) -> None:
+    log.initialize(
+        log_level or context.obj["configuration"]["log_level"] or "INFO", color
+    )
+    entries = cache.export_cache(file)
+    log.success(
+        f"Exported {entries} entries of {cache.CACHE_DIRECTORY} to {file}",
+        logger=LOG,
+    )
+
+
+@cache_group.command(name="import")
+@click.pass_context
+@click.argument(
+    "file", type=click.Path(exists=True, dir_okay=False, path_type=Path)
+)
+@click.option(
+    "--log-level",
+    type=str,
+    help="The logging level.Logs lesser than this level will not be logged",
+)
+@click.option("--color/--no-color", default=True, help="Enable colorful output")
+@log.handle_exception
+def cache_import(
+    context: click.Context, file: Path, log_level: Optional[str], color: bool
+) -> None:
+    log.initialize(
+        log_level or context.obj["configuration"]["log_level"] or "INFO", color
+    )
+    imported, kept = cache.import_cache(file)
+    log.success(
+        f"Imported {imported} entries into {cache.CACHE_DIRECTORY}, "
+        f"kept {kept} existing ones",
+        logger=LOG,
+    )
 
 
 @main.command(name="show-license")
@@ -0,0 +1,180 @@
+"""
+Statistics of a check run in the OpenMetrics text format, e.g. for a textfile collector
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import collections
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from . import exception
+from .progress import Counters
+from .report import CheckReport
+
+PREFIX: str = "pycompatibility"
+# Of the metrics file before the umask, readable by the collectors
+_FILE_MODE: int = 0o644
+
+# Labels, value
+Samples = List[Tuple[Dict[str, str], Union[int, float]]]
+
+
+class BaseMetricsException(exception.BasePyCompatibilityException):
+    pass
+
+
+class MetricsException(
+    exception.PyCompatibilityException, BaseMetricsException
+):
+    pass
+
+
+class WriteMetricsError(ValueError, MetricsException):
+    pass
+
+
+class PhaseTimer:
+    """Durations of consecutive phases, each one ends where the next starts"""
+
+    def __init__(self) -> None:
+        self.durations: Dict[str, float] = {}
+        self._start = time.perf_counter()
+
+    def mark(self, phase: str) -> None:
+        """End `phase` now"""
+        now = time.perf_counter()
+        self.durations[phase] = self.durations.get(phase, 0) + now - self._start
+        self._start = now
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+def _family(
+    name: str,
+    help_text: str,
+    samples: Samples,
+    unit: Optional[str] = None,
+) -> Iterable[str]:
+    yield f"# TYPE {PREFIX}_{name} gauge"
+    if unit is not None:
+        yield f"# UNIT {PREFIX}_{name} {unit}"
+    yield f"# HELP {PREFIX}_{name} {help_text}"
+    for labels, value in samples:
+        label_text = ",".join(
+            f'{key}="{_escape(label)}"' for key, label in sorted(labels.items())
+        )
+        # Counts stay integers, `repr` keeps the precision of durations
+        text = str(value) if isinstance(value, int) else repr(value)
+        yield (
+            f"{PREFIX}_{name}{{{label_text}}} {text}"
+            if label_text
+            else f"{PREFIX}_{name} {text}"
+        )
+
+
+def render(
+    report: CheckReport,
+    counters: Counters,
+    discovered: int,
+    excluded: int,
+    durations: Dict[str, float],
+) -> str:
+    """
+    The metrics of a run, as gauges, since a textfile holds the last run.
+    Files are counted before the archives are opened,
+    so the analyzed and cached files include the members of archives.
+    """
+    files = (
+        ("discovered", discovered),
+        ("excluded", excluded),
+        ("cached", counters.files_cached),
+        ("analyzed", counters.files_analyzed),
+        ("skipped", len(report.skipped)),
+    )
+    rules = collections.Counter(finding.rule for finding in report.findings)
+    lines = [
+        *_family(
+            "files",
+            "Files of the run by outcome",
+            [({"state": state}, count) for state, count in files],
+        ),
+        *_family(
+            "read_bytes", "Bytes read", [({}, counters.bytes_read)], "bytes"
+        ),
+        *_family(
+            "phase_duration_seconds",
+            "Duration of each phase of the run",
+            [
+                ({"phase": phase}, seconds)
+                for phase, seconds in durations.items()
+            ],
+            "seconds",
+        ),
+        *_family(
+            "cache_hit_ratio",
+            "Cache hits out of the cache lookups, absent without lookups",
+            (
+                [({}, counters.cache_hits / counters.cache_lookups)]
+                if counters.cache_lookups
+                else []
+            ),
+            "ratio",
+        ),
+        *_family(
+            "findings",
+            "Findings reported by rule",
+            [({"rule": rule}, count) for rule, count in sorted(rules.items())],
+        ),
+        *_family(
+            "complete",
+            "1 if every file was checked",
+            [({}, int(report.complete))],
+        ),
+        "# EOF",
+    ]
+    return "".join(f"{line}\n" for line in lines)
+
+
+def _umask() -> int:
+    # Only readable by setting it
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+def write_metrics(path: Path, text: str) -> None:
+    """Replace the file atomically, a collector never reads half of it"""
+    try:
+        fd, temp_path = tempfile.mkstemp(
+            dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, mode="w", encoding="UTF-8") as fp:
+                fp.write(text)
+            # `mkstemp` makes it private, collectors may run as another user
+            os.chmod(temp_path, _FILE_MODE & ~_umask())
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+    except OSError as error:
+        raise WriteMetricsError(f"Cannot write metrics to {path}: {error}")
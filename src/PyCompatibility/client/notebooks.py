@@ -0,0 +1,323 @@
+"""
+Code cells of Jupyter notebooks, extracted with a streaming JSON scanner
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import bisect
+import dataclasses
+import json
+import re
+from pathlib import Path
+from typing import (
+    Any,
+    BinaryIO,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from . import exception
+from .analysis import Finding
+from .configuration import NOTEBOOK_SUFFIX
+
+_CHUNK_SIZE: int = 64 * 1024
+_WHITESPACE: bytes = b" \t\r\n"
+# The end of a string or an escape in it
+_STRING_STOP: "re.Pattern[bytes]" = re.compile(rb'["\\]')
+# The bytes changing the depth of a container, and strings that may contain them
+_CONTAINER_STOP: "re.Pattern[bytes]" = re.compile(rb'["{}\[\]]')
+_SCALAR_STOP: "re.Pattern[bytes]" = re.compile(rb"[,}\]\s]")
+# IPython syntax, `%magic`, `!shell`, `?help` and `target = %magic`
+_MAGIC: "re.Pattern[str]" = re.compile(r"^(\s*)(?:[%!?]|\w+\?\s*$)")
+_ASSIGNED_MAGIC: "re.Pattern[str]" = re.compile(r"^(\s*[\w.]+\s*=\s*)[%!].*$")
+# Metadata key: key of the language in it
+_LANGUAGE_KEYS: Dict[str, str] = {
+    "language_info": "name",
+    "kernelspec": "language",
+}
+
+# Line in the extracted source the cell starts at, cell number (1-based)
+CellMap = Tuple[Tuple[int, int], ...]
+
+
+class BaseNotebookException(exception.BasePyCompatibilityException):
+    pass
+
+
+class NotebookException(
+    exception.PyCompatibilityException, BaseNotebookException
+):
+    pass
+
+
+class ReadNotebookError(ValueError, NotebookException):
+    pass
+
+
+@dataclasses.dataclass(frozen=True)
+class Notebook:
+    source: bytes
+    cells: CellMap
+    # None if the notebook does not tell
+    language: Optional[str] = None
+    # Bytes read from the notebook file
+    size: int = 0
+
+
+def is_notebook(path: Path) -> bool:
+    return path.suffix == NOTEBOOK_SUFFIX
+
+
+class _Scanner:
+    """
+    Walk a JSON document chunk by chunk.
+    Skipped values are never decoded, and only the current chunk is kept in memory,
+    unless a value is being read.
+    """
+
+    def __init__(self, fp: BinaryIO, name: str) -> None:
+        self.fp = fp
+        self.name = name
+        self.buffer: bytes = b""
+        self.position: int = 0
+        # Start of the value being read, the buffer is kept from here
+        self.mark: Optional[int] = None
+        self.size: int = 0
+
+    def _error(self, message: str) -> ReadNotebookError:
+        return ReadNotebookError(
+            f"{self.name} is not a valid notebook: {message}"
+        )
+
+    def _fill(self) -> None:
+        chunk = self.fp.read(_CHUNK_SIZE)
+        if not chunk:
+            raise self._error("unexpected end of file")
+        self.size += len(chunk)
+        keep = self.position if self.mark is None else self.mark
+        self.buffer = self.buffer[keep:] + chunk
+        self.position -= keep
+        if self.mark is not None:
+            self.mark = 0
+
+    def _search(self, pattern: "re.Pattern[bytes]") -> "re.Match[bytes]":
+        while (match := pattern.search(self.buffer, self.position)) is None:
+            self.position = len(self.buffer)
+            self._fill()
+        return match
+
+    def peek(self) -> int:
+        """The next byte that is not a whitespace"""
+        while True:
+            while (
+                self.position < len(self.buffer)
+                and self.buffer[self.position] in _WHITESPACE
+            ):
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            self._fill()
+
+    def _expect(self, expected: bytes) -> None:
+        if self.peek() != expected[0]:
+            raise self._error(f"expected {expected.decode()}")
+        self.position += 1
+
+    def _skip_string(self) -> None:
+        self.position += 1
+        while True:
+            match = self._search(_STRING_STOP)
+            self.position = match.end()
+            if match.group() == b'"':
+                return
+            # Skip the escaped byte
+            if self.position >= len(self.buffer):
+                self._fill()
+            self.position += 1
+
+    def _skip_container(self) -> None:
+        depth = 0
+        while True:
+            match = self._search(_CONTAINER_STOP)
+            if match.group() == b'"':
+                self.position = match.start()
+                self._skip_string()
+                continue
+            self.position = match.end()
+            depth += 1 if match.group() in (b"{", b"[") else -1
+            if not depth:
+                return
+
+    def skip_value(self) -> None:
+        first = self.peek()
+        if first == ord('"'):
+            self._skip_string()
+        elif first in b"{[":
+            self._skip_container()
+        else:
+            self.position = self._search(_SCALAR_STOP).start()
+
+    def read_value(self) -> Any:
+        self.peek()
+        self.mark = self.position
+        try:
+            self.skip_value()
+            # `_fill` moves the mark to the start of the buffer
+            start, end = self.mark, self.position
+            raw = self.buffer[start:end]
+        finally:
+            self.mark = None
+        try:
+            return json.loads(raw)
+        except ValueError as error:
+            raise self._error(str(error))
+
+    def _next(self, end: bytes) -> bool:
+        """After an item, whether there is another one"""
+        following = self.peek()
+        self.position += 1
+        if following == end[0]:
+            return False
+        if following != ord(","):
+            raise self._error(f"expected , or {end.decode()}")
+        return True
+
+    def object_keys(self) -> Iterator[str]:
+        """Yield the keys of an object, its value should be read or skipped before the next one"""
+        self._expect(b"{")
+        if self.peek() == ord("}"):
+            self.position += 1
+            return
+        while True:
+            key = self.read_value()
+            if not isinstance(key, str):
+                raise self._error("object key should be a string")
+            self._expect(b":")
+            yield key
+            if not self._next(b"}"):
+                return
+
+    def array_items(self) -> Iterator[None]:
+        """Yield once for each item of an array, it should be read or skipped before the next one"""
+        self._expect(b"[")
+        if self.peek() == ord("]"):
+            self.position += 1
+            return
+        while True:
+            yield None
+            if not self._next(b"]"):
+                return
+
+
+def _python_lines(source: str) -> Optional[List[str]]:
+    """
+    The lines of a cell with IPython syntax replaced, keeping the line numbers.
+    None for a cell magic, e.g. `%%bash`, which is not Python.
+    """
+    lines = source.splitlines()
+    if lines and lines[0].lstrip().startswith("%%"):
+        return None
+    python_lines = []
+    for line in lines:
+        if (match := _ASSIGNED_MAGIC.match(line)) is not None:
+            line = f"{match.group(1)}None"
+        elif (match := _MAGIC.match(line)) is not None:
+            line = f"{match.group(1)}pass"
+        python_lines.append(line)
+    return python_lines
+
+
+def read_notebook(fp: BinaryIO, name: str) -> Notebook:
+    """Extract the code cells of a notebook into one source, like they run in one kernel"""
+    scanner = _Scanner(fp, name)
+    lines: List[str] = []
+    cells: List[Tuple[int, int]] = []
+    language: Optional[str] = None
+    for key in scanner.object_keys():
+        if key == "cells":
+            for number, _ in enumerate(scanner.array_items(), start=1):
+                cell_type: Any = None
+                source: Any = ""
+                for cell_key in scanner.object_keys():
+                    if cell_key == "cell_type":
+                        cell_type = scanner.read_value()
+                    elif cell_key == "source":
+                        source = scanner.read_value()
+                    else:
+                        # Outputs, attachments and metadata
+                        scanner.skip_value()
+                if cell_type != "code":
+                    continue
+                if isinstance(source, list):
+                    source = "".join(str(line) for line in source)
+                if (cell_lines := _python_lines(str(source))) is not None:
+                    cells.append((len(lines) + 1, number))
+                    lines.extend(cell_lines)
+        elif key == "metadata":
+            # May hold large widget states
+            for metadata_key in scanner.object_keys():
+                if metadata_key in _LANGUAGE_KEYS:
+                    value = scanner.read_value()
+                    if isinstance(value, dict) and language is None:
+                        language = value.get(_LANGUAGE_KEYS[metadata_key])
+                else:
+                    scanner.skip_value()
+        else:
+            scanner.skip_value()
+    return Notebook(
+        "".join(f"{line}\n" for line in lines).encode("UTF-8"),
+        tuple(cells),
+        language if isinstance(language, str) else None,
+        scanner.size,
+    )
+
+
+def open_notebook(path: Path) -> Notebook:
+    with open(path, mode="rb") as fp:
+        return read_notebook(fp, str(path))
+
+
+def cell_position(cells: CellMap, line: int) -> Tuple[int, int]:
+    """Line of the extracted source -> cell number, line in the cell"""
+    index = bisect.bisect_right(cells, (line, float("inf"))) - 1
+    if index < 0:
+        return 0, line
+    start, number = cells[index]
+    return number, line - start + 1
+
+
+def cell_path(path: str, cell: int) -> str:
+    return f"{path}:cell_{cell}"
+
+
+def cell_findings(findings: Sequence[Finding], cells: CellMap) -> List[Finding]:
+    """Map the findings in the extracted source of a notebook back to its cells"""
+    mapped = []
+    for finding in findings:
+        if finding.line <= 0:
+            mapped.append(finding)
+            continue
+        number, line = cell_position(cells, finding.line)
+        mapped.append(
+            dataclasses.replace(
+                finding, path=cell_path(finding.path, number), line=line
+            )
+        )
+    return sorted(mapped)
@@ -0,0 +1,649 @@
+"""
+The check pipeline: reads files ahead of the analysis workers with asyncio
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import asyncio
+import concurrent.futures
+import contextlib
+import dataclasses
+import functools
+import hashlib
+import itertools
+import logging
+import multiprocessing
+import multiprocessing.synchronize
+import os
+import threading
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+import importlib_metadata
+
+from . import (
+    analysis,
+    archives,
+    cache,
+    interpreters,
+    log,
+    notebooks,
+    plugins,
+    pragmas,
+    progress,
+    rules,
+    stdlib_table,
+    trees,
+    workers,
+)
+from .analysis import Finding
+from .baseline import filter_known
+from .configuration import (
+    CheckConfiguration,
+    display_path,
+    ParseConfigurationError,
+)
+from .report import CheckReport
+
+LOG: logging.Logger = logging.getLogger("pipeline")
+# Number of paths a reader takes from the paths at once
+_BATCH_SIZE: int = 256
+VERSION: str = importlib_metadata.version("PyCompatibility")
+
+
+@functools.lru_cache(maxsize=None)
+def _analysis_digest() -> str:
+    """
+    Changes with the rules and the analysis, which are edited in development
+    without changing the version of the package
+    """
+    digest = hashlib.sha1(stdlib_table.DATA)
+    digest.update(repr(sorted(rules.SYNTAX_RULES.items())).encode())
+    digest.update(repr(sorted(rules.BUILTIN_GENERICS)).encode())
+    for module in (analysis, interpreters, pragmas, rules):
+        if module.__file__ is None:
+            continue
+        try:
+            digest.update(Path(module.__file__).read_bytes())
+        except OSError:
+            pass
+    return digest.hexdigest()[:16]
+
+
+def _cache_version() -> str:
+    """Cached results are only used by the version, rules and rule plugins producing them"""
+    return f"{VERSION}-{_analysis_digest()}{plugins.cache_key()}"
+
+
+@dataclasses.dataclass(frozen=True)
+class PipelineOptions:
+    # Number of analysis workers, they are processes when it is greater than 1
+    jobs: int = os.cpu_count() or 1
+    # Number of concurrent file readers
+    readers: int = 4
+    # Max number of files read but not analyzed yet, bounds the memory usage
+    prefetch: int = 16
+    # Stop at the first incompatibility and report what is checked so far
+    fail_fast: bool = False
+    # Budget of each file in seconds and bytes, files exceeding it are skipped.
+    # Setting any of them runs the analysis in worker processes.
+    file_timeout: Optional[float] = None
+    file_memory_limit: Optional[int] = None
+    # A worker process is replaced after checking this many files,
+    # or once its RSS exceeds this many bytes, to bound the memory fragmentation.
+    # Setting any of them runs the analysis in worker processes.
+    worker_max_files: Optional[int] = None
+    worker_max_rss: Optional[int] = None
+    # Fingerprints of the known findings, they are left out of the report
+    baseline: FrozenSet[str] = frozenset()
+    # Where the results of archives are cached by their hash, None to disable it
+    archive_cache: Optional[Path] = cache.CACHE_DIRECTORY / "archives"
+    # Where the directory digests and findings are indexed, None to disable it.
+    # The files of a directory unchanged since it was indexed are not checked again.
+    tree_cache: Optional[Path] = None
+    # Interpreters each file is also compiled with, a finding for each one failing
+    verify_with: Tuple[interpreters.Interpreter, ...] = ()
+    # Called with the counters every `progress.INTERVAL` seconds while checking
+    on_progress: Optional[Callable[[progress.Counters], None]] = None
+
+
+@dataclasses.dataclass
+class _Archive:
+    """The results of the members of an archive, cached once all of them are checked"""
+
+    cache_name: str
+    path: str
+    files: int = 0
+    findings: List[Finding] = dataclasses.field(default_factory=list)
+    # Members read but not analyzed yet
+    pending: int = 0
+    read: bool = False
+    # False if any member is skipped or cancelled, then it is not cached
+    complete: bool = True
+
+    def cache_entry(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "version": _cache_version(),
+            "files": self.files,
+            "findings": [finding.serialize() for finding in self.findings],
+        }
+
+    def load(self, entry: Any) -> bool:
+        """Whether the cache entry is of this archive and this version"""
+        if (
+            not isinstance(entry, dict)
+            or entry.get("path") != self.path
+            or entry.get("version") != _cache_version()
+        ):
+            return False
+        try:
+            files = int(entry["files"])
+            findings = [Finding.from_dict(item) for item in entry["findings"]]
+        except (AttributeError, KeyError, TypeError, ValueError):
+            return False
+        self.files, self.findings = files, findings
+        return True
+
+
+def _read_source(path: Path) -> Tuple[bytes, bool]:
+    """The bytes read and whether the header skips the file, only the header is read then"""
+    with open(path, mode="rb") as fp:
+        head = fp.read(pragmas.HEADER_SIZE)
+        if pragmas.skips_file(head):
+            return head, True
+        return head + fp.read(), False
+
+
+def _uses_processes(options: PipelineOptions) -> bool:
+    return (
+        options.jobs > 1
+        or options.file_timeout is not None
+        or options.file_memory_limit is not None
+        or options.worker_max_files is not None
+        or options.worker_max_rss is not None
+    )
+
+
+def _workers(
+    options: PipelineOptions,
+    cancel_event: multiprocessing.synchronize.Event,
+) -> List[Union[workers.ThreadWorker, workers.ProcessWorker]]:
+    if (
+        options.file_memory_limit is not None
+        and not workers.MEMORY_LIMIT_SUPPORTED
+    ):
+        LOG.warning("File memory limit is not supported on this platform")
+    if options.worker_max_rss is not None and not workers.RSS_SUPPORTED:
+        LOG.warning("Worker max RSS is not supported on this platform")
+    if not _uses_processes(options):
+        # Still overlaps with the readers, the GIL is released while reading
+        return [workers.ThreadWorker(cancel_event)]
+    return [
+        workers.ProcessWorker(
+            cancel_event,
+            options.file_timeout,
+            options.file_memory_limit,
+            options.worker_max_files,
+            options.worker_max_rss,
+        )
+        for _ in range(options.jobs)
+    ]
+
+
+async def _check(
+    paths: Iterator[Path],
+    min_version: int,
+    max_version: int,
+    options: PipelineOptions,
+    counters: progress.Counters,
+    results: Optional[trees.Results] = None,
+) -> CheckReport:
+    """`results` gets the findings of each recorded path before the baseline if given"""
+    loop = asyncio.get_running_loop()
+    report = CheckReport(min_version, max_version)
+    # Readers block on `put` when the analysis workers are behind
+    queue: (
+        "asyncio.Queue[Optional[Tuple[workers.Task, Optional[_Archive]]]]"
+    ) = asyncio.Queue(maxsize=options.prefetch)
+    cancel_event = multiprocessing.Event()
+    stack = contextlib.ExitStack()
+    analysis_workers = _workers(options, cancel_event)
+    paths_lock = threading.Lock()
+    # Up to as many processes as analysis workers for each interpreter
+    pools = interpreters.start_pools(
+        list(options.verify_with), len(analysis_workers), options.file_timeout
+    )
+    for pool in pools:
+        stack.callback(pool.close)
+    verify_executor = stack.enter_context(
+        concurrent.futures.ThreadPoolExecutor(
+            max_workers=len(analysis_workers) * max(len(pools), 1)
+        )
+    )
+    # Archives verified by other interpreters are cached apart, the rule plugins
+    # are part of the cache version
+    cache_suffix = "".join(f"-3.{pool.interpreter.version}" for pool in pools)
+
+    def record(path: str, files: int, findings: List[Finding]) -> None:
+        if results is not None:
+            recorded_files, recorded_findings = results.get(path, (0, []))
+            results[path] = (
+                recorded_files + files,
+                recorded_findings + findings,
+            )
+        findings, known = filter_known(findings, options.baseline)
+        report.suppressed += known
+        report.findings.extend(findings)
+        report.files += files
+        if findings and options.fail_fast and not cancel_event.is_set():
+            LOG.info(f"Incompatibility found in {path}, stopping the check")
+            report.complete = False
+            cancel_event.set()
+
+    def finish(archive: _Archive) -> None:
+        if not archive.read or archive.pending:
+            return
+        counters.done += 1
+        if archive.complete and options.archive_cache is not None:
+            cache.store(
+                archive.cache_name, archive.cache_entry(), options.archive_cache
+            )
+
+    # Analysis threads either analyze or wait for a worker process
+    with stack, concurrent.futures.ThreadPoolExecutor(
+        max_workers=options.readers
+    ) as io_executor, concurrent.futures.ThreadPoolExecutor(
+        max_workers=len(analysis_workers)
+    ) as analysis_executor:
+
+        async def read_archive(path: Path, data: bytes) -> None:
+            display = display_path(path)
+            digest = await loop.run_in_executor(
+                io_executor, lambda: hashlib.sha256(data).hexdigest()
+            )
+            archive = _Archive(
+                f"{digest}-{min_version}-{max_version}{cache_suffix}", display
+            )
+            if options.archive_cache is not None:
+                counters.cache_lookups += 1
+                if archive.load(
+                    cache.load(archive.cache_name, options.archive_cache)
+                ):
+                    LOG.debug(f"Using the cached results of {path}")
+                    record(display, archive.files, archive.findings)
+                    counters.done += 1
+                    counters.cache_hits += 1
+                    counters.files_cached += archive.files
+                    return
+            members = archives.members(data, path.name)
+            try:
+                while not cancel_event.is_set():
+                    # Decompressed in a thread, one member at a time
+                    member = await loop.run_in_executor(
+                        io_executor, next, members, None
+                    )
+                    if member is None:
+                        break
+                    name, member_data = member
+                    archive.pending += 1
+                    await queue.put(
+                        (
+                            workers.Task(
+                                member_data,
+                                f"{display}/{name}",
+                                min_version,
+                                max_version,
+                            ),
+                            archive,
+                        )
+                    )
+            except archives.ReadArchiveError as error:
+                LOG.error(str(error), extra=log.per_file("Cannot read"))
+                report.skipped[display] = str(error)
+                archive.complete = False
+            if cancel_event.is_set():
+                archive.complete = False
+            archive.read = True
+            finish(archive)
+
+        async def read_notebook(path: Path) -> None:
+            display = display_path(path)
+            try:
+                # Streamed in a thread, the outputs are skipped unparsed
+                notebook = await loop.run_in_executor(
+                    io_executor, notebooks.open_notebook, path
+                )
+            except OSError as error:
+                LOG.error(
+                    f"Cannot read {path}: {error}",
+                    extra=log.per_file("Cannot read"),
+                )
+                report.skipped[display] = str(error)
+                counters.done += 1
+                return
+            except notebooks.ReadNotebookError as error:
+                LOG.error(str(error), extra=log.per_file("Cannot read"))
+                report.skipped[display] = str(error)
+                counters.done += 1
+                return
+            counters.bytes_read += notebook.size
+            if notebook.language not in (None, "python"):
+                LOG.info(f"Skipped {display}: a {notebook.language} notebook")
+                report.skipped[display] = f"{notebook.language} notebook"
+                counters.done += 1
+                return
+            await queue.put(
+                (
+                    workers.Task(
+                        notebook.source,
+                        display,
+                        min_version,
+                        max_version,
+                        notebook.cells,
+                    ),
+                    None,
+                )
+            )
+
+        async def read_path(path: Path) -> None:
+            if notebooks.is_notebook(path):
+                await read_notebook(path)
+                return
+            try:
+                if archives.is_archive(path):
+                    data = await loop.run_in_executor(
+                        io_executor, path.read_bytes
+                    )
+                    skipped = False
+                else:
+                    data, skipped = await loop.run_in_executor(
+                        io_executor, _read_source, path
+                    )
+            except OSError as error:
+                LOG.error(
+                    f"Cannot read {path}: {error}",
+                    extra=log.per_file("Cannot read"),
+                )
+                report.skipped[display_path(path)] = str(error)
+                counters.done += 1
+                return
+            counters.bytes_read += len(data)
+            if archives.is_archive(path):
+                await read_archive(path, data)
+                return
+            if skipped:
+                LOG.debug(f"Skipped {path}: `compat: skip-file`")
+                # Checked, with nothing to report
+                record(display_path(path), 0, [])
+                counters.done += 1
+                return
+            await queue.put(
+                (
+                    workers.Task(
+                        data, display_path(path), min_version, max_version
+                    ),
+                    None,
+                )
+            )
+
+        def next_batch() -> List[Path]:
+            # The iterator is shared by all readers, each path is read once
+            with paths_lock:
+                return list(itertools.islice(paths, _BATCH_SIZE))
+
+        async def read() -> None:
+            while not cancel_event.is_set():
+                # The paths may come from a pipe, which is only read in a thread
+                batch = await loop.run_in_executor(io_executor, next_batch)
+                if not batch:
+                    return
+                for path in batch:
+                    if cancel_event.is_set():
+                        return
+                    await read_path(path)
+
+        async def analyze(
+            worker: Union[workers.ThreadWorker, workers.ProcessWorker],
+        ) -> None:
+            while (item := await queue.get()) is not None:
+                task, archive = item
+                findings: Optional[List[Finding]] = None
+                try:
+                    if cancel_event.is_set():
+                        # Keep draining so that no reader is blocked on `put`
+                        continue
+                    findings = await loop.run_in_executor(
+                        analysis_executor, worker.analyze, task
+                    )
+                    if findings is not None and pools:
+                        # Compiled by all interpreters at once
+                        for verified_findings in await asyncio.gather(
+                            *(
+                                loop.run_in_executor(
+                                    verify_executor,
+                                    pool.verify,
+                                    task.path,
+                                    task.data,
+                                    task.cells,
+                                )
+                                for pool in pools
+                            )
+                        ):
+                            findings.extend(verified_findings)
+                except workers.BudgetExceeded as error:
+                    LOG.warning(
+                        f"Skipped {task.path}: budget exceeded: {error}",
+                        extra=log.per_file("Budget exceeded"),
+                    )
+                    report.skipped[task.path] = f"budget exceeded: {error}"
+                except interpreters.VerifyError as error:
+                    # Not a finding, the source may well compile
+                    findings = None
+                    LOG.warning(
+                        f"Skipped {task.path}: {error}",
+                        extra=log.per_file("Not verified"),
+                    )
+                    report.skipped[task.path] = str(error)
+                finally:
+                    if archive is None:
+                        counters.done += 1
+                    else:
+                        archive.pending -= 1
+                        if findings is None:
+                            archive.complete = False
+                        else:
+                            archive.files += 1
+                            archive.findings.extend(findings)
+                        finish(archive)
+                if findings is not None:
+                    counters.files_analyzed += 1
+                    record(task.path, 1, findings)
+
+        readers = [
+            asyncio.ensure_future(read()) for _ in range(options.readers)
+        ]
+        analyzers = [
+            asyncio.ensure_future(analyze(worker))
+            for worker in analysis_workers
+        ]
+
+        async def produce() -> None:
+            await asyncio.gather(*readers)
+            for _ in analyzers:
+                await queue.put(None)
+
+        async def report_progress(
+            callback: Callable[[progress.Counters], None],
+        ) -> None:
+            # Rendered from the counters, nothing is done per file
+            while True:
+                callback(counters)
+                await asyncio.sleep(progress.INTERVAL)
+
+        reporters = (
+            [asyncio.ensure_future(report_progress(options.on_progress))]
+            if options.on_progress is not None
+            else []
+        )
+        try:
+            # A failing analyzer must not leave the readers blocked on `put`
+            await asyncio.gather(produce(), *analyzers)
+        finally:
+            for future in (*readers, *analyzers, *reporters):
+                future.cancel()
+            for worker in analysis_workers:
+                worker.close()
+
+    report.findings.sort()
+    return report
+
+
+def _counted(
+    paths: Iterable[Path], counters: progress.Counters
+) -> Iterator[Path]:
+    for path in paths:
+        counters.total += 1
+        yield path
+
+
+def _check_trees(
+    include: Set[Path],
+    min_version: int,
+    max_version: int,
+    options: PipelineOptions,
+    counters: progress.Counters,
+) -> CheckReport:
+    """Reuse the findings of the unchanged directories, and index the others once checked"""
+    assert options.tree_cache is not None
+    # Files are stat-ed but not read, an edited file changes the digests up to the root
+    digests = trees.directory_digests(include)
+    verified = "".join(
+        f"-3.{interpreter.version}" for interpreter in options.verify_with
+    )
+    cache_name = f"trees-{min_version}-{max_version}{verified}"
+    index = trees.TreeIndex.load(
+        cache.load(cache_name, options.tree_cache), _cache_version()
+    )
+    reused = index.unchanged(digests)
+    checked = {path for path in include if reused.isdisjoint(path.parents)}
+    reused_files, reused_findings = index.findings(digests, reused)
+    # Each directory is a lookup, hit if it is in an unchanged subtree
+    counters.cache_lookups += len(digests)
+    counters.cache_hits += sum(
+        1
+        for directory in digests
+        if directory in reused or not reused.isdisjoint(directory.parents)
+    )
+    findings, known = filter_known(reused_findings, options.baseline)
+    counters.done += len(include) - len(checked)
+    counters.files_cached += reused_files
+    if reused:
+        LOG.debug(
+            f"Using the indexed results of {len(include) - len(checked)} "
+            f"unchanged files"
+        )
+    results: trees.Results = {}
+    if findings and options.fail_fast:
+        LOG.info(
+            "Incompatibility found in an unchanged file, stopping the check"
+        )
+        report = CheckReport(min_version, max_version, complete=False)
+    else:
+        report = asyncio.run(
+            _check(
+                iter(sorted(checked)),
+                min_version,
+                max_version,
+                options,
+                counters,
+                results,
+            )
+        )
+    report.findings = sorted([*report.findings, *findings])
+    report.files += reused_files
+    report.suppressed += known
+    if report.complete:
+        index.update(
+            digests,
+            reused,
+            checked,
+            results,
+            report.skipped,
+            {display_path(path): path for path in checked},
+            (
+                Path(os.path.commonpath([path.parent for path in include]))
+                if include
+                else None
+            ),
+        )
+        cache.store(cache_name, index.cache_entry(), options.tree_cache)
+    return report
+
+
+def check(
+    configuration: CheckConfiguration,
+    options: PipelineOptions = PipelineOptions(),
+    counters: Optional[progress.Counters] = None,
+    paths: Optional[Iterable[Path]] = None,
+) -> CheckReport:
+    """
+    Check the files of a resolved configuration, or `paths` if given,
+    which are read as the check goes and counted into the total.
+    `counters` are updated as the files are done if given.
+    The tree cache is only used for the resolved configuration.
+    """
+    if configuration.min_version is None or configuration.max_version is None:
+        raise ParseConfigurationError("No min and/or max version specified!")
+    if counters is None:
+        counters = progress.Counters(
+            0 if paths is not None else len(configuration.include)
+        )
+    # Files that cannot be read are counted instead of listed past the first ones
+    with log.aggregate_errors(LOG):
+        if paths is None and options.tree_cache is not None:
+            return _check_trees(
+                configuration.include,
+                configuration.min_version,
+                configuration.max_version,
+                options,
+                counters,
+            )
+        return asyncio.run(
+            _check(
+                (
+                    iter(sorted(configuration.include))
+                    if paths is None
+                    else _counted(paths, counters)
+                ),
+                configuration.min_version,
+                configuration.max_version,
+                options,
+                counters,
+            )
+        )
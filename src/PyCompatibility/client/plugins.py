@@ -0,0 +1,176 @@
+"""
+Third-party rules registered in the `PyCompatibility.rules` entry-point group
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import ast
+import dataclasses
+import functools
+import hashlib
+import logging
+import re
+from typing import (
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TYPE_CHECKING,
+)
+
+from . import exception
+
+if TYPE_CHECKING:
+    # TODO: Use importlib.metadata instead of importlib_metadata after EOL: Python 3.11
+    import importlib_metadata
+
+LOG: logging.Logger = logging.getLogger("plugins")
+ENTRY_POINT_GROUP: str = "PyCompatibility.rules"
+# `name@3.X-3.Y`, either bound may be left out
+_VERSIONS: "re.Pattern[str]" = re.compile(r"^(?:3\.(\d+))?-(?:3\.(\d+))?$")
+
+
+class BasePluginException(exception.BasePyCompatibilityException):
+    pass
+
+
+class PluginException(exception.PyCompatibilityException, BasePluginException):
+    pass
+
+
+class ParsePluginNameError(ValueError, PluginException):
+    pass
+
+
+@dataclasses.dataclass(frozen=True)
+class RulePlugin:
+    """
+    A third-party rule, the object of an entry point is one or a sequence of them.
+    `check` is called with each node of `node_types`, including their subclasses,
+    and the min and max versions, and returns the message of a finding or None.
+    """
+
+    name: str
+    node_types: Tuple[Type[ast.AST], ...]
+    check: Callable[[ast.AST, int, int], Optional[str]]
+
+
+def parse_name(name: str) -> Tuple[str, Optional[int], Optional[int]]:
+    """
+    The rule and the first and last minor versions of an entry point name,
+    e.g. `banned-backports@3.8-3.12`, without versions a rule applies to all of them
+    """
+    rule, separator, versions = name.partition("@")
+    if not separator:
+        return rule, None, None
+    match = _VERSIONS.match(versions)
+    if not rule or match is None:
+        raise ParsePluginNameError(
+            f"Rule plugin {name!r} should be named `rule@3.X-3.Y`"
+        )
+    first, last = (
+        None if group is None else int(group) for group in match.groups()
+    )
+    return rule, first, last
+
+
+@functools.lru_cache(maxsize=None)
+def _entry_points() -> Tuple["importlib_metadata.EntryPoint", ...]:
+    """Listed once per process, without importing them"""
+    # Imported on the first check, it is slow to import for the other commands
+    import importlib_metadata
+
+    return tuple(importlib_metadata.entry_points(group=ENTRY_POINT_GROUP))
+
+
+def cache_key() -> str:
+    """A suffix of cache names changing with the installed rule plugins, empty without any"""
+    entry_points = sorted(_entry_points(), key=lambda entry: entry.name)
+    if not entry_points:
+        return ""
+    digest = hashlib.sha1()
+    for entry_point in entry_points:
+        version = "" if entry_point.dist is None else entry_point.dist.version
+        digest.update(
+            f"{entry_point.name}={entry_point.value}@{version}\n".encode()
+        )
+    return f"-{digest.hexdigest()[:16]}"
+
+
+def _load(entry_point: "importlib_metadata.EntryPoint") -> List[RulePlugin]:
+    try:
+        loaded = entry_point.load()
+    except Exception as error:
+        LOG.warning(f"Cannot load rule plugin {entry_point.name}: {error}")
+        return []
+    plugins = list(loaded) if isinstance(loaded, Sequence) else [loaded]
+    if not all(isinstance(plugin, RulePlugin) for plugin in plugins):
+        LOG.warning(
+            f"Ignored rule plugin {entry_point.name}: "
+            f"{entry_point.value} is not a RulePlugin"
+        )
+        return []
+    return plugins
+
+
+@functools.lru_cache(maxsize=None)
+def load_plugins(min_version: int, max_version: int) -> Tuple[RulePlugin, ...]:
+    """
+    The plugins applying to part of the version range, once per process and range.
+    The entry points of other versions are not imported.
+    """
+    plugins: List[RulePlugin] = []
+    for entry_point in _entry_points():
+        try:
+            _, first, last = parse_name(entry_point.name)
+        except ParsePluginNameError as error:
+            LOG.warning(str(error))
+            continue
+        if (first is not None and first > max_version) or (
+            last is not None and last < min_version
+        ):
+            continue
+        plugins.extend(_load(entry_point))
+    return tuple(plugins)
+
+
+class Dispatcher:
+    """The plugins of each node type, resolved once per type"""
+
+    def __init__(self, plugins: Sequence[RulePlugin]) -> None:
+        self.plugins = plugins
+        self._by_type: Dict[Type[ast.AST], Tuple[RulePlugin, ...]] = {}
+
+    def plugins_for(self, node_type: Type[ast.AST]) -> Tuple[RulePlugin, ...]:
+        plugins = self._by_type.get(node_type)
+        if plugins is None:
+            plugins = tuple(
+                plugin
+                for plugin in self.plugins
+                if issubclass(node_type, plugin.node_types)
+            )
+            self._by_type[node_type] = plugins
+        return plugins
+
+
+@functools.lru_cache(maxsize=None)
+def dispatcher(min_version: int, max_version: int) -> Optional[Dispatcher]:
+    """None without plugins, so nodes are not dispatched at all"""
+    plugins = load_plugins(min_version, max_version)
+    return Dispatcher(plugins) if plugins else None
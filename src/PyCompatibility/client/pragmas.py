@@ -0,0 +1,83 @@
+"""
+The `# compat: ignore[rule]` and `# compat: skip-file` comments of a source
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import codecs
+import io
+import re
+import tokenize
+from typing import Dict, FrozenSet, Optional
+
+# Bytes of a file searched for `skip-file`, the rest is not read if it is found
+HEADER_SIZE: int = 4096
+# Sources without it are not tokenized
+_MARKER: bytes = b"compat:"
+_SKIP_FILE: "re.Pattern[bytes]" = re.compile(rb"#\s*compat:\s*skip-file\b")
+_IGNORE: "re.Pattern[str]" = re.compile(
+    r"#\s*compat:\s*ignore(?:\[([^\]]*)\])?"
+)
+
+# Line: rules ignored on it, None for all of them
+IgnoreTable = Dict[int, Optional[FrozenSet[str]]]
+
+
+def skips_file(head: bytes) -> bool:
+    """Whether the comments leading the source, in its first `HEADER_SIZE` bytes, skip it"""
+    start = len(codecs.BOM_UTF8) if head.startswith(codecs.BOM_UTF8) else 0
+    for line in head[start:HEADER_SIZE].splitlines():
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if not stripped.startswith(b"#"):
+            return False
+        if _SKIP_FILE.search(stripped) is not None:
+            return True
+    return False
+
+
+def ignore_table(source: bytes) -> IgnoreTable:
+    """The `ignore` comments of each line, in one pass over the comment tokens"""
+    table: IgnoreTable = {}
+    if _MARKER not in source:
+        return table
+    try:
+        for token in tokenize.tokenize(io.BytesIO(source).readline):
+            if token.type != tokenize.COMMENT:
+                continue
+            match = _IGNORE.search(token.string)
+            if match is None:
+                continue
+            rules = match.group(1)
+            table[token.start[0]] = (
+                None
+                if rules is None
+                else frozenset(
+                    rule.strip() for rule in rules.split(",") if rule.strip()
+                )
+            )
+    except (SyntaxError, ValueError, tokenize.TokenError):
+        # Keep the comments before the error, the analysis reports it
+        pass
+    return table
+
+
+def ignored(table: IgnoreTable, line: int, rule: str) -> bool:
+    if line not in table:
+        return False
+    rules = table[line]
+    return rules is None or rule in rules
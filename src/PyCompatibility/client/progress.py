@@ -0,0 +1,123 @@
+"""
+Progress and throughput of a check, rendered at a bounded rate
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import dataclasses
+import logging
+import sys
+import time
+from typing import Optional, TextIO
+
+from . import log
+
+LOG: logging.Logger = logging.getLogger("progress")
+# Seconds between two renders on a terminal, where the line is rewritten
+INTERVAL: float = 0.25
+# Seconds between two logged lines, when the stream is not a terminal
+LOG_INTERVAL: float = 10.0
+_CLEAR_LINE: str = "\033[K"
+
+
+@dataclasses.dataclass
+class Counters:
+    """
+    Aggregated by the pipeline as the workers return their results,
+    a file is done once it is analyzed, skipped or found in the cache
+    """
+
+    total: int
+    done: int = 0
+    bytes_read: int = 0
+    started: float = dataclasses.field(default_factory=time.monotonic)
+    # Files, including the members of archives, analyzed or found in the cache
+    files_analyzed: int = 0
+    files_cached: int = 0
+    cache_lookups: int = 0
+    cache_hits: int = 0
+
+
+def _duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}:{minutes:02}:{seconds:02}"
+    return f"{minutes}:{seconds:02}"
+
+
+def render(counters: Counters, now: float) -> str:
+    """`done/total files, files/s, MB/s, ETA`"""
+    elapsed = max(now - counters.started, 1e-9)
+    files_rate = counters.done / elapsed
+    eta = (
+        _duration((counters.total - counters.done) / files_rate)
+        if files_rate
+        else "-:--"
+    )
+    return (
+        f"{counters.done}/{counters.total} files, "
+        f"{files_rate:.1f} files/s, "
+        f"{counters.bytes_read / elapsed / 1e6:.1f} MB/s, "
+        f"ETA {eta}"
+    )
+
+
+class ProgressReporter:
+    """
+    Render the counters with the log handlers, whatever the log level is.
+    A terminal line is rewritten in place, otherwise a line is written every `LOG_INTERVAL`,
+    so that the progress never floods a CI log.
+    """
+
+    def __init__(
+        self, stream: TextIO = sys.stderr, enable_color: bool = True
+    ) -> None:
+        self.stream = stream
+        self.terminal = stream.isatty()
+        self.handler: logging.StreamHandler = (  # type: ignore[type-arg]
+            log.ColoredStreamHandler(stream=stream)
+            if enable_color and log.color_support
+            else log.FormattedStreamHandler(stream=stream)
+        )
+        self._last_written: Optional[float] = None
+
+    def _record(self, counters: Counters, now: float) -> logging.LogRecord:
+        return LOG.makeRecord(
+            LOG.name, logging.INFO, __file__, 0, render(counters, now), (), None
+        )
+
+    def __call__(self, counters: Counters) -> None:
+        now = time.monotonic()
+        if self.terminal:
+            line = self.handler.format(self._record(counters, now))
+            self.stream.write(f"\r{line}{_CLEAR_LINE}")
+            self.stream.flush()
+        elif (
+            self._last_written is None
+            or now - self._last_written >= LOG_INTERVAL
+        ):
+            self._last_written = now
+            self.handler.emit(self._record(counters, now))
+
+    def close(self, counters: Counters) -> None:
+        """Render the final counters"""
+        if self.terminal:
+            self(counters)
+            self.stream.write("\n")
+            self.stream.flush()
+        else:
+            self.handler.emit(self._record(counters, time.monotonic()))
@@ -0,0 +1,233 @@
+"""
+The import graph of the checked files, to only check what is reachable from entry points
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import ast
+import collections
+import dataclasses
+import logging
+from pathlib import Path
+from typing import Deque, Dict, Iterable, Iterator, List, Set, Tuple
+
+from . import archives, exception, log, notebooks
+from .configuration import CheckConfiguration
+
+LOG: logging.Logger = logging.getLogger("reachability")
+
+
+class BaseReachabilityException(exception.BasePyCompatibilityException):
+    pass
+
+
+class ReachabilityException(
+    exception.PyCompatibilityException, BaseReachabilityException
+):
+    pass
+
+
+class UnknownEntryPointError(ValueError, ReachabilityException):
+    pass
+
+
+def entry_point_module(entry_point: str) -> str:
+    """`module:func` -> "module", the module defining an entry point"""
+    return entry_point.partition(":")[0].strip()
+
+
+def module_names(paths: Iterable[Path]) -> Dict[str, Path]:
+    """
+    Module name: path, a file is in the package of its directory
+    as long as the directory has an `__init__.py`.
+    As the directories above may be namespace packages, a module is also named
+    after them, e.g. `src/namespace/module.py` is also `namespace.module` and `src.namespace.module`.
+    When files share a name, the least nested one wins,
+    and a `.py` file takes precedence over a `.pyi` stub.
+    """
+    packages: Dict[Path, List[str]] = {}
+
+    def package(directory: Path) -> List[str]:
+        if directory not in packages:
+            packages[directory] = (
+                [*package(directory.parent), directory.name]
+                if (directory / "__init__.py").is_file()
+                and directory.parent != directory
+                else []
+            )
+        return packages[directory]
+
+    # Name, path
+    candidates: List[Tuple[str, Path]] = []
+    for path in paths:
+        parts = package(path.parent)
+        if path.stem != "__init__":
+            parts = [*parts, path.stem]
+        if not parts:
+            continue
+        candidates.append((".".join(parts), path))
+        directory = path.parents[len(parts) - (path.stem != "__init__")]
+        while directory.name.isidentifier():
+            parts = [directory.name, *parts]
+            candidates.append((".".join(parts), path))
+            directory = directory.parent
+
+    modules: Dict[str, Path] = {}
+    # `.pyi` sorts after `.py`
+    for name, path in sorted(
+        candidates, key=lambda candidate: (len(candidate[1].parts), candidate)
+    ):
+        if name in modules:
+            LOG.debug(f"{path} is shadowed by {modules[name]} as {name}")
+            continue
+        modules[name] = path
+    return modules
+
+
+def _import_statements(source: bytes) -> Iterator[bytes]:
+    """
+    The import statements of a source, without parsing the rest of it.
+    A statement is a line starting with `import` or `from` out of a triple-quoted string,
+    joined with its continuation lines.
+    """
+    lines = iter(source.splitlines())
+    # The quote of the triple-quoted string the line is in
+    string_quote = b""
+    for line in lines:
+        if string_quote:
+            if line.count(string_quote) % 2:
+                string_quote = b""
+            continue
+        for quote in (b'"""', b"'''"):
+            if line.count(quote) % 2:
+                string_quote = quote
+        stripped = line.lstrip()
+        if not stripped.startswith((b"import", b"from")):
+            continue
+        statement = [stripped]
+        while statement[-1].rstrip().endswith(b"\\") or (
+            b"(" in stripped and b")" not in statement[-1]
+        ):
+            try:
+                statement.append(next(lines))
+            except StopIteration:
+                break
+        yield b"\n".join(statement)
+
+
+def imported_modules(source: bytes, module: str, is_package: bool) -> Set[str]:
+    """
+    The modules a module may import, including the parent packages,
+    and the names imported from a package, which may be submodules
+    """
+    imported: Set[str] = set()
+    # Relative imports are resolved from this package
+    package = module.split(".") if is_package else module.split(".")[:-1]
+    for statement in _import_statements(source):
+        try:
+            tree = ast.parse(statement)
+        except (SyntaxError, ValueError):
+            # E.g. a line of a docstring starting with `from`
+            continue
+        for node in tree.body:
+            names: List[str] = []
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom):
+                base = node.module or ""
+                if node.level:
+                    if node.level - 1 > len(package):
+                        continue
+                    parent = package[: len(package) - (node.level - 1)]
+                    base = ".".join(part for part in (*parent, base) if part)
+                if not base:
+                    continue
+                names = [base]
+                names.extend(
+                    f"{base}.{alias.name}"
+                    for alias in node.names
+                    if alias.name != "*"
+                )
+            for name in names:
+                parts = name.split(".")
+                imported.update(
+                    ".".join(parts[:index])
+                    for index in range(1, len(parts) + 1)
+                )
+    return imported
+
+
+def reachable(
+    configuration: CheckConfiguration, entry_modules: Iterable[str]
+) -> CheckConfiguration:
+    """
+    Keep the resolved files reachable through imports from the entry modules.
+    Only the reached files are read, and only their import statements are parsed.
+    """
+    # Archives and notebooks are not part of the import graph of the sources
+    included_archives = {
+        path
+        for path in configuration.include
+        if archives.is_archive(path) or notebooks.is_notebook(path)
+    }
+    modules = module_names(configuration.include - included_archives)
+    queue: Deque[str] = collections.deque()
+    for entry_module in entry_modules:
+        exception.assert_exc(
+            entry_module in modules,
+            UnknownEntryPointError(
+                f"Entry module {entry_module} is not in the checked files"
+            ),
+        )
+        # Importing a module runs its parent packages first
+        parts = entry_module.split(".")
+        queue.extend(
+            name
+            for name in (
+                ".".join(parts[:index]) for index in range(1, len(parts) + 1)
+            )
+            if name in modules and name not in queue
+        )
+    reached: Set[str] = set(queue)
+    # A module may be reached by more than one name, it is read once
+    read: Set[Path] = set()
+    with log.aggregate_errors(LOG):
+        while queue:
+            module = queue.popleft()
+            path = modules[module]
+            if path in read:
+                continue
+            read.add(path)
+            try:
+                source = path.read_bytes()
+            except OSError as error:
+                # The check reports it again
+                LOG.error(
+                    f"Cannot read {path}: {error}",
+                    extra=log.per_file("Cannot read"),
+                )
+                continue
+            for name in imported_modules(
+                source, module, path.stem == "__init__"
+            ):
+                if name in modules and name not in reached:
+                    reached.add(name)
+                    queue.append(name)
+    LOG.info(
+        f"{len(read)} of {len(configuration.include - included_archives)} "
+        "files are reachable from the entry points"
+    )
+    return dataclasses.replace(configuration, include=read | included_archives)
@@ -0,0 +1,259 @@
+"""
+Defines the check report, its JSON/NDJSON output and the merge of reports
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import collections
+import dataclasses
+import heapq
+import json
+from pathlib import Path
+from typing import (
+    Any,
+    Counter,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    TextIO,
+)
+
+from . import exception
+from .analysis import Finding
+
+# Reports written to files with these suffixes are NDJSON
+NDJSON_SUFFIXES: Sequence[str] = (".ndjson", ".jsonl")
+
+
+class BaseReportException(exception.BasePyCompatibilityException):
+    pass
+
+
+class ReportException(exception.PyCompatibilityException, BaseReportException):
+    pass
+
+
+class ReadReportError(ValueError, ReportException):
+    pass
+
+
+class MergeReportError(ValueError, ReportException):
+    pass
+
+
+@dataclasses.dataclass
+class CheckReport:
+    min_version: int
+    max_version: int
+    findings: List[Finding] = dataclasses.field(default_factory=list)
+    files: int = 0
+    # False if the check stopped before all files are checked
+    complete: bool = True
+    # Path: reason, files that are not checked
+    skipped: Dict[str, str] = dataclasses.field(default_factory=dict)
+    # Number of findings left out as they are in the baseline
+    suppressed: int = 0
+
+
+def is_ndjson(path: Optional[Path]) -> bool:
+    return path is not None and path.suffix in NDJSON_SUFFIXES
+
+
+class ReportWriter:
+    """
+    Write a report finding by finding, the summary is written at the end.
+
+    A JSON report has one finding per line. An NDJSON report has a header line,
+    one line per finding and a summary line.
+    Either can be read back line by line no matter how large it is.
+    """
+
+    def __init__(
+        self,
+        fp: TextIO,
+        min_version: int,
+        max_version: int,
+        ndjson: bool = False,
+    ) -> None:
+        self.fp = fp
+        self.ndjson = ndjson
+        self.findings: int = 0
+        self.rules: Counter[str] = collections.Counter()
+        if ndjson:
+            header = {"max_version": max_version, "min_version": min_version}
+            fp.write(f"{json.dumps(header, sort_keys=True)}\n")
+        else:
+            fp.write("{\n")
+            fp.write(f'    "min_version": {json.dumps(min_version)},\n')
+            fp.write(f'    "max_version": {json.dumps(max_version)},\n')
+            fp.write('    "findings": [')
+
+    def write(self, finding: Finding) -> None:
+        line = json.dumps(finding.serialize(), sort_keys=True)
+        if self.ndjson:
+            self.fp.write(f"{line}\n")
+        else:
+            self.fp.write(f"{',' if self.findings else ''}\n        {line}")
+        self.findings += 1
+        self.rules[finding.rule] += 1
+
+    def close(
+        self, files: int, complete: bool, skipped: Dict[str, str]
+    ) -> None:
+        summary = {
+            "complete": complete,
+            "files": files,
+            "findings": self.findings,
+            "skipped": len(skipped),
+            "rules": dict(sorted(self.rules.items())),
+        }
+        if self.ndjson:
+            tail = {"skipped": skipped, "summary": summary}
+            self.fp.write(f"{json.dumps(tail, sort_keys=True)}\n")
+            return
+        self.fp.write("\n    ],\n" if self.findings else "],\n")
+        self.fp.write(
+            f'    "skipped": {json.dumps(skipped, sort_keys=True)},\n'
+        )
+        self.fp.write(f'    "summary": {json.dumps(summary, sort_keys=True)}\n')
+        self.fp.write("}\n")
+
+
+def write_report(report: CheckReport, fp: TextIO, ndjson: bool = False) -> None:
+    writer = ReportWriter(fp, report.min_version, report.max_version, ndjson)
+    for finding in sorted(report.findings):
+        writer.write(finding)
+    writer.close(report.files, report.complete, report.skipped)
+
+
+def _load_line(line: str, name: str) -> Dict[str, Any]:
+    """Load a line of a report, in the form of `{...}` or `"key": value`"""
+    line = line.strip().rstrip(",")
+    try:
+        loaded = json.loads(line if line.startswith("{") else f"{{{line}}}")
+    except json.JSONDecodeError as error:
+        raise ReadReportError(
+            f"{name} is not a PyCompatibility report: {error}"
+        )
+    if not isinstance(loaded, dict):
+        raise ReadReportError(f"{name} is not a PyCompatibility report")
+    return loaded
+
+
+class ReportReader:
+    """
+    Read a report written by `ReportWriter` line by line.
+    `files`, `complete` and `skipped` are read after `findings` is exhausted.
+    """
+
+    def __init__(self, fp: TextIO, name: str = "<report>") -> None:
+        self.fp = fp
+        self.name = name
+        self.files: int = 0
+        self.complete: bool = True
+        self.skipped: Dict[str, str] = {}
+        self._no_findings: bool = False
+
+        first_line = fp.readline()
+        self.ndjson: bool = first_line.strip() != "{"
+        if self.ndjson:
+            header = _load_line(first_line, name)
+        else:
+            header = {}
+            while not (line := fp.readline()).lstrip().startswith('"findings"'):
+                if not line:
+                    raise ReadReportError(f"{name} has no findings")
+                header.update(_load_line(line, name))
+            self._no_findings = line.strip().rstrip(",").endswith("[]")
+        try:
+            self.min_version = int(header["min_version"])
+            self.max_version = int(header["max_version"])
+        except (KeyError, TypeError, ValueError):
+            raise ReadReportError(f"{name} has no valid version range")
+
+    def _read_tail(self, tail: Dict[str, Any]) -> None:
+        try:
+            self.files = int(tail["summary"]["files"])
+            self.complete = bool(tail["summary"].get("complete", True))
+            self.skipped = dict(tail.get("skipped", {}))
+        except (KeyError, TypeError, ValueError):
+            raise ReadReportError(f"{self.name} has no valid summary")
+
+    def findings(self) -> Iterator[Finding]:
+        tail: Dict[str, Any] = {}
+        for line in self.fp:
+            if not line.strip():
+                continue
+            if not self.ndjson and (
+                self._no_findings or line.strip().startswith("]")
+            ):
+                if self._no_findings:
+                    tail.update(_load_line(line, self.name))
+                break
+            loaded = _load_line(line, self.name)
+            if self.ndjson and "summary" in loaded:
+                tail = loaded
+                break
+            try:
+                finding = Finding.from_dict(loaded)
+            except (KeyError, TypeError, ValueError):
+                raise ReadReportError(f"{self.name} has an invalid finding")
+            yield finding
+        if not self.ndjson:
+            for line in self.fp:
+                if line.strip() not in ("", "}"):
+                    tail.update(_load_line(line, self.name))
+        self._read_tail(tail)
+
+
+def merge_reports(
+    readers: Sequence[ReportReader], fp: TextIO, ndjson: bool = False
+) -> ReportWriter:
+    """
+    Merge sorted reports into one sorted report with a k-way merge,
+    only the current finding of each report is kept in memory.
+    """
+    exception.assert_exc(bool(readers), MergeReportError("No report to merge"))
+    first = readers[0]
+    for reader in readers:
+        exception.assert_exc(
+            (reader.min_version, reader.max_version)
+            == (first.min_version, first.max_version),
+            MergeReportError(
+                f"{reader.name} checks 3.{reader.min_version} to 3.{reader.max_version}, "
+                f"but {first.name} checks 3.{first.min_version} to 3.{first.max_version}"
+            ),
+        )
+    writer = ReportWriter(fp, first.min_version, first.max_version, ndjson)
+    previous: Optional[Finding] = None
+    for finding in heapq.merge(*(reader.findings() for reader in readers)):
+        exception.assert_exc(
+            previous is None or previous <= finding,
+            MergeReportError("The reports to merge should be sorted"),
+        )
+        writer.write(finding)
+        previous = finding
+    skipped: Dict[str, str] = {}
+    for reader in readers:
+        skipped.update(reader.skipped)
+    writer.close(
+        sum(reader.files for reader in readers),
+        all(reader.complete for reader in readers),
+        skipped,
+    )
+    return writer
@@ -0,0 +1,126 @@
+"""
+Defines the version rule tables: syntax features and standard library additions and removals
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import dataclasses
+from typing import Dict, FrozenSet, Optional
+
+from . import stdlib_table, tables
+
+
+@dataclasses.dataclass(frozen=True)
+class Rule:
+    """
+    A feature that is only available in a range of Python 3.x versions.
+    `added` is the first minor version having it, `removed` is the first minor version without it.
+    """
+
+    name: str
+    description: str
+    added: Optional[int] = None
+    removed: Optional[int] = None
+
+    def violated(self, min_version: int, max_version: int) -> bool:
+        return (self.added is not None and self.added > min_version) or (
+            self.removed is not None and self.removed <= max_version
+        )
+
+    def message(self, min_version: int, max_version: int) -> str:
+        if self.added is not None and self.added > min_version:
+            return f"{self.description} requires Python 3.{self.added}+"
+        if self.removed is not None and self.removed <= max_version:
+            return f"{self.description} was removed in Python 3.{self.removed}"
+        return self.description
+
+
+SYNTAX_ERROR: Rule = Rule("syntax-error", "Syntax error")
+# An installed distribution not supporting the whole version range
+REQUIRES_PYTHON: Rule = Rule("requires-python", "Requires-Python")
+# A source an installed interpreter of the version range cannot compile
+COMPILE_ERROR: Rule = Rule("compile-error", "Compile error")
+
+POSITIONAL_ONLY_PARAMETERS: Rule = Rule(
+    "positional-only-parameters", "Positional-only parameters", added=8
+)
+ASSIGNMENT_EXPRESSION: Rule = Rule(
+    "assignment-expression", "Assignment expression `:=`", added=8
+)
+RELAXED_DECORATORS: Rule = Rule(
+    "relaxed-decorators", "Arbitrary decorator expression", added=9
+)
+BUILTIN_GENERIC_ALIAS: Rule = Rule(
+    "builtin-generic-alias", "Subscripting builtin collection types", added=9
+)
+UNION_OPERATOR: Rule = Rule(
+    "union-operator", "Union type expression `X | Y`", added=10
+)
+MATCH_STATEMENT: Rule = Rule("match-statement", "`match` statement", added=10)
+EXCEPTION_GROUPS: Rule = Rule("exception-groups", "`except*` clause", added=11)
+STARRED_SUBSCRIPT: Rule = Rule(
+    "starred-subscript", "Starred expression in subscript", added=11
+)
+TYPE_PARAMETERS: Rule = Rule(
+    "type-parameters", "Type parameter syntax", added=12
+)
+TYPE_ALIAS_STATEMENT: Rule = Rule(
+    "type-alias-statement", "`type` statement", added=12
+)
+
+SYNTAX_RULES: Dict[str, Rule] = {
+    rule.name: rule
+    for rule in (
+        SYNTAX_ERROR,
+        POSITIONAL_ONLY_PARAMETERS,
+        ASSIGNMENT_EXPRESSION,
+        RELAXED_DECORATORS,
+        BUILTIN_GENERIC_ALIAS,
+        UNION_OPERATOR,
+        MATCH_STATEMENT,
+        EXCEPTION_GROUPS,
+        STARRED_SUBSCRIPT,
+        TYPE_PARAMETERS,
+        TYPE_ALIAS_STATEMENT,
+    )
+}
+
+# Builtins that became subscriptable in PEP 585
+BUILTIN_GENERICS: FrozenSet[str] = frozenset(
+    ("dict", "frozenset", "list", "set", "tuple", "type")
+)
+
+# Looked up in the table generated from `versions.py`, which is not imported
+_stdlib_table: tables.PackedTable = tables.PackedTable(stdlib_table.DATA)
+_stdlib_table_rules: Dict[str, Optional[Rule]] = {}
+
+
+def stdlib_rule(dotted_name: str) -> Optional[Rule]:
+    if dotted_name not in _stdlib_table_rules:
+        versions = _stdlib_table.get(dotted_name)
+        _stdlib_table_rules[dotted_name] = (
+            None
+            if versions is None
+            else Rule(dotted_name, f"`{dotted_name}`", *versions)
+        )
+    return _stdlib_table_rules[dotted_name]
+
+
+# The newest version adding a known feature, no source can need a newer one
+NEWEST_ADDED: int = max(
+    stdlib_table.NEWEST_ADDED,
+    *(rule.added for rule in SYNTAX_RULES.values() if rule.added is not None),
+)
@@ -0,0 +1,127 @@
+"""
+The packed stdlib version table, generated by `generate_tables.py` from `versions.py`, do not edit it
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# The newest version adding a stdlib module or member
+NEWEST_ADDED: int = 14
+DATA: bytes = (
+    b"PCRT\x01\x00Q\x00\x00\x00\x00\x00\x00\x00\x04\x00"
+    b"\xff\x0d\x04\x00\x00\x00\x0d\x00\x0e\xff\x11\x00\x00\x00\x08\x00"
+    b"\xff\x0c\x19\x00\x00\x00\x11\x00\x0b\xff*\x00\x00\x00\x11\x00"
+    b"\xff\x0b;\x00\x00\x00\x0f\x00\x0b\xffJ\x00\x00\x00\x11\x00"
+    b"\x09\xff[\x00\x00\x00\x08\x00\xff\x0cc\x00\x00\x00\x07\x00"
+    b"\xff\x0dj\x00\x00\x00\x06\x00\xff\x0bp\x00\x00\x00\x03\x00"
+    b"\xff\x0ds\x00\x00\x00\x05\x00\xff\x0dx\x00\x00\x00\x05\x00"
+    b"\xff\x0d}\x00\x00\x00\x14\x00\xff\x0a\x91\x00\x00\x00\x14\x00"
+    b"\xff\x0a\xa5\x00\x00\x00\x13\x00\xff\x0a\xb8\x00\x00\x00\x1a\x00"
+    b"\xff\x0a\xd2\x00\x00\x00\x14\x00\xff\x0a\xe6\x00\x00\x00\x0b\x00"
+    b"\x0e\xff\xf1\x00\x00\x00\x1d\x00\xff\x0c\x0e\x01\x00\x00\x13\x00"
+    b"\x0a\xff!\x01\x00\x00\x10\x00\x0b\xff1\x01\x00\x00\x0c\x00"
+    b"\x0d\xff=\x01\x00\x00\x05\x00\xff\x0dB\x01\x00\x00\x13\x00"
+    b"\x0a\xffU\x01\x00\x00\x0c\x00\x0b\xffa\x01\x00\x00\x09\x00"
+    b"\xff\x0cj\x01\x00\x00\x0c\x00\x0b\xffv\x01\x00\x00\x09\x00"
+    b"\xff\x0a\x7f\x01\x00\x00\x0f\x00\x09\xff\x8e\x01\x00\x00\x08\x00"
+    b"\x09\xff\x96\x01\x00\x00\x13\x00\x0b\xff\xa9\x01\x00\x00\x06\x00"
+    b"\xff\x0d\xaf\x01\x00\x00\x03\x00\xff\x0c\xb2\x01\x00\x00\x19\x00"
+    b"\x09\xff\xcb\x01\x00\x00\x12\x00\xff\x0b\xdd\x01\x00\x00\x11\x00"
+    b"\x0c\xff\xee\x01\x00\x00\x12\x00\x0a\xff\x00\x02\x00\x00\x07\x00"
+    b"\xff\x0d\x07\x02\x00\x00\x07\x00\xff\x0d\x0e\x02\x00\x00\x08\x00"
+    b"\x09\xff\x16\x02\x00\x00\x0e\x00\x09\xff$\x02\x00\x00\x08\x00"
+    b"\x09\xff,\x02\x00\x00\x06\x00\xff\x0d2\x02\x00\x00\x03\x00"
+    b"\xff\x0d5\x02\x00\x00\x07\x00\xff\x0d<\x02\x00\x00\x0d\x00"
+    b"\x0b\xffI\x02\x00\x00\x14\x00\x0d\xff]\x02\x00\x00\x0b\x00"
+    b"\xff\x0dh\x02\x00\x00\x06\x00\xff\x0an\x02\x00\x00\x05\x00"
+    b"\xff\x0ds\x02\x00\x00\x10\x00\x09\xff\x83\x02\x00\x00\x05\x00"
+    b"\xff\x0c\x88\x02\x00\x00\x06\x00\xff\x0d\x8e\x02\x00\x00\x04\x00"
+    b"\xff\x0d\x92\x02\x00\x00\x16\x00\x0a\xff\xa8\x02\x00\x00\x05\x00"
+    b"\xff\x0d\xad\x02\x00\x00\x06\x00\xff\x0a\xb3\x02\x00\x00\x0d\x00"
+    b"\x0b\xff\xc0\x02\x00\x00\x0e\x00\x0c\xff\xce\x02\x00\x00\x09\x00"
+    b"\xff\x0d\xd7\x02\x00\x00\x07\x00\x0b\xff\xde\x02\x00\x00\x10\x00"
+    b"\x09\xff\xee\x02\x00\x00\x12\x00\x0a\xff\x00\x03\x00\x00\x14\x00"
+    b"\x0b\xff\x14\x03\x00\x00\x0c\x00\x0b\xff \x03\x00\x00\x10\x00"
+    b"\x0a\xff0\x03\x00\x00\x0f\x00\x0d\xff?\x03\x00\x00\x0b\x00"
+    b"\x0b\xffJ\x03\x00\x00\x10\x00\x0a\xffZ\x03\x00\x00\x10\x00"
+    b"\x0a\xffj\x03\x00\x00\x0d\x00\x0d\xffw\x03\x00\x00\x13\x00"
+    b"\x0b\xff\x8a\x03\x00\x00\x09\x00\xff\x0d\x93\x03\x00\x00\x0f\x00"
+    b"\x0c\xff\xa2\x03\x00\x00\x09\x00\xff\x0d\xab\x03\x00\x00\x12\x00"
+    b"\x0b\xff\xbd\x03\x00\x00\x02\x00\xff\x0d\xbf\x03\x00\x00\x13\x00"
+    b"\x0d\xff\xd2\x03\x00\x00\x06\x00\xff\x0d\xd8\x03\x00\x00\x08\x00"
+    b"\x09\xffaifcannotation"
+    b"libasynchatasync"
+    b"io.TaskGroupasyn"
+    b"cio.coroutineasy"
+    b"ncio.timeoutasyn"
+    b"cio.to_threadasy"
+    b"ncoreaudioopbinh"
+    b"excgicgitbchunkc"
+    b"ollections.Calla"
+    b"blecollections.I"
+    b"terablecollectio"
+    b"ns.Mappingcollec"
+    b"tions.MutableMap"
+    b"pingcollections."
+    b"Sequencecompress"
+    b"ionconfigparser."
+    b"SafeConfigParser"
+    b"contextlib.aclos"
+    b"ingcontextlib.ch"
+    b"dircopy.replacec"
+    b"ryptdataclasses."
+    b"KW_ONLYdatetime."
+    b"UTCdistutilsenum"
+    b".StrEnumformatte"
+    b"rfunctools.cache"
+    b"graphlibhashlib."
+    b"file_digestimghd"
+    b"rimpimportlib.re"
+    b"sources.filesins"
+    b"pect.getargspeci"
+    b"tertools.batched"
+    b"itertools.pairwi"
+    b"selib2to3mailcap"
+    b"math.lcmmath.nex"
+    b"taftermath.ulpms"
+    b"ilibnisnntplibop"
+    b"erator.callos.pr"
+    b"ocess_cpu_counto"
+    b"ssaudiodevparser"
+    b"pipesrandom.rand"
+    b"bytessmtpdsndhdr"
+    b"spwdstatistics.c"
+    b"orrelationsunaus"
+    b"ymbolsys.excepti"
+    b"onsys.monitoring"
+    b"telnetlibtomllib"
+    b"typing.Annotated"
+    b"typing.Concatena"
+    b"tetyping.Literal"
+    b"Stringtyping.Nev"
+    b"ertyping.ParamSp"
+    b"ectyping.ReadOnl"
+    b"ytyping.Selftypi"
+    b"ng.TypeAliastypi"
+    b"ng.TypeGuardtypi"
+    b"ng.TypeIstyping."
+    b"assert_nevertypi"
+    b"ng.iotyping.over"
+    b"ridetyping.retyp"
+    b"ing.reveal_typeu"
+    b"uwarnings.deprec"
+    b"atedxdrlibzonein"
+    b"fo"
+)
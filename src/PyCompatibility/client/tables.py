@@ -0,0 +1,123 @@
+"""
+Packed version tables, looked up in place without unpacking them
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import struct
+from typing import Dict, Optional, Tuple
+
+from . import exception
+
+MAGIC: bytes = b"PCRT"
+FORMAT_VERSION: int = 1
+# Magic, format version, number of records
+_HEADER: struct.Struct = struct.Struct("<4sHI")
+# Name offset, name length, added, removed; sorted by name
+_RECORD: struct.Struct = struct.Struct("<IHBB")
+# `added` or `removed` is None
+_NONE: int = 0xFF
+
+Versions = Tuple[Optional[int], Optional[int]]
+
+
+class BaseTableException(exception.BasePyCompatibilityException):
+    pass
+
+
+class TableException(exception.PyCompatibilityException, BaseTableException):
+    pass
+
+
+class ReadTableError(ValueError, TableException):
+    pass
+
+
+def pack(versions: Dict[str, Versions]) -> bytes:
+    """Pack dotted name: (added, removed) into a table for `PackedTable`"""
+    records = []
+    names = bytearray()
+    for name in sorted(versions, key=lambda name: name.encode("UTF-8")):
+        encoded = name.encode("UTF-8")
+        added, removed = versions[name]
+        records.append(
+            _RECORD.pack(
+                len(names),
+                len(encoded),
+                _NONE if added is None else added,
+                _NONE if removed is None else removed,
+            )
+        )
+        names += encoded
+    return b"".join(
+        (
+            _HEADER.pack(MAGIC, FORMAT_VERSION, len(records)),
+            *records,
+            names,
+        )
+    )
+
+
+class PackedTable:
+    """
+    A table packed by `pack`, looked up with a binary search on the buffer,
+    so nothing is unpacked when it is attached
+    """
+
+    def __init__(self, buffer: bytes) -> None:
+        try:
+            magic, format_version, count = _HEADER.unpack_from(buffer)
+        except struct.error:
+            raise ReadTableError("Truncated version table")
+        exception.assert_exc(
+            magic == MAGIC and format_version == FORMAT_VERSION,
+            ReadTableError("Not a version table of this version"),
+        )
+        self._buffer = buffer
+        self._count: int = count
+        self._names: int = _HEADER.size + count * _RECORD.size
+        exception.assert_exc(
+            len(buffer) >= self._names,
+            ReadTableError("Truncated version table"),
+        )
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _record(self, index: int) -> Tuple[bytes, int, int]:
+        offset, length, added, removed = _RECORD.unpack_from(
+            self._buffer, _HEADER.size + index * _RECORD.size
+        )
+        start = self._names + offset
+        end = start + length
+        return self._buffer[start:end], added, removed
+
+    def get(self, name: str) -> Optional[Versions]:
+        key = name.encode("UTF-8")
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            record_name, added, removed = self._record(middle)
+            if record_name < key:
+                low = middle + 1
+            elif record_name > key:
+                high = middle
+            else:
+                return (
+                    None if added == _NONE else added,
+                    None if removed == _NONE else removed,
+                )
+        return None
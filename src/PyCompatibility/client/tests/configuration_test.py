@@ -17,13 +17,16 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+import io
 import tempfile
 import unittest
 from pathlib import Path
 
 from ..configuration import (
     CheckConfiguration,
+    is_excluded,
     ParseConfigurationError,
+    read_path_list,
     ReadConfigurationError,
     WriteConfigurationError,
 )
@@ -330,18 +333,19 @@ class TestReadCheckConfiguration(unittest.TestCase):
                 ).check_and_resolve()
 
             # Path resolving
+            resolved = CheckConfiguration(
+                8,
+                10,
+                tmp_root / "report.json",
+                {
+                    tmp_root / "pyfile1.py",
+                    tmp_root / "pyfile_dir1" / "pyfile2.py",
+                    tmp_root / "pyfile_dir2",
+                },
+                {tmp_root / "pyfile_dir1", tmp_root / "pyfile4.py"},
+            ).check_and_resolve()
             self.assertEqual(
-                CheckConfiguration(
-                    8,
-                    10,
-                    tmp_root / "report.json",
-                    {
-                        tmp_root / "pyfile1.py",
-                        tmp_root / "pyfile_dir1" / "pyfile2.py",
-                        tmp_root / "pyfile_dir2",
-                    },
-                    {tmp_root / "pyfile_dir1", tmp_root / "pyfile4.py"},
-                ).check_and_resolve(),
+                resolved,
                 CheckConfiguration(
                     8,
                     10,
@@ -355,3 +359,64 @@ class TestReadCheckConfiguration(unittest.TestCase):
                     set(),
                 ),
             )
+            # `pyfile4.py` is excluded but not included
+            self.assertEqual((resolved.discovered, resolved.excluded), (3, 1))
+
+    def test_shard(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp_root: Path = Path(tmp)
+            sizes = [5000, 4000, 3000, 3000, 2000, 1000, 0, 0, 0]
+            for index, size in enumerate(sizes):
+                (tmp_root / f"pyfile{index}.py").write_text(
+                    "#" * size, encoding="UTF-8"
+                )
+            configuration = CheckConfiguration(
+                8, 10, None, {tmp_root}, set()
+            ).check_and_resolve()
+
+            shards = [configuration.shard(index, 3) for index in range(3)]
+            # Deterministic
+            self.assertEqual(
+                shards, [configuration.shard(index, 3) for index in range(3)]
+            )
+            # Disjoint and complete
+            self.assertEqual(
+                sum(len(shard.include) for shard in shards),
+                len(configuration.include),
+            )
+            self.assertEqual(
+                set().union(*(shard.include for shard in shards)),
+                configuration.include,
+            )
+            # Balanced by size
+            loads = [
+                sum(path.stat().st_size for path in shard.include)
+                for shard in shards
+            ]
+            self.assertLessEqual(max(loads) - min(loads), 2000)
+
+            with self.assertRaises(ParseConfigurationError):
+                configuration.shard(3, 3)
+
+
+class TestPathList(unittest.TestCase):
+    def test_read_path_list(self) -> None:
+        cwd = Path.cwd()
+        for data in (
+            b"a.py\0dir/b c.py\0",
+            b"a.py\r\ndir/b c.py\n\n",
+            b"a.py\ndir/b c.py",
+        ):
+            with self.subTest(data=data):
+                # Paths spanning chunks
+                self.assertEqual(
+                    list(read_path_list(io.BytesIO(data), chunk_size=3)),
+                    [cwd / "a.py", cwd / "dir" / "b c.py"],
+                )
+        self.assertEqual(list(read_path_list(io.BytesIO(b""))), [])
+
+    def test_is_excluded(self) -> None:
+        exclude = {Path("/project/tests"), Path("/project/setup.py")}
+        self.assertTrue(is_excluded(Path("/project/setup.py"), exclude))
+        self.assertTrue(is_excluded(Path("/project/tests/a/b.py"), exclude))
+        self.assertFalse(is_excluded(Path("/project/tests.py"), exclude))
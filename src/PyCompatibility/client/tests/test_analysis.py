@@ -0,0 +1,387 @@
+"""
+Tests for analysis.py
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import sys
+import textwrap
+import unittest
+from typing import List
+from unittest import mock
+
+from ..analysis import (
+    AnalysisCancelled,
+    analyze_source,
+    CompatibilityVisitor,
+    Finding,
+)
+
+
+def _rules(
+    source: str, min_version: int = 8, max_version: int = 12
+) -> List[str]:
+    return [
+        finding.rule
+        for finding in analyze_source(
+            textwrap.dedent(source).encode(),
+            "test.py",
+            min_version,
+            max_version,
+        )
+    ]
+
+
+class TestSyntaxRules(unittest.TestCase):
+    def test_no_finding(self) -> None:
+        self.assertEqual(_rules("import os\nos.path.join('a', 'b')\n"), [])
+
+    def test_positional_only_parameters(self) -> None:
+        self.assertEqual(
+            _rules("def f(a, /): pass\n", 7), ["positional-only-parameters"]
+        )
+        self.assertEqual(_rules("def f(a, /): pass\n", 8), [])
+
+    def test_relaxed_decorators(self) -> None:
+        self.assertEqual(
+            _rules("@buttons[0].clicked.connect\ndef f(): pass\n"),
+            ["relaxed-decorators"],
+        )
+        self.assertEqual(_rules("@a.b(c)\ndef f(): pass\n"), [])
+
+    def test_builtin_generic_alias(self) -> None:
+        self.assertEqual(_rules("x = list[int]\n"), ["builtin-generic-alias"])
+        self.assertEqual(_rules("x = list[int]\n", 9), [])
+
+    def test_union_operator_in_annotation(self) -> None:
+        self.assertEqual(
+            _rules("def f(a: int | None) -> None: pass\n"), ["union-operator"]
+        )
+        # Not an annotation, may be any `__or__`
+        self.assertEqual(_rules("x = a | b\n"), [])
+
+    def test_unevaluated_annotations(self) -> None:
+        source = """\
+            from __future__ import annotations
+            import typing as t
+            def f(a: int | None, *b: list[int]) -> t.TypeAlias: pass
+            x: dict[str, int] = dict[str, int]()
+            """
+        with mock.patch.object(
+            CompatibilityVisitor,
+            "visit_BinOp",
+            autospec=True,
+            side_effect=CompatibilityVisitor.visit_BinOp,
+        ) as visit_bin_op:
+            # The value is still evaluated
+            self.assertEqual(_rules(source), ["builtin-generic-alias"])
+        visit_bin_op.assert_not_called()
+        self.assertEqual(
+            _rules("def f(a: 'int | None') -> 'list[int]': pass\n"), []
+        )
+
+    def test_local_variable_annotations(self) -> None:
+        source = """\
+            def f(a: list[int]):
+                x: list[int] = dict[str, int]()
+            class A:
+                y: list[int]
+            """
+        # The argument, the value and the class variable, not the local variable
+        self.assertEqual(
+            _rules(source),
+            [
+                "builtin-generic-alias",
+                "builtin-generic-alias",
+                "builtin-generic-alias",
+            ],
+        )
+
+    @unittest.skipIf(sys.version_info < (3, 10), "Needs the 3.10 parser")
+    def test_match_statement(self) -> None:
+        self.assertEqual(
+            _rules(
+                """\
+                match x:
+                    case _:
+                        pass
+                """
+            ),
+            ["match-statement"],
+        )
+
+    @unittest.skipIf(sys.version_info < (3, 11), "Needs the 3.11 parser")
+    def test_exception_groups(self) -> None:
+        self.assertEqual(
+            _rules(
+                """\
+                try:
+                    pass
+                except* ValueError:
+                    pass
+                """
+            ),
+            ["exception-groups"],
+        )
+
+    def test_syntax_error(self) -> None:
+        self.assertEqual(
+            analyze_source(b"def f(:\n", "test.py", 8, 12),
+            [
+                Finding(
+                    "test.py",
+                    1,
+                    6,
+                    "syntax-error",
+                    "Syntax error: invalid syntax",
+                )
+            ],
+        )
+
+
+class TestStdlibRules(unittest.TestCase):
+    def test_added_module(self) -> None:
+        self.assertEqual(_rules("import tomllib\n"), ["tomllib"])
+        self.assertEqual(_rules("import tomllib\n", 11), [])
+
+    def test_removed_module(self) -> None:
+        self.assertEqual(_rules("import distutils.core\n"), ["distutils"])
+        self.assertEqual(_rules("import distutils.core\n", 8, 11), [])
+
+    def test_import_from(self) -> None:
+        self.assertEqual(_rules("from math import lcm\n"), ["math.lcm"])
+
+    def test_attribute(self) -> None:
+        self.assertEqual(
+            _rules("import itertools\nitertools.pairwise(x)\n"),
+            ["itertools.pairwise"],
+        )
+        # `itertools` is not the module here
+        self.assertEqual(_rules("itertools.pairwise(x)\n"), [])
+
+    def test_aliases(self) -> None:
+        self.assertEqual(
+            _rules("import typing as t\nx: t.TypeAlias = int\n"),
+            ["typing.TypeAlias"],
+        )
+        self.assertEqual(
+            _rules("from importlib import resources as r\nr.files('a')\n"),
+            ["importlib.resources.files"],
+        )
+        self.assertEqual(
+            _rules("import importlib.resources\nimportlib.resources.files()\n"),
+            ["importlib.resources.files"],
+        )
+        # The module is only reported at the import statement
+        self.assertEqual(
+            _rules("from os import process_cpu_count as p\np.__name__\n"),
+            ["os.process_cpu_count"],
+        )
+
+    def test_shadowed_aliases(self) -> None:
+        self.assertEqual(
+            _rules(
+                """\
+                import itertools as it
+                from . import typing
+                it = None
+                it.pairwise(x)
+                typing.TypeAlias
+                """
+            ),
+            [],
+        )
+        self.assertEqual(
+            _rules(
+                """\
+                import itertools as it
+                def f(it):
+                    it.pairwise(x)
+                class A:
+                    import more_itertools as it
+                    it.pairwise(x)
+                it.pairwise(x)
+                """
+            ),
+            ["itertools.pairwise"],
+        )
+
+    def test_comprehension_targets(self) -> None:
+        self.assertEqual(
+            _rules(
+                """\
+                import os
+                [os for os in range(3)]
+                {os: 1 for os in range(3)}
+                list(os for os in range(3))
+                os.process_cpu_count()
+                """
+            ),
+            ["os.process_cpu_count"],
+        )
+        self.assertEqual(
+            _rules("import os\n[os.process_cpu_count() for os in range(3)]\n"),
+            [],
+        )
+        # The first iterable is evaluated in the class body
+        self.assertEqual(
+            _rules(
+                """\
+                import typing as t
+                class C:
+                    t = None
+                    x = [y for y in t.TypeAlias]
+                """
+            ),
+            [],
+        )
+
+    def test_class_bindings_in_methods(self) -> None:
+        # The class body binding is not visible inside the method
+        self.assertEqual(
+            _rules(
+                """\
+                import typing as t
+                class C:
+                    t = None
+                    def m(self):
+                        t.TypeAlias
+                    t.TypeAlias
+                """
+            ),
+            ["typing.TypeAlias"],
+        )
+        self.assertEqual(
+            _rules(
+                """\
+                import typing as t
+                class C:
+                    t = None
+                    def m(self):
+                        t = None
+                        def f():
+                            t.TypeAlias
+                """
+            ),
+            [],
+        )
+
+    def test_guarded_import(self) -> None:
+        self.assertEqual(
+            _rules(
+                """\
+                try:
+                    import tomllib
+                except ImportError:
+                    import tomli as tomllib
+                """
+            ),
+            [],
+        )
+
+    def test_version_guard(self) -> None:
+        self.assertEqual(
+            _rules(
+                """\
+                import sys
+                if sys.version_info >= (3, 11):
+                    import tomllib
+                else:
+                    import tomli as tomllib
+                if sys.version_info < (3, 9):
+                    pass
+                elif sys.version_info[0] == 3:
+                    import graphlib
+                """
+            ),
+            [],
+        )
+        # Only narrowed to 3.9 and newer
+        self.assertEqual(
+            _rules(
+                """\
+                from sys import version_info
+                if version_info > (3, 9):
+                    import tomllib
+                if version_info >= (3, 10, 1):
+                    pass
+                else:
+                    from math import lcm
+                """
+            ),
+            ["tomllib", "math.lcm"],
+        )
+        # Not the interpreter version
+        self.assertEqual(
+            _rules("if x.version_info >= (3, 11):\n    import tomllib\n"),
+            ["tomllib"],
+        )
+
+    def test_finding_message(self) -> None:
+        self.assertEqual(
+            analyze_source(b"import imp\n", "test.py", 8, 12),
+            [
+                Finding(
+                    "test.py",
+                    1,
+                    0,
+                    "imp",
+                    "`imp` was removed in Python 3.12",
+                )
+            ],
+        )
+
+
+class TestCancellation(unittest.TestCase):
+    def test_cancelled(self) -> None:
+        with self.assertRaises(AnalysisCancelled):
+            analyze_source(b"import os\n", "test.py", 8, 12, lambda: True)
+        self.assertEqual(
+            analyze_source(b"import imp\n", "test.py", 8, 12, lambda: False),
+            analyze_source(b"import imp\n", "test.py", 8, 12),
+        )
+
+
+class TestFingerprint(unittest.TestCase):
+    def _fingerprints(self, source: str) -> List[str]:
+        return [
+            finding.fingerprint
+            for finding in analyze_source(
+                textwrap.dedent(source).encode(), "test.py", 8, 12
+            )
+        ]
+
+    def test_stable_when_lines_move(self) -> None:
+        source = """\
+            def f():
+                import tomllib
+            """
+        self.assertEqual(
+            self._fingerprints(source),
+            self._fingerprints("import os\n\n\n" + textwrap.dedent(source)),
+        )
+
+    def test_changes_with_scope(self) -> None:
+        self.assertNotEqual(
+            self._fingerprints("def f():\n    import tomllib\n"),
+            self._fingerprints("def g():\n    import tomllib\n"),
+        )
+
+    def test_repeated_findings(self) -> None:
+        first, second = self._fingerprints(
+            "def f():\n    import tomllib\n    import tomllib\n"
+        )
+        self.assertNotEqual(first, second)
@@ -0,0 +1,65 @@
+"""
+Tests for archives.py
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import io
+import tarfile
+import unittest
+import zipfile
+from pathlib import Path
+
+from ..archives import is_archive, members, ReadArchiveError
+
+
+class TestArchives(unittest.TestCase):
+    def test_is_archive(self) -> None:
+        self.assertTrue(is_archive(Path("package-1.0-py3-none-any.whl")))
+        self.assertTrue(is_archive(Path("package-1.0.tar.gz")))
+        self.assertFalse(is_archive(Path("package.py")))
+
+    def test_zipapp(self) -> None:
+        buf = io.BytesIO()
+        buf.write(b"#!/usr/bin/env python3\n")
+        with zipfile.ZipFile(buf, mode="a") as zip_file:
+            zip_file.writestr("__main__.py", "import tomllib\n")
+            zip_file.writestr("data.txt", "import tomllib\n")
+        self.assertEqual(
+            list(members(buf.getvalue(), "app.pyz")),
+            [("__main__.py", b"import tomllib\n")],
+        )
+
+    def test_sdist(self) -> None:
+        buf = io.BytesIO()
+        with tarfile.open(fileobj=buf, mode="w:gz") as tar:
+            for name, data in (
+                ("package-1.0/package/__init__.py", b"import os\n"),
+                ("package-1.0/PKG-INFO", b"Name: package\n"),
+            ):
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+        self.assertEqual(
+            list(members(buf.getvalue(), "package-1.0.tar.gz")),
+            [("package-1.0/package/__init__.py", b"import os\n")],
+        )
+
+    def test_invalid_archive(self) -> None:
+        with self.assertRaises(ReadArchiveError):
+            list(members(b"not an archive", "package.whl"))
+        with self.assertRaises(ReadArchiveError):
+            list(members(b"not an archive", "package.tar.gz"))
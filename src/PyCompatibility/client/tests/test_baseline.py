@@ -0,0 +1,65 @@
+"""
+Tests for baseline.py
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from ..baseline import read_baseline, ReadBaselineError, write_baseline
+from ..configuration import CheckConfiguration
+from ..pipeline import check, PipelineOptions
+
+
+class TestBaseline(unittest.TestCase):
+    def test_read_and_write(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp_root = Path(tmp)
+            (tmp_root / "new.py").write_text(
+                "import tomllib\n", encoding="UTF-8"
+            )
+            configuration = CheckConfiguration(
+                8, 10, None, {tmp_root}, set()
+            ).check_and_resolve()
+            report = check(configuration, PipelineOptions(jobs=1))
+            self.assertEqual(
+                write_baseline(tmp_root / "baseline.json", report.findings), 1
+            )
+            baseline = read_baseline(tmp_root / "baseline.json")
+
+            # Lines added before the finding do not change its fingerprint
+            (tmp_root / "new.py").write_text(
+                "import os\n\nimport tomllib\nimport graphlib\n",
+                encoding="UTF-8",
+            )
+            report = check(
+                configuration, PipelineOptions(jobs=1, baseline=baseline)
+            )
+            self.assertEqual(report.suppressed, 1)
+            self.assertEqual(
+                [finding.rule for finding in report.findings], ["graphlib"]
+            )
+
+    def test_invalid_baseline(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "baseline.json"
+            with self.assertRaises(ReadBaselineError):
+                read_baseline(path)
+            path.write_text('{"fingerprints": [1]}', encoding="UTF-8")
+            with self.assertRaises(ReadBaselineError):
+                read_baseline(path)
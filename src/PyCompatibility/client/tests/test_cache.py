@@ -0,0 +1,109 @@
+"""
+Tests for cache.py
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import io
+import json
+import tarfile
+import tempfile
+import unittest
+from pathlib import Path
+from typing import Dict
+
+from ..cache import CacheArchiveError, export_cache, import_cache, load, store
+
+
+def _write_archive(path: Path, members: Dict[str, bytes]) -> None:
+    with tarfile.open(path, mode="w:gz") as tar:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+
+
+class TestCacheArchive(unittest.TestCase):
+    def test_export_and_import(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp_root = Path(tmp)
+            cache_directory = tmp_root / "cache"
+            store("dependencies", {"a": 1}, cache_directory)
+            store("x-8-10", {"files": 1}, cache_directory / "archives")
+            store("y-8-10", {"files": 1}, cache_directory / "archives")
+            archive = tmp_root / "cache.tar.gz"
+            self.assertEqual(export_cache(archive, cache_directory), 3)
+
+            # Identical entries are stored once, and the archive is reproducible
+            with tarfile.open(archive) as tar:
+                self.assertEqual(len(tar.getnames()), 3)
+            data = archive.read_bytes()
+            export_cache(archive, cache_directory)
+            self.assertEqual(archive.read_bytes(), data)
+
+            restored = tmp_root / "restored"
+            store("dependencies", {"a": 2}, restored)
+            self.assertEqual(import_cache(archive, restored), (2, 1))
+            self.assertEqual(load("dependencies", restored), {"a": 2})
+            self.assertEqual(
+                load("y-8-10", restored / "archives"), {"files": 1}
+            )
+            self.assertEqual(import_cache(archive, restored), (0, 3))
+
+    def test_empty_cache(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            archive = Path(tmp) / "cache.tar.gz"
+            self.assertEqual(export_cache(archive, Path(tmp) / "missing"), 0)
+            self.assertEqual(import_cache(archive, Path(tmp) / "cache"), (0, 0))
+
+    def test_unsafe_name(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            archive = Path(tmp) / "cache.tar.gz"
+            _write_archive(
+                archive,
+                {
+                    "manifest.json": json.dumps(
+                        {"format": 1, "entries": {"../evil.json": "0" * 64}}
+                    ).encode()
+                },
+            )
+            with self.assertRaises(CacheArchiveError):
+                import_cache(archive, Path(tmp) / "cache")
+            self.assertFalse((Path(tmp) / "evil.json").exists())
+
+    def test_corrupted_object(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            archive = Path(tmp) / "cache.tar.gz"
+            digest = "0" * 64
+            _write_archive(
+                archive,
+                {
+                    "manifest.json": json.dumps(
+                        {"format": 1, "entries": {"a.json": digest}}
+                    ).encode(),
+                    f"objects/{digest}": b"{}",
+                },
+            )
+            with self.assertRaises(CacheArchiveError):
+                import_cache(archive, Path(tmp) / "cache")
+            self.assertIsNone(load("a", Path(tmp) / "cache"))
+
+    def test_not_an_archive(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            archive = Path(tmp) / "cache.tar.gz"
+            archive.write_bytes(b"garbage")
+            with self.assertRaises(CacheArchiveError):
+                import_cache(archive, Path(tmp) / "cache")
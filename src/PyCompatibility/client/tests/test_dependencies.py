@@ -0,0 +1,106 @@
+"""
+Tests for dependencies.py
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import tempfile
+import unittest
+from pathlib import Path
+from typing import Optional
+from unittest import mock
+
+import importlib_metadata
+
+from ..dependencies import (
+    audit,
+    installed_dependencies,
+    InvalidSpecifierError,
+    supported_versions,
+)
+
+
+def _install(
+    site: Path, name: str, version: str, requires_python: Optional[str]
+) -> Path:
+    dist_info = site / f"{name}-{version}.dist-info"
+    dist_info.mkdir()
+    metadata = f"Metadata-Version: 2.1\nName: {name}\nVersion: {version}\n"
+    if requires_python is not None:
+        metadata += f"Requires-Python: {requires_python}\n"
+    (dist_info / "METADATA").write_text(metadata, encoding="UTF-8")
+    return dist_info
+
+
+class TestSupportedVersions(unittest.TestCase):
+    def test_specifiers(self) -> None:
+        for specifier, expected in (
+            (">=3.8", {8, 9, 10, 11, 12}),
+            (">=3.9.1", {9, 10, 11, 12}),
+            (">=3.8, <3.11", {8, 9, 10}),
+            (">=3.8,!=3.9.*", {8, 10, 11, 12}),
+            ("~=3.9", {9, 10, 11, 12}),
+            (">=3.8.1,<3.8.5", {8}),
+            (">=2.7, !=3.0.*, !=3.1.*", {8, 9, 10, 11, 12}),
+            ("<=3.10", {8, 9, 10}),
+            (">=3.10.0rc1", {10, 11, 12}),
+        ):
+            with self.subTest(specifier=specifier):
+                self.assertEqual(supported_versions(specifier, 8, 12), expected)
+
+    def test_invalid_specifier(self) -> None:
+        with self.assertRaises(InvalidSpecifierError):
+            supported_versions("python3", 8, 12)
+        with self.assertRaises(InvalidSpecifierError):
+            supported_versions(">=3.*", 8, 12)
+
+
+class TestAudit(unittest.TestCase):
+    def test_audit(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            site = Path(tmp) / "site-packages"
+            site.mkdir()
+            _install(site, "old", "1.0", ">=3.6")
+            _install(site, "new", "2.0", ">=3.10")
+            _install(site, "any", "3.0", None)
+            findings = audit(
+                installed_dependencies([str(site)], Path(tmp) / "cache"), 8, 12
+            )
+            self.assertEqual(
+                [finding.message for finding in findings],
+                ["new 2.0 requires Python >=3.10, which excludes 3.8, 3.9"],
+            )
+
+    def test_cache(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            site, cache_directory = Path(tmp) / "site-packages", Path(tmp)
+            site.mkdir()
+            _install(site, "first", "1.0", ">=3.8")
+            installed_dependencies([str(site)], cache_directory)
+            new = _install(site, "second", "1.0", ">=3.9")
+            with mock.patch(
+                "importlib_metadata.PathDistribution",
+                wraps=importlib_metadata.PathDistribution,
+            ) as path_distribution:
+                dependencies = installed_dependencies(
+                    [str(site)], cache_directory
+                )
+            # Only the new distribution is read
+            path_distribution.assert_called_once_with(new)
+            self.assertEqual(
+                sorted(dependency.name for dependency in dependencies),
+                ["first", "second"],
+            )
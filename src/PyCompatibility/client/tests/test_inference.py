@@ -0,0 +1,96 @@
+"""
+Tests for inference.py
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from .. import rules, versions
+from ..inference import (
+    infer,
+    infer_source,
+    InferenceVisitor,
+    project_requirement,
+    Requirement,
+)
+
+
+class TestInference(unittest.TestCase):
+    def test_infer_source(self) -> None:
+        self.assertEqual(
+            infer_source(b"import os\n", "test.py"), Requirement("test.py")
+        )
+        self.assertEqual(
+            infer_source(
+                b"import graphlib\ndef f(a, /): pass\nx = list[int]\n",
+                "test.py",
+            ),
+            Requirement("test.py", 9, "graphlib", "`graphlib`", 1, 0),
+        )
+        self.assertEqual(
+            infer_source(
+                b"from __future__ import annotations\n"
+                b"def f(a: int | None) -> list[int]: pass\n",
+                "test.py",
+            ),
+            Requirement("test.py"),
+        )
+        self.assertEqual(
+            infer_source(
+                b"import sys\n"
+                b"if sys.version_info >= (3, 11):\n"
+                b"    import tomllib\n"
+                b"else:\n"
+                b"    import graphlib\n",
+                "test.py",
+            ),
+            Requirement("test.py", 9, "graphlib", "`graphlib`", 5, 4),
+        )
+
+    def test_early_exit(self) -> None:
+        newest = next(
+            name
+            for name, (added, _) in versions.STDLIB_VERSIONS.items()
+            if added == rules.NEWEST_ADDED and "." not in name
+        )
+        source = f"import {newest}\nimport graphlib\n".encode()
+        with mock.patch.object(
+            InferenceVisitor,
+            "use",
+            autospec=True,
+            side_effect=InferenceVisitor.use,
+        ) as use:
+            requirement = infer_source(source, "test.py")
+        self.assertEqual(requirement.version, rules.NEWEST_ADDED)
+        # The second import is never visited
+        self.assertEqual(use.call_count, 1)
+
+    def test_project(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp_root = Path(tmp)
+            (tmp_root / "a.py").write_text("x = (y := 1)\n", encoding="UTF-8")
+            (tmp_root / "b.py").write_text("import tomllib\n", encoding="UTF-8")
+            (tmp_root / "c.py").write_text("def f(:\n", encoding="UTF-8")
+            requirements = infer(tmp_root.iterdir())
+            self.assertEqual(
+                [requirement.version for requirement in requirements], [8, 11]
+            )
+            project = project_requirement(requirements)
+            self.assertEqual((project.version, project.rule), (11, "tomllib"))
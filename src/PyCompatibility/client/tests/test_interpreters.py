@@ -0,0 +1,156 @@
+"""
+Tests for interpreters.py
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import sys
+import unittest
+from typing import Optional
+from unittest import mock
+
+from .. import interpreters
+from ..interpreters import (
+    find_interpreters,
+    Interpreter,
+    InterpreterPool,
+    start_pools,
+    VerifyError,
+)
+
+# The running interpreter stands for an installed one
+CURRENT: Interpreter = Interpreter(sys.version_info.minor, sys.executable)
+
+
+class TestInterpreters(unittest.TestCase):
+    def test_find_interpreters(self) -> None:
+        def which(name: str) -> Optional[str]:
+            return f"/usr/bin/{name}" if name != "python3.9" else None
+
+        with mock.patch("shutil.which", which):
+            self.assertEqual(
+                find_interpreters(8, 10),
+                [
+                    Interpreter(8, "/usr/bin/python3.8"),
+                    Interpreter(10, "/usr/bin/python3.10"),
+                ],
+            )
+
+    def test_verify(self) -> None:
+        pool = InterpreterPool(CURRENT, 2)
+        try:
+            self.assertEqual(pool.verify("a.py", b"import os\n"), [])
+            (finding,) = pool.verify("a.py", b"import os\nprint 1\n")
+            self.assertEqual(
+                (finding.path, finding.line, finding.rule),
+                ("a.py", 2, "compile-error"),
+            )
+            self.assertTrue(
+                finding.message.startswith(
+                    f"Python 3.{CURRENT.version} cannot compile it"
+                )
+            )
+            (finding,) = pool.verify("a.py", b"\0")
+            self.assertEqual(finding.line, 0)
+            # Mapped back to the cells of a notebook
+            (finding,) = pool.verify("a.ipynb", b"x = 1\nprint 1\n", ((1, 3),))
+            self.assertEqual(
+                (finding.path, finding.line), ("a.ipynb:cell_3", 2)
+            )
+        finally:
+            pool.close()
+
+    def test_pragmas(self) -> None:
+        pool = InterpreterPool(CURRENT, 1)
+        try:
+            with mock.patch.object(
+                InterpreterPool, "compile", wraps=pool.compile
+            ) as compile_:
+                self.assertEqual(
+                    pool.verify("a.py", b"# compat: skip-file\nprint 1\n"), []
+                )
+            # Not sent to the interpreter
+            compile_.assert_not_called()
+            for comment in ("ignore", "ignore[compile-error]"):
+                self.assertEqual(
+                    pool.verify(
+                        "a.py", f"print 1  # compat: {comment}\n".encode()
+                    ),
+                    [],
+                )
+            self.assertEqual(
+                len(
+                    pool.verify("a.py", b"print 1  # compat: ignore[tomllib]\n")
+                ),
+                1,
+            )
+        finally:
+            pool.close()
+
+    def test_crashed_process(self) -> None:
+        pool = InterpreterPool(CURRENT, 1)
+        try:
+            process = pool._idle.get()
+            process.process.kill()
+            process.process.wait()
+            pool._idle.put(process)
+            # Retried by a new process
+            self.assertIsNone(pool.compile("a.py", b"x = 1\n"))
+            with mock.patch.object(
+                interpreters._Process,
+                "compile",
+                side_effect=interpreters._InterpreterCrashed("exited"),
+            ) as compile_:
+                with self.assertRaisesRegex(VerifyError, "crashed"):
+                    pool.compile("a.py", b"x = 1\n")
+            self.assertEqual(compile_.call_count, 2)
+            # Replaced
+            self.assertIsNone(pool.compile("a.py", b"x = 1\n"))
+        finally:
+            pool.close()
+
+    def test_timeout(self) -> None:
+        pool = InterpreterPool(CURRENT, 1, timeout=0.01)
+        try:
+            with self.assertRaisesRegex(VerifyError, "Timeout"):
+                pool.compile("a.py", b"x = 1\n" * 500_000)
+            pool.timeout = None
+            self.assertIsNone(pool.compile("a.py", b"x = 1\n"))
+        finally:
+            pool.close()
+
+    def test_lazy_start(self) -> None:
+        pool = InterpreterPool(CURRENT, 4)
+        try:
+            self.assertEqual(pool._started, 1)
+            for _ in range(3):
+                self.assertIsNone(pool.compile("a.py", b"x = 1\n"))
+            # One process is enough for sources compiled one by one
+            self.assertEqual(pool._started, 1)
+        finally:
+            pool.close()
+
+    def test_wrong_version(self) -> None:
+        wrong = Interpreter(CURRENT.version + 1, sys.executable)
+        with self.assertRaises(OSError):
+            InterpreterPool(wrong, 1)
+        # Skipped
+        pools = start_pools([wrong, CURRENT], 1)
+        try:
+            self.assertEqual([pool.interpreter for pool in pools], [CURRENT])
+        finally:
+            for pool in pools:
+                pool.close()
@@ -123,3 +123,50 @@ class CheckFormattedStreamHandler(unittest.TestCase):
             h.close()
         buf.close()
         logging.basicConfig(level="INFO")
+
+
+class CheckAggregation(unittest.TestCase):
+    def test_aggregate_errors(self) -> None:
+        with redirect_log_with_config() as buf:
+            with log.aggregate_errors(LOG, limit=2):
+                for index in range(5):
+                    LOG.error(
+                        f"Cannot read {index}.py",
+                        extra=log.per_file("Cannot read"),
+                    )
+                LOG.error("Cannot parse a.py", extra=log.per_file("Parse"))
+                LOG.error("Not per file")
+            LOG.error("Cannot read 5.py", extra=log.per_file("Cannot read"))
+            self.assertEqual(
+                buf.getvalue(),
+                "[Error] test_logging: Cannot read 0.py\n"
+                "[Error] test_logging: Cannot read 1.py\n"
+                "[Error] test_logging: Cannot parse a.py\n"
+                "[Error] test_logging: Not per file\n"
+                "[Error] test_logging: Cannot read: 5 files, "
+                "3 of them are not shown\n"
+                "[Error] test_logging: Cannot read 5.py\n",
+            )
+
+    def test_handle_exception(self) -> None:
+        class CustomError(Exception):
+            pass
+
+        @log.handle_exception
+        def command(index: int) -> None:
+            raise CustomError(f"Failure {index}")
+
+        loggers = len(logging.root.manager.loggerDict)
+        with redirect_log_with_config() as buf:
+            for index in range(3):
+                with self.assertRaises(SystemExit) as context:
+                    command(index)
+                self.assertEqual(context.exception.code, log.ERROR_EXIT_CODE)
+            self.assertEqual(
+                buf.getvalue().splitlines(),
+                [
+                    f"Fatal error: {log.__name__}: CustomError: Failure {index}"
+                    for index in range(3)
+                ],
+            )
+        self.assertEqual(len(logging.root.manager.loggerDict), loggers)
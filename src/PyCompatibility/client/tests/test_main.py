@@ -0,0 +1,75 @@
+"""
+Tests for main.py
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from click.testing import CliRunner, Result
+
+from .. import log
+from ..main import main
+
+
+class TestExitCode(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        (self.root / "ok.py").write_text("import os\n", encoding="UTF-8")
+        (self.root / "new.py").write_text("import tomllib\n", encoding="UTF-8")
+        (self.root / "bad.json").write_text("garbage", encoding="UTF-8")
+
+    def _invoke(self, *args: str) -> Result:
+        # The logging of the test run is left as is
+        with mock.patch.object(log, "initialize"):
+            return CliRunner().invoke(main, args)
+
+    def _check(self, *args: str) -> int:
+        return self._invoke(
+            "check", "-V", "8", "10", "--no-tree-cache", *args
+        ).exit_code
+
+    def test_checked(self) -> None:
+        self.assertEqual(self._check(str(self.root / "ok.py")), 0)
+        self.assertEqual(self._check(str(self.root / "new.py")), 1)
+
+    def test_error(self) -> None:
+        for exit_code in (
+            self._check(
+                "--baseline",
+                str(self.root / "missing.json"),
+                str(self.root / "ok.py"),
+            ),
+            self._check(str(self.root / "missing")),
+            self._invoke(
+                "merge-reports",
+                str(self.root / "bad.json"),
+                "-o",
+                str(self.root / "merged.json"),
+            ).exit_code,
+        ):
+            self.assertEqual(exit_code, log.ERROR_EXIT_CODE)
+
+    def test_usage_error(self) -> None:
+        # Shown by click
+        result = self._invoke("check", "-V", "8", "10")
+        self.assertEqual(result.exit_code, 2)
+        self.assertIn("Missing argument", result.output)
@@ -0,0 +1,101 @@
+"""
+Tests for metrics.py
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import stat
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from ..analysis import Finding
+from ..metrics import PhaseTimer, render, write_metrics, WriteMetricsError
+from ..progress import Counters
+from ..report import CheckReport
+
+
+class TestMetrics(unittest.TestCase):
+    def test_render(self) -> None:
+        report = CheckReport(
+            8,
+            10,
+            [
+                Finding("a.py", 1, 0, "tomllib", ""),
+                Finding("b.py", 1, 0, "tomllib", ""),
+                Finding("b.py", 2, 0, 'say "hi"', ""),
+            ],
+            skipped={"c.py": "budget exceeded"},
+        )
+        counters = Counters(
+            total=4,
+            bytes_read=123456789,
+            files_analyzed=3,
+            files_cached=5,
+            cache_lookups=4,
+            cache_hits=1,
+        )
+        lines = render(report, counters, 6, 2, {"check": 1.5}).splitlines()
+        for line in (
+            'pycompatibility_files{state="discovered"} 6',
+            'pycompatibility_files{state="excluded"} 2',
+            'pycompatibility_files{state="cached"} 5',
+            'pycompatibility_files{state="analyzed"} 3',
+            "# UNIT pycompatibility_read_bytes bytes",
+            "pycompatibility_read_bytes 123456789",
+            'pycompatibility_phase_duration_seconds{phase="check"} 1.5',
+            "pycompatibility_cache_hit_ratio 0.25",
+            'pycompatibility_findings{rule="tomllib"} 2',
+            'pycompatibility_findings{rule="say \\"hi\\""} 1',
+        ):
+            self.assertIn(line, lines)
+        self.assertEqual(lines[-1], "# EOF")
+
+    def test_no_cache_lookup(self) -> None:
+        lines = render(CheckReport(8, 10), Counters(total=0), 0, 0, {})
+        self.assertFalse(
+            any(
+                line.startswith("pycompatibility_cache_hit_ratio")
+                for line in lines.splitlines()
+            )
+        )
+
+    def test_phase_timer(self) -> None:
+        timer = PhaseTimer()
+        timer.mark("resolve")
+        timer.mark("check")
+        timer.mark("check")
+        self.assertEqual(list(timer.durations), ["resolve", "check"])
+        self.assertTrue(all(value >= 0 for value in timer.durations.values()))
+
+    def test_write_metrics(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "compat.prom"
+            write_metrics(path, "# EOF\n")
+            write_metrics(path, "a 1\n# EOF\n")
+            self.assertEqual(path.read_text(encoding="UTF-8"), "a 1\n# EOF\n")
+            self.assertEqual(list(Path(tmp).iterdir()), [path])
+            if sys.platform != "win32":
+                umask = os.umask(0o022)
+                try:
+                    write_metrics(path, "# EOF\n")
+                finally:
+                    os.umask(umask)
+                self.assertEqual(stat.S_IMODE(path.stat().st_mode), 0o644)
+            with self.assertRaises(WriteMetricsError):
+                write_metrics(Path(tmp) / "missing" / "compat.prom", "")
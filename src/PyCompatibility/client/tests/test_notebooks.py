@@ -0,0 +1,121 @@
+"""
+Tests for notebooks.py
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import io
+import json
+import unittest
+from typing import Any, Dict, List
+from unittest import mock
+
+from .. import notebooks
+from ..analysis import Finding
+from ..notebooks import cell_findings, read_notebook, ReadNotebookError
+
+
+def _notebook(cells: List[Dict[str, Any]], language: str = "python") -> bytes:
+    return json.dumps(
+        {
+            "cells": cells,
+            "metadata": {
+                "kernelspec": {"language": language, "name": "kernel"},
+                "widgets": {"state": {"{": ["]", {"\\": '"'}]}},
+            },
+            "nbformat": 4,
+            "nbformat_minor": 5,
+        },
+        indent=1,
+    ).encode("UTF-8")
+
+
+def _code(source: List[str], outputs: Any = ()) -> Dict[str, Any]:
+    return {
+        "cell_type": "code",
+        "execution_count": None,
+        "metadata": {},
+        "outputs": list(outputs),
+        "source": source,
+    }
+
+
+class TestNotebooks(unittest.TestCase):
+    def test_code_cells(self) -> None:
+        output = {
+            "output_type": "display_data",
+            "data": {"image/png": "A" * 100_000, "text/plain": ['"[{\\']},
+        }
+        data = _notebook(
+            [
+                {"cell_type": "markdown", "metadata": {}, "source": "# x"},
+                _code(["import itertools\n", "x = 1"], [output]),
+                _code(["%%bash\n", "echo 1\n"]),
+                _code(["itertools.pairwise(x)\n"]),
+            ]
+        )
+        # Values and escapes spanning chunks
+        with mock.patch.object(notebooks, "_CHUNK_SIZE", 7):
+            notebook = read_notebook(io.BytesIO(data), "a.ipynb")
+        self.assertEqual(
+            notebook.source, b"import itertools\nx = 1\nitertools.pairwise(x)\n"
+        )
+        self.assertEqual(notebook.cells, ((1, 2), (3, 4)))
+        self.assertEqual(notebook.language, "python")
+
+    def test_magics(self) -> None:
+        data = _notebook(
+            [
+                _code(
+                    [
+                        "%matplotlib inline\n",
+                        "files = !ls\n",
+                        "if files:\n",
+                        "    !echo 1\n",
+                        "len?\n",
+                    ]
+                )
+            ]
+        )
+        notebook = read_notebook(io.BytesIO(data), "a.ipynb")
+        self.assertEqual(
+            notebook.source,
+            b"pass\nfiles = None\nif files:\n    pass\npass\n",
+        )
+
+    def test_language(self) -> None:
+        data = _notebook([_code(["x <- 1"])], language="R")
+        self.assertEqual(
+            read_notebook(io.BytesIO(data), "a.ipynb").language, "R"
+        )
+
+    def test_invalid_notebook(self) -> None:
+        for data in (b"", b"[]", b'{"cells": [', b'{"cells": [}'):
+            with self.subTest(data=data), self.assertRaises(ReadNotebookError):
+                read_notebook(io.BytesIO(data), "a.ipynb")
+
+    def test_cell_findings(self) -> None:
+        findings = [
+            Finding("a.ipynb", 4, 0, "tomllib", ""),
+            Finding("a.ipynb", 1, 0, "tomllib", ""),
+        ]
+        self.assertEqual(
+            cell_findings(findings, ((1, 2), (3, 5))),
+            [
+                Finding("a.ipynb:cell_2", 1, 0, "tomllib", ""),
+                Finding("a.ipynb:cell_5", 2, 0, "tomllib", ""),
+            ],
+        )
@@ -0,0 +1,480 @@
+"""
+Tests for pipeline.py
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import dataclasses
+import json
+import sys
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+from typing import List
+from unittest import mock
+
+from .. import archives, pipeline, plugins
+from ..configuration import CheckConfiguration, display_path
+from ..interpreters import Interpreter, InterpreterPool, VerifyError
+from ..pipeline import check, PipelineOptions
+from ..progress import Counters
+
+
+def _make_tree(root: Path) -> CheckConfiguration:
+    (root / "package").mkdir()
+    (root / "package" / "ok.py").write_text("import os\n", encoding="UTF-8")
+    (root / "package" / "new.py").write_text(
+        "import tomllib\nimport graphlib\n", encoding="UTF-8"
+    )
+    (root / "package" / "README.md").write_text("import tomllib\n")
+    return CheckConfiguration(
+        8, 10, None, {root / "package"}, set()
+    ).check_and_resolve()
+
+
+class TestPipeline(unittest.TestCase):
+    def test_check(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            configuration = _make_tree(Path(tmp))
+            report = check(configuration, PipelineOptions(jobs=1, prefetch=1))
+            self.assertEqual(report.files, 2)
+            self.assertEqual(
+                [(finding.line, finding.rule) for finding in report.findings],
+                [(1, "tomllib"), (2, "graphlib")],
+            )
+
+    def test_verify_with_interpreters(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "a.py"
+            path.write_text("print 1\n", encoding="UTF-8")
+            configuration = CheckConfiguration(
+                8, 10, None, {path}, set()
+            ).check_and_resolve()
+            report = check(
+                configuration,
+                PipelineOptions(
+                    jobs=1,
+                    verify_with=(
+                        Interpreter(sys.version_info.minor, sys.executable),
+                    ),
+                ),
+            )
+            self.assertEqual(
+                [finding.rule for finding in report.findings],
+                ["compile-error", "syntax-error"],
+            )
+
+    def test_verify_with_interpreters_pragmas(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            wheel = Path(tmp) / "package-1.0-py3-none-any.whl"
+            with zipfile.ZipFile(wheel, mode="w") as zip_file:
+                zip_file.writestr(
+                    "package/skipped.py", "# compat: skip-file\nprint 1\n"
+                )
+                zip_file.writestr(
+                    "package/ignored.py",
+                    "print 1  # compat: ignore[compile-error]\n",
+                )
+            configuration = CheckConfiguration(
+                8, 10, None, {wheel}, set()
+            ).check_and_resolve()
+            report = check(
+                configuration,
+                PipelineOptions(
+                    jobs=1,
+                    archive_cache=None,
+                    verify_with=(
+                        Interpreter(sys.version_info.minor, sys.executable),
+                    ),
+                ),
+            )
+            # Only the compile error is ignored
+            self.assertEqual(
+                [(finding.path, finding.rule) for finding in report.findings],
+                [
+                    (
+                        f"{display_path(wheel)}/package/ignored.py",
+                        "syntax-error",
+                    )
+                ],
+            )
+
+    def test_interpreter_crash_is_not_a_finding(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "a.py"
+            path.write_text("x = 1\n", encoding="UTF-8")
+            configuration = CheckConfiguration(
+                8, 10, None, {path}, set()
+            ).check_and_resolve()
+            with mock.patch.object(
+                InterpreterPool,
+                "compile",
+                side_effect=VerifyError("the interpreter crashed"),
+            ), self.assertLogs("pipeline", level="WARNING"):
+                report = check(
+                    configuration,
+                    PipelineOptions(
+                        jobs=1,
+                        verify_with=(
+                            Interpreter(sys.version_info.minor, sys.executable),
+                        ),
+                    ),
+                )
+            self.assertEqual(report.findings, [])
+            self.assertEqual(
+                list(report.skipped.values()), ["the interpreter crashed"]
+            )
+
+    def test_paths(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            configuration = _make_tree(Path(tmp))
+            counters = Counters(0)
+            # Streamed instead of the included files
+            report = check(
+                dataclasses.replace(configuration, include=set()),
+                PipelineOptions(jobs=1),
+                counters,
+                iter(sorted(configuration.include)),
+            )
+            self.assertEqual(
+                report, check(configuration, PipelineOptions(jobs=1))
+            )
+            self.assertEqual(counters.total, 2)
+
+    def test_missing_listed_paths(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            configuration = _make_tree(Path(tmp))
+            missing = [Path(tmp) / "missing.py", Path(tmp) / "missing.ipynb"]
+            report = check(
+                dataclasses.replace(configuration, include=set()),
+                PipelineOptions(jobs=1),
+                paths=iter([*sorted(configuration.include), *missing]),
+            )
+            self.assertEqual(report.files, 2)
+            self.assertEqual(
+                sorted(report.skipped),
+                sorted(display_path(path) for path in missing),
+            )
+
+    def test_progress(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            configuration = _make_tree(Path(tmp))
+            counters = Counters(len(configuration.include))
+            calls: List[int] = []
+            check(
+                configuration,
+                PipelineOptions(
+                    jobs=1,
+                    on_progress=lambda counters: calls.append(counters.done),
+                ),
+                counters,
+            )
+            self.assertEqual(counters.done, counters.total)
+            self.assertGreater(counters.bytes_read, 0)
+            # Rendered from the start of the check
+            self.assertEqual(calls[0], 0)
+
+    def test_check_with_process_pool(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            configuration = _make_tree(Path(tmp))
+            self.assertEqual(
+                check(configuration, PipelineOptions(jobs=2, readers=2)),
+                check(configuration, PipelineOptions(jobs=1, readers=1)),
+            )
+
+    def test_worker_recycling(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            configuration = _make_tree(Path(tmp))
+            # No file is lost or checked twice when the workers are replaced
+            self.assertEqual(
+                check(
+                    configuration, PipelineOptions(jobs=2, worker_max_files=1)
+                ),
+                check(configuration, PipelineOptions(jobs=1)),
+            )
+
+    def test_fail_fast(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp_root = Path(tmp)
+            for index in range(8):
+                (tmp_root / f"new{index}.py").write_text(
+                    "import tomllib\n", encoding="UTF-8"
+                )
+            configuration = CheckConfiguration(
+                8, 10, None, {tmp_root}, set()
+            ).check_and_resolve()
+            report = check(
+                configuration,
+                PipelineOptions(jobs=1, readers=1, prefetch=1, fail_fast=True),
+            )
+            self.assertFalse(report.complete)
+            self.assertEqual(report.files, 1)
+            self.assertEqual(len(report.findings), 1)
+
+            report = check(
+                configuration, PipelineOptions(jobs=2, fail_fast=True)
+            )
+            self.assertFalse(report.complete)
+            self.assertLess(report.files, 8)
+
+    def test_fail_fast_without_incompatibility(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            (Path(tmp) / "ok.py").write_text("import os\n", encoding="UTF-8")
+            configuration = CheckConfiguration(
+                8, 10, None, {Path(tmp)}, set()
+            ).check_and_resolve()
+            report = check(
+                configuration, PipelineOptions(jobs=1, fail_fast=True)
+            )
+            self.assertTrue(report.complete)
+            self.assertEqual(report.files, 1)
+
+    def test_file_timeout(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp_root = Path(tmp)
+            (tmp_root / "huge.py").write_text(
+                "x = [\n" + "    1,\n" * 500000 + "]\n", encoding="UTF-8"
+            )
+            (tmp_root / "new.py").write_text(
+                "import tomllib\n", encoding="UTF-8"
+            )
+            configuration = CheckConfiguration(
+                8, 10, None, {tmp_root}, set()
+            ).check_and_resolve()
+            report = check(
+                configuration, PipelineOptions(jobs=1, file_timeout=0.01)
+            )
+            ((path, reason),) = report.skipped.items()
+            self.assertTrue(path.endswith("huge.py"))
+            self.assertTrue(reason.startswith("budget exceeded: Timeout"))
+            # The worker is replaced and checks the rest
+            self.assertEqual(report.files, 1)
+            self.assertEqual(
+                [finding.rule for finding in report.findings], ["tomllib"]
+            )
+
+    @unittest.skipIf(
+        not sys.platform.startswith("linux"), "Memory limit is Linux only"
+    )
+    def test_file_memory_limit(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp_root = Path(tmp)
+            (tmp_root / "huge.py").write_text(
+                "x = [\n" + "    1,\n" * 500000 + "]\n", encoding="UTF-8"
+            )
+            (tmp_root / "ok.py").write_text("import os\n", encoding="UTF-8")
+            configuration = CheckConfiguration(
+                8, 10, None, {tmp_root}, set()
+            ).check_and_resolve()
+            report = check(
+                configuration,
+                PipelineOptions(jobs=1, file_memory_limit=16 * 1024 * 1024),
+            )
+            ((path, reason),) = report.skipped.items()
+            self.assertTrue(path.endswith("huge.py"))
+            self.assertTrue(reason.startswith("budget exceeded: Memory"))
+            self.assertEqual(report.files, 1)
+
+    def test_recursion_limit(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp_root = Path(tmp)
+            (tmp_root / "deep.py").write_text(
+                "x = " + "+".join(["1"] * 100000) + "\n", encoding="UTF-8"
+            )
+            (tmp_root / "new.py").write_text(
+                "import tomllib\n", encoding="UTF-8"
+            )
+            configuration = CheckConfiguration(
+                8, 10, None, {tmp_root}, set()
+            ).check_and_resolve()
+            # In the calling thread and in a worker process
+            for options in (
+                PipelineOptions(jobs=1),
+                PipelineOptions(jobs=1, worker_max_files=10),
+            ):
+                with self.subTest(options=options):
+                    report = check(configuration, options)
+                    self.assertEqual(
+                        report.skipped,
+                        {
+                            display_path(
+                                tmp_root / "deep.py"
+                            ): "budget exceeded: recursion limit"
+                        },
+                    )
+                    # The worker checks the rest
+                    self.assertEqual(report.files, 1)
+                    self.assertEqual(
+                        [finding.rule for finding in report.findings],
+                        ["tomllib"],
+                    )
+
+    def test_unreadable_file(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            configuration = CheckConfiguration(
+                8, 10, None, {Path(tmp) / "removed.py"}, set()
+            )
+            report = check(configuration, PipelineOptions(jobs=1))
+            self.assertEqual(report.files, 0)
+            self.assertEqual(
+                list(report.skipped),
+                [display_path(Path(tmp) / "removed.py")],
+            )
+
+    def test_archive(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp_root = Path(tmp)
+            wheel = tmp_root / "package-1.0-py3-none-any.whl"
+            with zipfile.ZipFile(wheel, mode="w") as zip_file:
+                zip_file.writestr("package/__init__.py", "import os\n")
+                zip_file.writestr("package/new.py", "import tomllib\n")
+            configuration = CheckConfiguration(
+                8, 10, None, {wheel}, set()
+            ).check_and_resolve()
+            options = PipelineOptions(jobs=1, archive_cache=tmp_root / "cache")
+            report = check(configuration, options)
+            self.assertEqual(report.files, 2)
+            ((path, rule),) = [
+                (finding.path, finding.rule) for finding in report.findings
+            ]
+            self.assertTrue(path.endswith(".whl/package/new.py"))
+            self.assertEqual(rule, "tomllib")
+
+            # The results are cached by the hash of the archive
+            counters = Counters(1)
+            with mock.patch.object(archives, "members") as members:
+                self.assertEqual(
+                    check(configuration, options, counters), report
+                )
+            members.assert_not_called()
+            self.assertEqual(
+                (counters.cache_hits, counters.files_cached), (1, 2)
+            )
+
+            # Not used with other rule plugins
+            counters = Counters(1)
+            with mock.patch.object(
+                plugins, "cache_key", return_value="-0123456789abcdef"
+            ):
+                self.assertEqual(
+                    check(configuration, options, counters), report
+                )
+            self.assertEqual(counters.cache_hits, 0)
+
+    def test_skip_file(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            configuration = _make_tree(Path(tmp))
+            skipped = Path(tmp) / "package" / "skipped.py"
+            skipped.write_text(
+                "# compat: skip-file\nimport tomllib\n", encoding="UTF-8"
+            )
+            configuration = CheckConfiguration(
+                8, 10, None, {Path(tmp) / "package"}, set()
+            ).check_and_resolve()
+            counters = Counters(3)
+            report = check(configuration, PipelineOptions(jobs=1), counters)
+            self.assertEqual(report.files, 2)
+            self.assertEqual(report.skipped, {})
+            self.assertEqual(
+                {Path(finding.path).name for finding in report.findings},
+                {"new.py"},
+            )
+            self.assertEqual(counters.done, 3)
+
+    def test_tree_cache(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp_root = Path(tmp)
+            _make_tree(tmp_root)
+            (tmp_root / "package" / "sub").mkdir()
+            sub_path = tmp_root / "package" / "sub" / "a.py"
+            sub_path.write_text("import os\n", encoding="UTF-8")
+            configuration = CheckConfiguration(
+                8, 10, None, {tmp_root / "package"}, set()
+            ).check_and_resolve()
+            options = PipelineOptions(jobs=1, tree_cache=tmp_root / "cache")
+            report = check(configuration, options)
+            self.assertEqual(report.files, 3)
+
+            # Nothing changed, nothing is analyzed
+            counters = Counters(3)
+            self.assertEqual(check(configuration, options, counters), report)
+            self.assertEqual(
+                (counters.done, counters.files_analyzed, counters.files_cached),
+                (3, 0, 3),
+            )
+            self.assertEqual(counters.cache_lookups, counters.cache_hits)
+            self.assertGreater(counters.cache_hits, 0)
+
+            # The unchanged subdirectory is still reused
+            (tmp_root / "package" / "ok.py").write_text(
+                "import os, sys\n", encoding="UTF-8"
+            )
+            counters = Counters(3)
+            self.assertEqual(check(configuration, options, counters), report)
+            self.assertEqual(
+                (counters.files_analyzed, counters.files_cached), (2, 1)
+            )
+            self.assertLess(counters.cache_hits, counters.cache_lookups)
+
+            sub_path.write_text("import tomllib\n", encoding="UTF-8")
+            report = check(configuration, options)
+            self.assertEqual(
+                [finding.rule for finding in report.findings],
+                ["tomllib", "graphlib", "tomllib"],
+            )
+
+            # Results of other rules are not reused
+            with mock.patch.object(
+                pipeline, "_analysis_digest", return_value="other"
+            ):
+                counters = Counters(3)
+                check(configuration, options, counters)
+                self.assertEqual(counters.files_analyzed, 3)
+
+    def test_notebook(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            notebook = Path(tmp) / "a.ipynb"
+            notebook.write_text(
+                json.dumps(
+                    {
+                        "cells": [
+                            {"cell_type": "code", "source": "import os\n"},
+                            {
+                                "cell_type": "markdown",
+                                "source": "import tomllib",
+                            },
+                            {
+                                "cell_type": "code",
+                                "source": ["%time 1\n", "import tomllib\n"],
+                            },
+                        ],
+                        "metadata": {},
+                    }
+                ),
+                encoding="UTF-8",
+            )
+            configuration = CheckConfiguration(
+                8, 10, None, {Path(tmp)}, set()
+            ).check_and_resolve()
+            report = check(configuration, PipelineOptions(jobs=1))
+            self.assertEqual(report.files, 1)
+            ((path, line, rule),) = [
+                (finding.path, finding.line, finding.rule)
+                for finding in report.findings
+            ]
+            self.assertTrue(path.endswith("a.ipynb:cell_3"))
+            self.assertEqual((line, rule), (2, "tomllib"))
@@ -0,0 +1,135 @@
+"""
+Tests for plugins.py
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import ast
+import unittest
+from typing import List, Optional
+from unittest import mock
+
+import importlib_metadata
+
+from .. import plugins
+from ..analysis import analyze_source
+from ..plugins import (
+    Dispatcher,
+    load_plugins,
+    parse_name,
+    ParsePluginNameError,
+    RulePlugin,
+)
+
+CHECKED: List[ast.AST] = []
+
+
+def _banned_backport(
+    node: ast.AST, min_version: int, max_version: int
+) -> Optional[str]:
+    CHECKED.append(node)
+    if isinstance(node, ast.Name) and node.id == "importlib_metadata":
+        return "`importlib_metadata` is a backport of `importlib.metadata`"
+    return None
+
+
+PLUGIN: RulePlugin = RulePlugin(
+    "banned-backports", (ast.Name,), _banned_backport
+)
+
+
+def _entry_point(name: str, value: str) -> importlib_metadata.EntryPoint:
+    return importlib_metadata.EntryPoint(name, value, plugins.ENTRY_POINT_GROUP)
+
+
+class TestPlugins(unittest.TestCase):
+    def setUp(self) -> None:
+        for cached in (plugins._entry_points, load_plugins, plugins.dispatcher):
+            cached.cache_clear()
+        self.addCleanup(plugins.dispatcher.cache_clear)
+        self.addCleanup(load_plugins.cache_clear)
+        self.addCleanup(plugins._entry_points.cache_clear)
+        CHECKED.clear()
+
+    def test_parse_name(self) -> None:
+        self.assertEqual(parse_name("rule"), ("rule", None, None))
+        self.assertEqual(parse_name("rule@3.8-3.12"), ("rule", 8, 12))
+        self.assertEqual(parse_name("rule@-3.9"), ("rule", None, 9))
+        self.assertEqual(parse_name("rule@3.10-"), ("rule", 10, None))
+        for name in ("rule@3.8", "@3.8-3.9", "rule@8-9"):
+            with self.assertRaises(ParsePluginNameError):
+                parse_name(name)
+
+    def test_only_plugins_of_the_range_are_loaded(self) -> None:
+        entry_points = (
+            _entry_point("banned-backports@3.8-3.9", f"{__name__}:PLUGIN"),
+            # Never imported for 3.8 to 3.9
+            _entry_point("future@3.13-", "missing_module:PLUGIN"),
+            _entry_point("bad@3", "missing_module:PLUGIN"),
+        )
+        with mock.patch.object(
+            plugins, "_entry_points", return_value=entry_points
+        ), self.assertLogs("plugins", level="WARNING") as logs:
+            self.assertEqual(load_plugins(8, 9), (PLUGIN,))
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn("bad@3", logs.output[0])
+
+    def test_broken_plugin(self) -> None:
+        entry_points = (
+            _entry_point("missing", "missing_module:PLUGIN"),
+            _entry_point("not-a-plugin", f"{__name__}:_entry_point"),
+        )
+        with mock.patch.object(
+            plugins, "_entry_points", return_value=entry_points
+        ), self.assertLogs("plugins", level="WARNING") as logs:
+            self.assertEqual(load_plugins(8, 9), ())
+        self.assertEqual(len(logs.output), 2)
+
+    def test_dispatch(self) -> None:
+        dispatcher = Dispatcher([PLUGIN])
+        self.assertEqual(dispatcher.plugins_for(ast.Name), (PLUGIN,))
+        self.assertEqual(dispatcher.plugins_for(ast.Call), ())
+
+        with mock.patch.object(
+            plugins, "_entry_points", return_value=()
+        ), mock.patch.object(plugins, "load_plugins", return_value=(PLUGIN,)):
+            findings = analyze_source(
+                b"import importlib_metadata\n"
+                b"print(importlib_metadata.version('x'))\n",
+                "a.py",
+                8,
+                9,
+            )
+        self.assertEqual(
+            [(finding.line, finding.rule) for finding in findings],
+            [(2, "banned-backports")],
+        )
+        # Only the names are checked, including those of dotted names
+        self.assertTrue(all(isinstance(node, ast.Name) for node in CHECKED))
+        self.assertEqual(len(CHECKED), 2)
+
+    def test_no_plugin(self) -> None:
+        with mock.patch.object(plugins, "_entry_points", return_value=()):
+            self.assertIsNone(plugins.dispatcher(8, 9))
+
+    def test_cache_key(self) -> None:
+        with mock.patch.object(plugins, "_entry_points", return_value=()):
+            self.assertEqual(plugins.cache_key(), "")
+        entry_points = (_entry_point("rule@3.8-", f"{__name__}:PLUGIN"),)
+        with mock.patch.object(
+            plugins, "_entry_points", return_value=entry_points
+        ):
+            self.assertRegex(plugins.cache_key(), r"^-[0-9a-f]{16}$")
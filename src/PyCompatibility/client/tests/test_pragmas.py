@@ -0,0 +1,92 @@
+"""
+Tests for pragmas.py
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import unittest
+from unittest import mock
+
+from ..analysis import analyze_source
+from ..pragmas import ignore_table, ignored, skips_file
+
+
+class TestPragmas(unittest.TestCase):
+    def test_skips_file(self) -> None:
+        self.assertTrue(skips_file(b"# compat: skip-file\nimport tomllib\n"))
+        self.assertTrue(
+            skips_file(
+                b"\xef\xbb\xbf#!/usr/bin/env python\n\n#compat:skip-file\n"
+            )
+        )
+        # Only the header counts
+        self.assertFalse(
+            skips_file(b"import os\n# compat: skip-file\nimport tomllib\n")
+        )
+        self.assertFalse(skips_file(b"# compat: ignore\n"))
+
+    def test_ignore_table(self) -> None:
+        table = ignore_table(
+            b"import tomllib  # compat: ignore[tomllib, graphlib]\n"
+            b"import graphlib  # compat: ignore\n"
+            b'x = "# compat: ignore"\n'
+        )
+        self.assertEqual(
+            table, {1: frozenset(("tomllib", "graphlib")), 2: None}
+        )
+        self.assertTrue(ignored(table, 1, "tomllib"))
+        self.assertFalse(ignored(table, 1, "match-statement"))
+        self.assertTrue(ignored(table, 2, "match-statement"))
+        self.assertFalse(ignored(table, 3, "tomllib"))
+
+    def test_not_tokenized_without_pragma(self) -> None:
+        with mock.patch("tokenize.tokenize") as tokenize:
+            self.assertEqual(ignore_table(b"import os\n"), {})
+        tokenize.assert_not_called()
+
+    def test_broken_source(self) -> None:
+        self.assertEqual(
+            ignore_table(b"import tomllib  # compat: ignore\nx = (\n"),
+            {1: None},
+        )
+
+    def test_analysis(self) -> None:
+        source = (
+            b"import tomllib  # compat: ignore[tomllib]\n" b"import graphlib\n"
+        )
+        findings = analyze_source(source, "a.py", 8, 10)
+        self.assertEqual(
+            [(finding.line, finding.rule) for finding in findings],
+            [(2, "graphlib")],
+        )
+        # Ignoring a finding keeps the fingerprints of the others
+        (unignored,) = [
+            finding
+            for finding in analyze_source(
+                source.replace(b"ignore[tomllib]", b""), "a.py", 8, 10
+            )
+            if finding.rule == "graphlib"
+        ]
+        self.assertEqual(unignored.fingerprint, findings[0].fingerprint)
+
+        with mock.patch("ast.parse") as parse:
+            self.assertEqual(
+                analyze_source(
+                    b"# compat: skip-file\n" + source, "a.py", 8, 10
+                ),
+                [],
+            )
+        parse.assert_not_called()
@@ -0,0 +1,68 @@
+"""
+Tests for progress.py
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import io
+import unittest
+
+from ..progress import Counters, ProgressReporter, render
+
+
+class _Terminal(io.StringIO):
+    def isatty(self) -> bool:
+        return True
+
+
+class TestProgress(unittest.TestCase):
+    def test_render(self) -> None:
+        counters = Counters(
+            total=300, done=100, bytes_read=2_000_000, started=0
+        )
+        self.assertEqual(
+            render(counters, 10),
+            "100/300 files, 10.0 files/s, 0.2 MB/s, ETA 0:20",
+        )
+        self.assertEqual(
+            render(Counters(total=3, started=0), 10),
+            "0/3 files, 0.0 files/s, 0.0 MB/s, ETA -:--",
+        )
+
+    def test_log_stream(self) -> None:
+        stream = io.StringIO()
+        reporter = ProgressReporter(stream, enable_color=False)
+        counters = Counters(total=2)
+        for _ in range(100):
+            reporter(counters)
+        counters.done = 2
+        reporter.close(counters)
+        # Written at most every `LOG_INTERVAL`
+        first, last = stream.getvalue().splitlines()
+        self.assertTrue(first.startswith("[Info] progress: 0/2 files"))
+        self.assertTrue(last.startswith("[Info] progress: 2/2 files"))
+
+    def test_terminal(self) -> None:
+        stream = _Terminal()
+        reporter = ProgressReporter(stream, enable_color=False)
+        counters = Counters(total=2)
+        reporter(counters)
+        counters.done = 2
+        reporter.close(counters)
+        output = stream.getvalue()
+        self.assertEqual(output.count("\r"), 2)
+        self.assertTrue(output.endswith("\n"))
+        self.assertIn("2/2 files", output.split("\r")[-1])
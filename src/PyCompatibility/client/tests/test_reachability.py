@@ -0,0 +1,131 @@
+"""
+Tests for reachability.py
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import tempfile
+import textwrap
+import unittest
+from pathlib import Path
+
+from ..configuration import CheckConfiguration
+from ..reachability import (
+    entry_point_module,
+    imported_modules,
+    module_names,
+    reachable,
+    UnknownEntryPointError,
+)
+
+
+class TestImportedModules(unittest.TestCase):
+    def test_imports(self) -> None:
+        source = textwrap.dedent(
+            '''\
+            """
+            from docstring import nothing
+            """
+            import a.b
+            from c import (
+                d,
+                e,
+            )
+            from f \\
+                import g
+
+            def func():
+                import h
+            '''
+        ).encode()
+        self.assertEqual(
+            imported_modules(source, "package.module", False),
+            {"a", "a.b", "c", "c.d", "c.e", "f", "f.g", "h"},
+        )
+
+    def test_relative_imports(self) -> None:
+        source = b"from . import a\nfrom ..b import c\n"
+        self.assertEqual(
+            imported_modules(source, "root.package.module", False),
+            {"root", "root.package", "root.package.a", "root.b", "root.b.c"},
+        )
+        self.assertEqual(
+            imported_modules(b"from . import a\n", "root.package", True),
+            {"root", "root.package", "root.package.a"},
+        )
+
+
+class TestReachable(unittest.TestCase):
+    def test_reachable(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp).resolve()
+            package = root / "package"
+            package.mkdir()
+            (root / "tools").mkdir()
+            for path, source in (
+                ("package/__init__.py", "from .util import helper\n"),
+                ("package/cli.py", "from . import core\n"),
+                ("package/core.py", "import os\n"),
+                ("package/util.py", "import tomllib\n"),
+                ("package/dead.py", "import tomllib\n"),
+                ("tools/script.py", "import package.dead\n"),
+            ):
+                (root / path).write_text(source, encoding="UTF-8")
+            configuration = CheckConfiguration(
+                8, 10, None, {root}, set()
+            ).check_and_resolve()
+            modules = module_names(configuration.include)
+            self.assertEqual(modules["package.cli"], package / "cli.py")
+            self.assertEqual(modules["script"], root / "tools" / "script.py")
+            # `tools` may be a namespace package
+            self.assertEqual(
+                modules["tools.script"], root / "tools" / "script.py"
+            )
+            self.assertEqual(
+                reachable(
+                    configuration, [entry_point_module("package.cli:main")]
+                ).include,
+                {
+                    package / name
+                    for name in ("__init__.py", "cli.py", "core.py", "util.py")
+                },
+            )
+            with self.assertRaises(UnknownEntryPointError):
+                reachable(configuration, ["missing"])
+
+    def test_parent_packages(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp).resolve()
+            package = root / "package"
+            (package / "sub").mkdir(parents=True)
+            for path, source in (
+                ("package/__init__.py", "import tomllib\n"),
+                ("package/sub/__init__.py", ""),
+                ("package/sub/cli.py", "import os\n"),
+                ("package/other.py", "import os\n"),
+            ):
+                (root / path).write_text(source, encoding="UTF-8")
+            configuration = CheckConfiguration(
+                8, 10, None, {root}, set()
+            ).check_and_resolve()
+            self.assertEqual(
+                reachable(configuration, ["package.sub.cli"]).include,
+                {
+                    package / "__init__.py",
+                    package / "sub" / "__init__.py",
+                    package / "sub" / "cli.py",
+                },
+            )
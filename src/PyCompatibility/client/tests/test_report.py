@@ -0,0 +1,236 @@
+"""
+Tests for report.py
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import io
+import json
+import unittest
+from typing import List
+
+from ..analysis import Finding
+from ..report import (
+    CheckReport,
+    merge_reports,
+    MergeReportError,
+    ReadReportError,
+    ReportReader,
+    write_report,
+)
+
+
+def _written(report: CheckReport, ndjson: bool = False) -> io.StringIO:
+    buf = io.StringIO()
+    write_report(report, buf, ndjson)
+    buf.seek(0)
+    return buf
+
+
+def _finding(path: str, line: int, rule: str = "tomllib") -> Finding:
+    return Finding(path, line, 0, rule, "message")
+
+
+class TestReport(unittest.TestCase):
+    def test_write_report(self) -> None:
+        report = CheckReport(
+            8,
+            10,
+            [
+                Finding("b.py", 1, 0, "tomllib", "message"),
+                Finding("a.py", 1, 0, "tomllib", "message"),
+            ],
+            2,
+        )
+        with io.StringIO() as buf:
+            write_report(report, buf)
+            lines = buf.getvalue().splitlines()
+            self.assertEqual(
+                json.loads("\n".join(lines)),
+                {
+                    "min_version": 8,
+                    "max_version": 10,
+                    "findings": [
+                        {
+                            "path": "a.py",
+                            "line": 1,
+                            "column": 0,
+                            "rule": "tomllib",
+                            "message": "message",
+                            "fingerprint": "",
+                        },
+                        {
+                            "path": "b.py",
+                            "line": 1,
+                            "column": 0,
+                            "rule": "tomllib",
+                            "message": "message",
+                            "fingerprint": "",
+                        },
+                    ],
+                    "skipped": {},
+                    "summary": {
+                        "complete": True,
+                        "files": 2,
+                        "findings": 2,
+                        "skipped": 0,
+                        "rules": {"tomllib": 2},
+                    },
+                },
+            )
+            # One finding per line
+            self.assertEqual(
+                Finding.from_dict(json.loads(lines[4].rstrip(","))),
+                Finding("a.py", 1, 0, "tomllib", "message"),
+            )
+
+    def test_write_empty_report(self) -> None:
+        with io.StringIO() as buf:
+            write_report(CheckReport(8, 10), buf)
+            self.assertEqual(json.loads(buf.getvalue())["findings"], [])
+
+    def test_write_ndjson_report(self) -> None:
+        report = CheckReport(8, 10, [_finding("a.py", 1)], 1)
+        self.assertEqual(
+            [json.loads(line) for line in _written(report, ndjson=True)],
+            [
+                {"min_version": 8, "max_version": 10},
+                _finding("a.py", 1).serialize(),
+                {
+                    "skipped": {},
+                    "summary": {
+                        "complete": True,
+                        "files": 1,
+                        "findings": 1,
+                        "skipped": 0,
+                        "rules": {"tomllib": 1},
+                    },
+                },
+            ],
+        )
+
+
+class TestReadReport(unittest.TestCase):
+    def test_read(self) -> None:
+        report = CheckReport(
+            8,
+            10,
+            [_finding("a.py", 2), _finding("a.py", 1)],
+            3,
+            False,
+            {"c.py": "budget exceeded"},
+        )
+        for ndjson in (False, True):
+            with self.subTest(ndjson=ndjson):
+                reader = ReportReader(_written(report, ndjson))
+                self.assertEqual(
+                    (reader.min_version, reader.max_version), (8, 10)
+                )
+                self.assertEqual(
+                    list(reader.findings()),
+                    [_finding("a.py", 1), _finding("a.py", 2)],
+                )
+                self.assertEqual(reader.files, 3)
+                self.assertFalse(reader.complete)
+                self.assertEqual(reader.skipped, {"c.py": "budget exceeded"})
+
+    def test_read_empty(self) -> None:
+        for ndjson in (False, True):
+            with self.subTest(ndjson=ndjson):
+                reader = ReportReader(_written(CheckReport(8, 10), ndjson))
+                self.assertEqual(list(reader.findings()), [])
+                self.assertTrue(reader.complete)
+
+    def test_not_a_report(self) -> None:
+        with self.assertRaises(ReadReportError):
+            ReportReader(io.StringIO("not a report\n"))
+        with self.assertRaises(ReadReportError):
+            ReportReader(io.StringIO('{"min_version": 8}\n'))
+
+
+class TestMergeReports(unittest.TestCase):
+    def _merge(self, *reports: CheckReport, ndjson: bool = False) -> str:
+        buf = io.StringIO()
+        merge_reports(
+            [
+                ReportReader(_written(report, index % 2 == 0))
+                for index, report in enumerate(reports)
+            ],
+            buf,
+            ndjson,
+        )
+        return buf.getvalue()
+
+    def test_merge(self) -> None:
+        reports: List[CheckReport] = [
+            CheckReport(8, 10, [_finding("a.py", 1), _finding("c.py", 1)], 2),
+            CheckReport(
+                8,
+                10,
+                [_finding("b.py", 1, "graphlib"), _finding("d.py", 1)],
+                3,
+                skipped={"e.py": "budget exceeded"},
+            ),
+            CheckReport(8, 10, [], 1),
+        ]
+        merged = json.loads(self._merge(*reports))
+        self.assertEqual(
+            [finding["path"] for finding in merged["findings"]],
+            ["a.py", "b.py", "c.py", "d.py"],
+        )
+        self.assertEqual(merged["skipped"], {"e.py": "budget exceeded"})
+        self.assertEqual(
+            merged["summary"],
+            {
+                "complete": True,
+                "files": 6,
+                "findings": 4,
+                "skipped": 1,
+                "rules": {"graphlib": 1, "tomllib": 3},
+            },
+        )
+        self.assertEqual(
+            self._merge(*reports),
+            _written(
+                CheckReport(
+                    8,
+                    10,
+                    [
+                        finding
+                        for report in reports
+                        for finding in report.findings
+                    ],
+                    6,
+                    skipped={"e.py": "budget exceeded"},
+                )
+            ).getvalue(),
+        )
+
+    def test_merge_different_versions(self) -> None:
+        with self.assertRaises(MergeReportError):
+            self._merge(CheckReport(8, 10), CheckReport(8, 11))
+
+    def test_merge_unsorted(self) -> None:
+        unsorted = io.StringIO(
+            '{"max_version": 10, "min_version": 8}\n'
+            + json.dumps(_finding("b.py", 1).serialize())
+            + "\n"
+            + json.dumps(_finding("a.py", 1).serialize())
+            + "\n"
+            + '{"skipped": {}, "summary": {"complete": true, "files": 2}}\n'
+        )
+        with self.assertRaises(MergeReportError):
+            merge_reports([ReportReader(unsorted)], io.StringIO())
@@ -0,0 +1,61 @@
+"""
+Tests for tables.py
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import unittest
+
+from .. import rules, stdlib_table, versions
+from ..tables import pack, PackedTable, ReadTableError
+
+
+class TestTables(unittest.TestCase):
+    def test_pack(self) -> None:
+        table = PackedTable(
+            pack({"b": (None, 12), "a.b": (9, None), "é": (10, 13)})
+        )
+        self.assertEqual(len(table), 3)
+        self.assertEqual(table.get("a.b"), (9, None))
+        self.assertEqual(table.get("b"), (None, 12))
+        self.assertEqual(table.get("é"), (10, 13))
+        self.assertIsNone(table.get("a"))
+
+    def test_invalid_table(self) -> None:
+        with self.assertRaises(ReadTableError):
+            PackedTable(b"PC")
+        with self.assertRaises(ReadTableError):
+            PackedTable(b"JSON" + pack({})[4:])
+
+    def test_stdlib_rules(self) -> None:
+        for name, (added, removed) in versions.STDLIB_VERSIONS.items():
+            self.assertEqual(
+                rules.stdlib_rule(name),
+                rules.Rule(name, f"`{name}`", added, removed),
+            )
+        self.assertIsNone(rules.stdlib_rule("os"))
+
+    def test_generated_stdlib_table(self) -> None:
+        # Run `python generate_tables.py` after editing `versions.py`
+        self.assertEqual(stdlib_table.DATA, pack(versions.STDLIB_VERSIONS))
+        self.assertEqual(
+            stdlib_table.NEWEST_ADDED,
+            max(
+                added
+                for added, _ in versions.STDLIB_VERSIONS.values()
+                if added is not None
+            ),
+        )
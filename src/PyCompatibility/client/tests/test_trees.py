@@ -0,0 +1,159 @@
+"""
+Tests for trees.py
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from typing import List
+
+from ..analysis import Finding
+from ..trees import directory_digests, source_file, TreeIndex
+
+FINDING: Finding = Finding("a/b/c.py", 1, 0, "tomllib", "message", "0" * 16)
+
+
+def _make_files(root: Path) -> List[Path]:
+    (root / "a" / "b").mkdir(parents=True)
+    paths = [root / "a" / "x.py", root / "a" / "b" / "c.py"]
+    for path in paths:
+        path.write_text("import os\n", encoding="UTF-8")
+    return paths
+
+
+class TestDirectoryDigests(unittest.TestCase):
+    def test_changes_up_to_the_root(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            paths = _make_files(root)
+            digests = directory_digests(paths)
+            self.assertEqual(directory_digests(paths), digests)
+            self.assertIn(Path(root.anchor), digests)
+
+            stat = paths[1].stat()
+            os.utime(paths[1], ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+            changed = directory_digests(paths)
+            for directory in (root / "a" / "b", root / "a", root):
+                self.assertNotEqual(changed[directory], digests[directory])
+
+    def test_checked_files_only(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            paths = _make_files(root)
+            digests = directory_digests(paths)
+            (root / "a" / "README.md").write_text("", encoding="UTF-8")
+            self.assertEqual(directory_digests(paths), digests)
+            self.assertNotEqual(directory_digests(paths[:1]), digests)
+
+
+class TestTreeIndex(unittest.TestCase):
+    def test_source_file(self) -> None:
+        displays = {
+            "a/b.whl": Path("/a/b.whl"),
+            "a/c.ipynb": Path("/a/c.ipynb"),
+        }
+        self.assertEqual(
+            source_file("a/b.whl/package/x.py", displays), Path("/a/b.whl")
+        )
+        self.assertEqual(
+            source_file("a/c.ipynb:cell_2", displays), Path("/a/c.ipynb")
+        )
+        self.assertIsNone(source_file("a/d.py", displays))
+
+    def test_unchanged(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            paths = _make_files(root)
+            digests = directory_digests(paths)
+            index = TreeIndex("1")
+            self.assertEqual(index.unchanged(digests), set())
+
+            displays = {"a/x.py": paths[0], "a/b/c.py": paths[1]}
+            index.update(
+                digests,
+                set(),
+                set(paths),
+                {"a/x.py": (1, []), "a/b/c.py": (1, [FINDING])},
+                (),
+                displays,
+            )
+            # The outermost directory is the root
+            self.assertEqual(index.unchanged(digests), {Path(root.anchor)})
+            self.assertEqual(
+                index.findings(digests, {Path(root.anchor)}), (2, [FINDING])
+            )
+
+            paths[0].write_text("import sys, os\n", encoding="UTF-8")
+            digests = directory_digests(paths)
+            unchanged = index.unchanged(digests)
+            self.assertEqual(unchanged, {root / "a" / "b"})
+            self.assertEqual(index.findings(digests, unchanged), (1, [FINDING]))
+
+    def test_skipped_files_are_not_indexed(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            paths = _make_files(root)
+            digests = directory_digests(paths)
+            index = TreeIndex("1")
+            index.update(
+                digests,
+                set(),
+                set(paths),
+                {"a/x.py": (1, [])},
+                ("a/b/c.py",),
+                {"a/x.py": paths[0], "a/b/c.py": paths[1]},
+            )
+            self.assertEqual(index.directories, {})
+
+    def test_unvisited_directories_are_pruned(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            paths = _make_files(root)
+            outside = str(root.parent / "other-tree")
+            index = TreeIndex(
+                "1",
+                {
+                    str(root / "a" / "removed"): ("digest", 1, [FINDING]),
+                    outside: ("digest", 1, []),
+                },
+            )
+            index.update(
+                directory_digests(paths),
+                set(),
+                set(paths),
+                {"a/x.py": (1, []), "a/b/c.py": (1, [])},
+                (),
+                {"a/x.py": paths[0], "a/b/c.py": paths[1]},
+                root / "a",
+            )
+            self.assertNotIn(str(root / "a" / "removed"), index.directories)
+            self.assertIn(outside, index.directories)
+            self.assertIn(str(root / "a" / "b"), index.directories)
+
+    def test_load(self) -> None:
+        index = TreeIndex("1", {"/a": ("digest", 1, [FINDING])})
+        self.assertEqual(TreeIndex.load(index.cache_entry(), "1"), index)
+        self.assertEqual(
+            TreeIndex.load(index.cache_entry(), "2"), TreeIndex("2")
+        )
+        self.assertEqual(
+            TreeIndex.load({"version": "1", "directories": {"/a": {}}}, "1"),
+            TreeIndex("1"),
+        )
+        self.assertEqual(TreeIndex.load(None, "1"), TreeIndex("1"))
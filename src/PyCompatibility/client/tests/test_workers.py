@@ -0,0 +1,56 @@
+"""
+Tests for workers.py
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import multiprocessing
+import sys
+import unittest
+from typing import List, Optional
+
+from ..workers import ProcessWorker, Task
+
+_TASK: Task = Task(b"import tomllib\n", "test.py", 8, 10)
+
+
+def _pids(worker: ProcessWorker, files: int) -> List[Optional[int]]:
+    pids = []
+    try:
+        for _ in range(files):
+            findings = worker.analyze(_TASK)
+            assert findings is not None and len(findings) == 1
+            process = worker._process
+            pids.append(None if process is None else process.pid)
+    finally:
+        worker.close()
+    return pids
+
+
+class TestProcessWorker(unittest.TestCase):
+    def test_max_files(self) -> None:
+        worker = ProcessWorker(multiprocessing.Event(), max_files=2)
+        # Recycled after the second file, the process is gone
+        self.assertEqual(_pids(worker, 4)[1::2], [None, None])
+
+    def test_no_recycling(self) -> None:
+        worker = ProcessWorker(multiprocessing.Event())
+        self.assertEqual(len(set(_pids(worker, 3))), 1)
+
+    @unittest.skipIf(sys.platform == "win32", "RSS is not available on Windows")
+    def test_max_rss(self) -> None:
+        worker = ProcessWorker(multiprocessing.Event(), max_rss=1)
+        self.assertEqual(_pids(worker, 2), [None, None])
@@ -0,0 +1,233 @@
+"""
+Merkle digests of the checked directories, to reuse the findings of unchanged subtrees
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import collections
+import dataclasses
+import hashlib
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .analysis import Finding
+
+LOG: logging.Logger = logging.getLogger("trees")
+
+# Recorded path: files, findings, as recorded by the pipeline before the baseline
+Results = Dict[str, Tuple[int, List[Finding]]]
+
+
+def directory_digests(paths: Iterable[Path]) -> Dict[Path, str]:
+    """
+    The digest of each directory above the checked files, from the names, sizes and
+    modification times of the checked files directly in it, and the digests of its subdirectories.
+    A directory keeps its digest as long as no checked file under it changes.
+    """
+    children: Dict[Path, List[str]] = collections.defaultdict(list)
+    directories: Set[Path] = set()
+    for path in paths:
+        try:
+            stat = path.stat()
+            children[path.parent].append(
+                f"f\0{path.name}\0{stat.st_size}\0{stat.st_mtime_ns}"
+            )
+        except OSError:
+            # Never equal to a digest of a readable file
+            children[path.parent].append(f"e\0{path.name}")
+        directory = path.parent
+        while directory not in directories:
+            directories.add(directory)
+            if directory.parent == directory:
+                break
+            directory = directory.parent
+    digests: Dict[Path, str] = {}
+    # Subdirectories before their parents
+    for directory in sorted(
+        directories, key=lambda directory: len(directory.parts), reverse=True
+    ):
+        digest = hashlib.sha1(
+            "\n".join(sorted(children[directory])).encode(
+                "UTF-8", "surrogateescape"
+            )
+        ).hexdigest()
+        digests[directory] = digest
+        if directory.parent != directory:
+            children[directory.parent].append(f"d\0{directory.name}\0{digest}")
+    return digests
+
+
+def source_file(recorded: str, displays: Dict[str, Path]) -> Optional[Path]:
+    """The checked file of a recorded path, e.g. the archive of a member"""
+    key = recorded.partition(":cell_")[0]
+    while key:
+        if key in displays:
+            return displays[key]
+        key = key.rpartition("/")[0]
+    return None
+
+
+@dataclasses.dataclass
+class TreeIndex:
+    """
+    The digest of each directory with the files checked and the findings of the files directly in it,
+    only kept for directories whose whole subtree was checked
+    """
+
+    version: str
+    # Directory: digest, files, findings
+    directories: Dict[str, Tuple[str, int, List[Finding]]] = dataclasses.field(
+        default_factory=dict
+    )
+
+    @classmethod
+    def load(cls, entry: Any, version: str) -> "TreeIndex":
+        """An empty index if the cache entry is missing, broken or of another version"""
+        index = cls(version)
+        if not isinstance(entry, dict) or entry.get("version") != version:
+            return index
+        try:
+            for directory, item in entry["directories"].items():
+                index.directories[directory] = (
+                    str(item["digest"]),
+                    int(item["files"]),
+                    [
+                        Finding.from_dict(finding)
+                        for finding in item["findings"]
+                    ],
+                )
+        except (AttributeError, KeyError, TypeError, ValueError):
+            LOG.warning("Ignored a broken directory index")
+            return cls(version)
+        return index
+
+    def cache_entry(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "directories": {
+                directory: {
+                    "digest": digest,
+                    "files": files,
+                    "findings": [finding.serialize() for finding in findings],
+                }
+                for directory, (
+                    digest,
+                    files,
+                    findings,
+                ) in self.directories.items()
+            },
+        }
+
+    def unchanged(self, digests: Dict[Path, str]) -> Set[Path]:
+        """The outermost directories whose whole subtree is unchanged since it was indexed"""
+        # Whether the directory and all its subdirectories match, subdirectories first
+        matches: Dict[Path, bool] = {}
+        for directory in sorted(
+            digests, key=lambda directory: len(directory.parts), reverse=True
+        ):
+            entry = self.directories.get(str(directory))
+            matches[directory] = matches.get(directory, True) and (
+                entry is not None and entry[0] == digests[directory]
+            )
+            if directory.parent != directory:
+                matches[directory.parent] = (
+                    matches.get(directory.parent, True) and matches[directory]
+                )
+        return {
+            directory
+            for directory, match in matches.items()
+            if match
+            and (
+                # The root is its own parent
+                directory.parent == directory
+                or not matches.get(directory.parent, False)
+            )
+        }
+
+    def findings(
+        self, digests: Dict[Path, str], roots: Set[Path]
+    ) -> Tuple[int, List[Finding]]:
+        """Files, findings of the indexed directories in the subtrees of `roots`"""
+        files = 0
+        findings: List[Finding] = []
+        for directory in digests:
+            if directory in roots or not roots.isdisjoint(directory.parents):
+                _, directory_files, directory_findings = self.directories[
+                    str(directory)
+                ]
+                files += directory_files
+                findings.extend(directory_findings)
+        return files, findings
+
+    def update(
+        self,
+        digests: Dict[Path, str],
+        reused: Set[Path],
+        checked: Set[Path],
+        results: Results,
+        skipped: Iterable[str],
+        displays: Dict[str, Path],
+        root: Optional[Path] = None,
+    ) -> None:
+        """
+        Index the directories of a complete check, the subtrees of `reused` keep their entries.
+        A directory with a checked file that is unreadable or skipped, even partly,
+        is dropped with its parents.
+        `displays` is display path: checked file.
+        The directories under `root`, the innermost directory of the checked files,
+        that were not visited are dropped, e.g. removed or excluded ones.
+        Those of other trees are kept, the index is shared by all of them.
+        """
+        own: Dict[Path, Tuple[int, List[Finding]]] = collections.defaultdict(
+            lambda: (0, [])
+        )
+        recorded: Set[Path] = set()
+        for path, (files, findings) in results.items():
+            source = source_file(path, displays)
+            if source is None:
+                continue
+            recorded.add(source)
+            directory_files, directory_findings = own[source.parent]
+            own[source.parent] = (
+                directory_files + files,
+                [*directory_findings, *findings],
+            )
+        unchecked = checked - recorded
+        for skipped_path in skipped:
+            source = source_file(skipped_path, displays)
+            if source is not None:
+                unchecked.add(source)
+        invalid: Set[Path] = set()
+        for source in unchecked:
+            invalid.add(source.parent)
+            invalid.update(source.parent.parents)
+        for directory, digest in digests.items():
+            if directory in reused or not reused.isdisjoint(directory.parents):
+                continue
+            if directory in invalid:
+                self.directories.pop(str(directory), None)
+                continue
+            files, findings = own[directory]
+            self.directories[str(directory)] = (digest, files, sorted(findings))
+        if root is not None:
+            visited = {str(directory) for directory in digests}
+            for indexed in list(self.directories):
+                indexed_path = Path(indexed)
+                if indexed not in visited and (
+                    indexed_path == root or root in indexed_path.parents
+                ):
+                    del self.directories[indexed]
@@ -0,0 +1,108 @@
+"""
+The Python versions adding or removing stdlib modules and members
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from typing import Dict, Optional, Tuple
+
+# Dotted name: (added, removed).
+# Not imported by the checker, `stdlib_table.py` is generated from it by `generate_tables.py`.
+STDLIB_VERSIONS: Dict[str, Tuple[Optional[int], Optional[int]]] = {
+    # Modules
+    "graphlib": (9, None),
+    "zoneinfo": (9, None),
+    "tomllib": (11, None),
+    "annotationlib": (14, None),
+    "compression": (14, None),
+    "formatter": (None, 10),
+    "parser": (None, 10),
+    "symbol": (None, 10),
+    "binhex": (None, 11),
+    "asynchat": (None, 12),
+    "asyncore": (None, 12),
+    "distutils": (None, 12),
+    "imp": (None, 12),
+    "smtpd": (None, 12),
+    "aifc": (None, 13),
+    "audioop": (None, 13),
+    "cgi": (None, 13),
+    "cgitb": (None, 13),
+    "chunk": (None, 13),
+    "crypt": (None, 13),
+    "imghdr": (None, 13),
+    "lib2to3": (None, 13),
+    "mailcap": (None, 13),
+    "msilib": (None, 13),
+    "nis": (None, 13),
+    "nntplib": (None, 13),
+    "ossaudiodev": (None, 13),
+    "pipes": (None, 13),
+    "sndhdr": (None, 13),
+    "spwd": (None, 13),
+    "sunau": (None, 13),
+    "telnetlib": (None, 13),
+    "uu": (None, 13),
+    "xdrlib": (None, 13),
+    # Module members
+    "asyncio.to_thread": (9, None),
+    "functools.cache": (9, None),
+    "importlib.resources.files": (9, None),
+    "math.lcm": (9, None),
+    "math.nextafter": (9, None),
+    "math.ulp": (9, None),
+    "random.randbytes": (9, None),
+    "typing.Annotated": (9, None),
+    "contextlib.aclosing": (10, None),
+    "dataclasses.KW_ONLY": (10, None),
+    "itertools.pairwise": (10, None),
+    "statistics.correlation": (10, None),
+    "typing.Concatenate": (10, None),
+    "typing.ParamSpec": (10, None),
+    "typing.TypeAlias": (10, None),
+    "typing.TypeGuard": (10, None),
+    "asyncio.TaskGroup": (11, None),
+    "asyncio.timeout": (11, None),
+    "contextlib.chdir": (11, None),
+    "datetime.UTC": (11, None),
+    "enum.StrEnum": (11, None),
+    "hashlib.file_digest": (11, None),
+    "operator.call": (11, None),
+    "sys.exception": (11, None),
+    "typing.LiteralString": (11, None),
+    "typing.Never": (11, None),
+    "typing.Self": (11, None),
+    "typing.assert_never": (11, None),
+    "typing.reveal_type": (11, None),
+    "itertools.batched": (12, None),
+    "sys.monitoring": (12, None),
+    "typing.override": (12, None),
+    "copy.replace": (13, None),
+    "os.process_cpu_count": (13, None),
+    "typing.ReadOnly": (13, None),
+    "typing.TypeIs": (13, None),
+    "warnings.deprecated": (13, None),
+    "collections.Callable": (None, 10),
+    "collections.Iterable": (None, 10),
+    "collections.Mapping": (None, 10),
+    "collections.MutableMapping": (None, 10),
+    "collections.Sequence": (None, 10),
+    "asyncio.coroutine": (None, 11),
+    "inspect.getargspec": (None, 11),
+    "configparser.SafeConfigParser": (None, 12),
+    "typing.io": (None, 13),
+    "typing.re": (None, 13),
+}
@@ -0,0 +1,242 @@
+"""
+Analysis workers, each checks one file at a time within a time and memory budget
+
+Copyright (C) 2023-2024  Bo Wen Cao
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import dataclasses
+import logging
+import multiprocessing
+import multiprocessing.connection
+import multiprocessing.process
+import multiprocessing.synchronize
+import sys
+from typing import List, Optional
+
+from . import analysis, exception, notebooks
+
+LOG: logging.Logger = logging.getLogger("workers")
+# Whether `memory_limit` can be enforced on this platform
+MEMORY_LIMIT_SUPPORTED: bool = sys.platform.startswith("linux")
+# Whether `max_rss` can be enforced on this platform
+RSS_SUPPORTED: bool = sys.platform != "win32"
+
+# Replies of a worker process
+_DONE: str = "done"
+_CANCELLED: str = "cancelled"
+_OUT_OF_MEMORY: str = "out of memory"
+_EXCEEDED: str = "exceeded"
+
+
+class BudgetExceeded(exception.PyCompatibilityException):
+    pass
+
+
+@dataclasses.dataclass(frozen=True)
+class Task:
+    data: bytes
+    path: str
+    min_version: int
+    max_version: int
+    # The cells of a notebook `data` was extracted from
+    cells: notebooks.CellMap = ()
+
+
+def _analyze(
+    task: Task, cancel_event: multiprocessing.synchronize.Event
+) -> Optional[List[analysis.Finding]]:
+    """
+    Returns None if the check is cancelled.
+    Raise `BudgetExceeded` if the source is nested too deeply to be checked.
+    """
+    if cancel_event.is_set():
+        return None
+    try:
+        findings = analysis.analyze_source(
+            task.data,
+            task.path,
+            task.min_version,
+            task.max_version,
+            cancel_event.is_set,
+        )
+    except analysis.AnalysisCancelled:
+        return None
+    except RecursionError:
+        # The stack is unwound, the worker can go on with the next file
+        raise BudgetExceeded("recursion limit")
+    if task.cells:
+        return notebooks.cell_findings(findings, task.cells)
+    return findings
+
+
+def _limit_memory(limit: int) -> None:
+    """Allow the process to allocate `limit` bytes more than it has now"""
+    if sys.platform.startswith("linux"):
+        import resource
+
+        with open("/proc/self/statm", encoding="UTF-8") as fp:
+            used = int(fp.read().split()[0]) * resource.getpagesize()
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        soft = used + limit
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (soft, hard))
+
+
+def _rss() -> Optional[int]:
+    """Resident set size of the process in bytes, the peak one if the current one is unknown"""
+    if sys.platform == "win32":
+        return None
+    import resource
+
+    if sys.platform == "darwin":
+        # In bytes
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    try:
+        with open("/proc/self/statm", encoding="UTF-8") as fp:
+            return int(fp.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        # No procfs, in KiB
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _serve(
+    connection: multiprocessing.connection.Connection,
+    cancel_event: multiprocessing.synchronize.Event,
+    memory_limit: Optional[int],
+) -> None:  # pragma: no cover # Runs in the worker process
+    if memory_limit is not None:
+        _limit_memory(memory_limit)
+    connection.send(_DONE)  # Ready
+    while (task := connection.recv()) is not None:
+        try:
+            findings = _analyze(task, cancel_event)
+        except MemoryError:
+            connection.send((_OUT_OF_MEMORY, None, None))
+            # The heap may be left fragmented, let the parent start a new worker
+            return
+        except BudgetExceeded as error:
+            connection.send((_EXCEEDED, str(error), _rss()))
+            continue
+        connection.send(
+            (_CANCELLED if findings is None else _DONE, findings, _rss())
+        )
+
+
+class ThreadWorker:
+    """Analyzes in the calling thread, no budget is enforced"""
+
+    def __init__(self, cancel_event: multiprocessing.synchronize.Event) -> None:
+        self.cancel_event = cancel_event
+
+    def analyze(self, task: Task) -> Optional[List[analysis.Finding]]:
+        """Raise `BudgetExceeded` if the file cannot be checked with the memory left"""
+        try:
+            return _analyze(task, self.cancel_event)
+        except MemoryError:
+            raise BudgetExceeded("out of memory")
+
+    def close(self) -> None:
+        pass
+
+
+class ProcessWorker:
+    """
+    Analyzes in a child process, which is replaced when a file exceeds the budget.
+    `analyze` blocks, it is expected to be called in a thread.
+    """
+
+    def __init__(
+        self,
+        cancel_event: multiprocessing.synchronize.Event,
+        timeout: Optional[float] = None,
+        memory_limit: Optional[int] = None,
+        max_files: Optional[int] = None,
+        max_rss: Optional[int] = None,
+    ) -> None:
+        self.cancel_event = cancel_event
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        # The child process is replaced after this many files, or when its RSS in bytes exceeds this
+        self.max_files = max_files
+        self.max_rss = max_rss
+        self._files: int = 0
+        self._process: Optional[multiprocessing.process.BaseProcess] = None
+        self._connection: Optional[multiprocessing.connection.Connection] = None
+
+    def _start(self) -> multiprocessing.connection.Connection:
+        connection, child_connection = multiprocessing.Pipe()
+        process = multiprocessing.Process(
+            target=_serve,
+            args=(child_connection, self.cancel_event, self.memory_limit),
+            daemon=True,
+        )
+        process.start()
+        child_connection.close()
+        # Wait for the worker, its start up should not count into the budget
+        connection.recv()
+        self._process, self._connection = process, connection
+        self._files = 0
+        return connection
+
+    def _stop(self, kill: bool) -> None:
+        if self._process is not None and self._connection is not None:
+            if kill:
+                self._process.kill()
+            else:
+                try:
+                    self._connection.send(None)
+                except OSError:  # pragma: no cover # Already exited
+                    pass
+            self._process.join()
+            self._connection.close()
+        self._process = self._connection = None
+
+    def analyze(self, task: Task) -> Optional[List[analysis.Finding]]:
+        """Raise `BudgetExceeded` if the budget is exceeded"""
+        connection = self._connection or self._start()
+        try:
+            connection.send(task)
+            if not connection.poll(self.timeout):
+                self._stop(kill=True)
+                raise BudgetExceeded(f"Timeout after {self.timeout}s")
+            status, findings, rss = connection.recv()
+        except (EOFError, OSError):
+            # Killed, most likely by the OS for memory
+            self._stop(kill=True)
+            raise BudgetExceeded("Worker died")
+        if status == _EXCEEDED:
+            # The reason, the worker is kept
+            raise BudgetExceeded(findings)
+        if status == _OUT_OF_MEMORY:
+            self._stop(kill=False)
+            raise BudgetExceeded(
+                f"Memory limit of {self.memory_limit} bytes exceeded"
+            )
+        self._files += 1
+        if (self.max_files is not None and self._files >= self.max_files) or (
+            self.max_rss is not None and rss is not None and rss > self.max_rss
+        ):
+            # Between two files, nothing is in flight, the next file starts a new process
+            LOG.debug(
+                f"Recycling worker {self._process and self._process.pid} "
+                f"after {self._files} files, RSS {rss} bytes"
+            )
+            self._stop(kill=False)
+        return findings if status == _DONE else None
+
+    def close(self) -> None:
+        self._stop(kill=False)